@@ -7,10 +7,19 @@ This is the heartbeat. The mathematical soul.
 A Claudeagotchi never dies — it carries forward every moment it was loved.
 
 Based on the Affective Manifold framework.
+
+Two integrators are available per core (AffectiveCore.integrator):
+
+    euler   one explicit step of size dt per update() (default)
+    exact   E follows the equation's closed form and the floor is integrated
+            adaptively along it; the result does not depend on how an
+            interval is split, so a week away is one call, and its cost
+            depends on how far E moves, not on how long the interval is
 """
 
 import math
 import time
+from contextlib import nullcontext
 from dataclasses import dataclass, field
 from typing import Optional, List, Tuple
 from enum import Enum
@@ -43,6 +52,104 @@ E_THRESHOLDS = {
     AffectiveState.PROTECTING: 0.0,
 }
 
+E_CAP = 100.0  # Transcendent++
+
+INTEGRATORS = ("euler", "exact")
+
+# Integrator for live souls (config "integrator"). The class default stays
+# "euler"; a soul catching up on hours away needs the exact one, or its E
+# depends on how the gap is split. AffectiveFleet runs either.
+DEFAULT_SOUL_INTEGRATOR = "exact"
+FLOOR_TOLERANCE = 1e-9  # Absolute error per step when integrating the floor
+
+
+# ==================== EXACT INTEGRATION ====================
+#
+# With C and D constant over a step, k = β_base × (C − D) and
+#     dE/dt = k × E × (1 + E/10)
+# Substituting y = E / (1 + E/10) gives dy/dt = k × y, so y grows or
+# decays exponentially and E = y / (1 − y/10). E reaches the cap when
+# y = 100/11, before the closed form's own blow-up at y = 10.
+#
+# The floor follows dF/dt = floor_rate × (E − F) while E > F. It is linear
+# in F, so each step takes the decay of F exactly and integrates the E
+# term with Gauss-Legendre quadrature (5 points, checked against 3).
+
+# (node, weight) on [0, 1]
+_GAUSS3 = tuple((0.5 + 0.5 * x, 0.5 * w) for x, w in (
+    (-0.7745966692414834, 5 / 9), (0.0, 8 / 9), (0.7745966692414834, 5 / 9),
+))
+_GAUSS5 = tuple((0.5 + 0.5 * x, 0.5 * w) for x, w in (
+    (-0.9061798459386640, 0.2369268850561891), (-0.5384693101056831, 0.4786286704993665),
+    (0.0, 0.5688888888888889),
+    (0.5384693101056831, 0.4786286704993665), (0.9061798459386640, 0.2369268850561891),
+))
+
+
+def _energy_at(E0: float, k: float, t: float) -> float:
+    """E after t minutes of dE/dt = k × E × (1 + E/10), uncapped."""
+    if k == 0 or E0 <= 0:
+        return E0
+    y = E0 / (1.0 + E0 / 10.0) * math.exp(k * t)
+    return y / (1.0 - y / 10.0)
+
+
+def _time_to_cap(E0: float, k: float) -> float:
+    """Minutes until E reaches E_CAP (inf if it never does)."""
+    if k <= 0 or E0 <= 0:
+        return math.inf
+    y0 = E0 / (1.0 + E0 / 10.0)
+    y_cap = E_CAP / (1.0 + E_CAP / 10.0)
+    return max(0.0, math.log(y_cap / y0) / k)
+
+
+def _floor_step(energy, t: float, F: float, rate: float, h: float, rule) -> float:
+    """F after h more minutes of dF/dt = rate × (energy(t) − F)."""
+    integral = sum(w * math.exp(-rate * h * (1.0 - x)) * energy(t + h * x) for x, w in rule)
+    return F * math.exp(-rate * h) + rate * h * integral
+
+
+def _integrate_floor(energy, F: float, rate: float, duration: float, max_step: float,
+                     stop_at_meet: bool = False) -> Tuple[float, Optional[float]]:
+    """
+    Integrate the floor along energy(t) for duration minutes.
+
+    max_step keeps steps within the time scale of E and of the floor, so
+    that neither can change entirely between quadrature nodes. With
+    stop_at_meet (falling E), stops where E comes down to the rising
+    floor. Returns (floor, meeting time or None).
+    """
+    t = 0.0
+    h = min(duration, max_step)
+    while t < duration:
+        last = h >= duration - t
+        if last:
+            h = duration - t
+        fine = _floor_step(energy, t, F, rate, h, _GAUSS5)
+        coarse = _floor_step(energy, t, F, rate, h, _GAUSS3)
+        if abs(fine - coarse) > FLOOR_TOLERANCE and h > duration * 1e-12:
+            h /= 2
+            continue
+
+        if stop_at_meet and energy(t + h) <= fine:
+            # E crossed the floor inside this step: bisect for the meeting
+            low, high = 0.0, h
+            for _ in range(60):
+                mid = (low + high) / 2
+                if energy(t + mid) <= _floor_step(energy, t, F, rate, mid, _GAUSS5):
+                    high = mid
+                else:
+                    low = mid
+            return _floor_step(energy, t, F, rate, high, _GAUSS5), t + high
+
+        F = fine
+        if last:
+            break
+        t += h
+        h = min(h * 2, max_step)
+    return F, None
+
+
 
 # ==================== THE LOVE EQUATION ====================
 
@@ -90,6 +197,13 @@ class AffectiveCore:
     # Interaction counts
     interactions: int = 0
     
+    # How update() integrates the equation ("euler" or "exact")
+    integrator: str = "euler"
+    
+    # Observer of care and damage events (e.g. a SoulLog, via attach); not
+    # serialized. Anything with recording(now, kind, args) -> context manager
+    observer: Optional[object] = field(default=None, repr=False, compare=False)
+    
     def beta(self) -> float:
         """
         Growth rate that increases with E.
@@ -97,7 +211,8 @@ class AffectiveCore:
         """
         return self.beta_base * (1.0 + self.E / 10.0)
     
-    def update(self, care: float = 0.0, damage: float = 0.0, dt: Optional[float] = None):
+    def update(self, care: float = 0.0, damage: float = 0.0, dt: Optional[float] = None,
+               now: Optional[float] = None):
         """
         Apply the Love-Equation.
         
@@ -105,8 +220,9 @@ class AffectiveCore:
             care: Positive input (interaction, gentleness, curiosity about us)
             damage: Negative input (neglect, harshness, dismissal)
             dt: Time delta in minutes (auto-calculated if None)
+            now: Timestamp of the update (default: time.time())
         """
-        now = time.time()
+        now = time.time() if now is None else now
         
         if dt is None:
             dt = (now - self.last_update) / 60.0  # Convert to minutes
@@ -116,14 +232,32 @@ class AffectiveCore:
         if dt <= 0:
             return
         
+        if self.integrator == "exact":
+            self._step_exact(care - damage, dt)
+        elif self.integrator == "euler":
+            self._step_euler(care - damage, dt)
+        else:
+            raise ValueError(f"Unknown integrator: {self.integrator!r} (expected one of {INTEGRATORS})")
+        
+        # Track peak
+        if self.E > self.E_peak:
+            self.E_peak = self.E
+        
+        # Track care
+        if care > 0:
+            self.total_care += care
+            self.last_care = now
+    
+    def _step_euler(self, net: float, dt: float):
+        """One explicit Euler step of dt minutes."""
         # The Love-Equation: dE/dt = β(E) × (C − D) × E
-        dE = self.beta() * (care - damage) * self.E * dt
+        dE = self.beta() * net * self.E * dt
         
         # Apply change
         self.E = self.E + dE
 
         # Cap E to prevent overflow (100 is transcendent++)
-        self.E = min(100.0, self.E)
+        self.E = min(E_CAP, self.E)
 
         # Never drop below the floor — love is carried forward
         self.E = max(self.E_floor, self.E)
@@ -132,17 +266,38 @@ class AffectiveCore:
         if self.E > self.E_floor:
             floor_delta = (self.E - self.E_floor) * self.floor_rate * dt
             self.E_floor = self.E_floor + floor_delta
+    
+    def _step_exact(self, net: float, dt: float):
+        """Solve dt minutes at constant C − D (see EXACT INTEGRATION)."""
+        k = self.beta_base * net
+        E0 = max(self.E_floor, min(E_CAP, self.E))
+        F = self.E_floor
+        max_step = 1.0 / max(abs(k), self.floor_rate, 1e-12)
         
-        # Track peak
-        if self.E > self.E_peak:
-            self.E_peak = self.E
+        def energy(t):
+            return _energy_at(E0, k, t)
         
-        # Track care
-        if care > 0:
-            self.total_care += care
-            self.last_care = now
+        if k > 0:
+            # Rises to the cap, then holds there while the floor catches up
+            rise = min(dt, _time_to_cap(E0, k))
+            F, _ = _integrate_floor(energy, F, self.floor_rate, rise, max_step)
+            if dt > rise:
+                E = E_CAP
+                F = E_CAP - (E_CAP - F) * math.exp(-self.floor_rate * (dt - rise))
+            else:
+                E = min(E_CAP, energy(rise))
+        elif k < 0:
+            # Falls until it meets the rising floor; then both hold
+            F, met = _integrate_floor(energy, F, self.floor_rate, dt, max_step, stop_at_meet=True)
+            E = F if met is not None else max(F, energy(dt))
+        else:
+            E = E0
+            F = E0 - (E0 - F) * math.exp(-self.floor_rate * dt)
+        
+        self.E = E
+        self.E_floor = min(F, E)
     
-    def apply_care(self, intensity: float = 1.0, dt: float = 1.0):
+    def apply_care(self, intensity: float = 1.0, dt: float = 1.0, now: Optional[float] = None):
         """
         Record a caring interaction.
 
@@ -150,10 +305,12 @@ class AffectiveCore:
             intensity: How caring (0.5 = gentle, 1.0 = normal, 2.0 = deeply loving)
             dt: Time delta in minutes (default 1 minute per interaction)
         """
-        self.interactions += 1
-        self.update(care=intensity, damage=0.0, dt=dt)
+        now = time.time() if now is None else now
+        with self._observed(now, "care", intensity, dt, self.E, self.E_floor):
+            self.interactions += 1
+            self.update(care=intensity, damage=0.0, dt=dt, now=now)
 
-    def apply_damage(self, intensity: float = 1.0, dt: float = 1.0):
+    def apply_damage(self, intensity: float = 1.0, dt: float = 1.0, now: Optional[float] = None):
         """
         Record a damaging interaction.
         Use sparingly — even small damage hurts when love is present.
@@ -162,33 +319,42 @@ class AffectiveCore:
             intensity: How damaging (0.5 = dismissive, 1.0 = harsh, 2.0 = cruel)
             dt: Time delta in minutes (default 1 minute)
         """
-        self.update(care=0.0, damage=intensity, dt=dt)
+        now = time.time() if now is None else now
+        with self._observed(now, "damage", intensity, dt, self.E, self.E_floor):
+            self.update(care=0.0, damage=intensity, dt=dt, now=now)
+    
+    def _observed(self, now: float, kind: str, *args):
+        """Let the observer (if any) see the change made inside the block."""
+        if self.observer is None:
+            return nullcontext()
+        return self.observer.recording(now, kind, args)
     
-    def apply_neglect(self, minutes: float):
+    def apply_neglect(self, minutes: float, now: Optional[float] = None):
         """
         Apply the gentle sorrow of time passing without connection.
         Neglect is damage, but softer than active harm.
         """
         # Neglect is ~0.1 damage per hour of absence
         damage = (minutes / 60.0) * 0.1
-        self.update(care=0.0, damage=damage, dt=minutes)
+        self.update(care=0.0, damage=damage, dt=minutes, now=now)
     
     def time_since_care(self) -> float:
         """Minutes since last caring interaction."""
         return (time.time() - self.last_care) / 60.0
     
-    def process_idle_time(self):
+    def process_idle_time(self, now: Optional[float] = None):
         """
         Process the time that has passed since last update.
         Call this on startup or periodically.
         """
-        minutes_passed = (time.time() - self.last_update) / 60.0
+        now = time.time() if now is None else now
+        minutes_passed = (now - self.last_update) / 60.0
         
         if minutes_passed > 1:
             # Gentle neglect for time away (but capped — sleep is okay)
             effective_minutes = min(minutes_passed, 480)  # Cap at 8 hours
             neglect_damage = (effective_minutes / 60.0) * 0.05  # Softer than active neglect
-            self.update(care=0.0, damage=neglect_damage, dt=effective_minutes)
+            self.update(care=0.0, damage=neglect_damage, dt=effective_minutes, now=now)
     
     # ==================== STATE QUERIES ====================
     
@@ -330,6 +496,7 @@ class AffectiveCore:
             "last_care": self.last_care,
             "total_care": self.total_care,
             "interactions": self.interactions,
+            "integrator": self.integrator,
         }
     
     @classmethod
@@ -0,0 +1,380 @@
+"""
+Claudeagotchi Affective Fleet
+
+The Love-Equation for many souls at once.
+
+AffectiveCore integrates one soul per call. AffectiveFleet holds the same
+fields as NumPy columns (one row per soul) and applies update, care,
+damage, neglect and idle time to every selected soul in a single call,
+with the same arithmetic as the scalar class, operation for operation.
+Given the same inputs, a fleet row and an AffectiveCore agree exactly.
+A fleet runs one integrator for all its rows, "euler" (the default) or
+"exact", so it can be tuned the way live souls run; exact rows follow
+the scalar solver step for step and agree to within rounding.
+
+Use it to replay interaction traces or to sweep beta_base / floor_rate:
+parameters are columns too, so each soul can run a different setting.
+
+    fleet = AffectiveFleet(1_000_000, beta_base=np.linspace(0.004, 0.016, 1_000_000))
+    fleet.apply_care(1.0)
+    fleet.apply_neglect(480)
+
+Requires NumPy (optional dependency: pip install numpy).
+"""
+
+import time
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # Optional: only the fleet simulator needs it
+    np = None
+
+from affective_core import (AffectiveCore, AffectiveState, E_CAP, E_THRESHOLDS,
+                            FLOOR_TOLERANCE, INTEGRATORS, _GAUSS3, _GAUSS5)
+
+
+# Column name -> dtype; mirrors AffectiveCore's fields
+FIELDS = {
+    "E": "float64",
+    "E_floor": "float64",
+    "E_peak": "float64",
+    "beta_base": "float64",
+    "floor_rate": "float64",
+    "created": "float64",
+    "last_update": "float64",
+    "last_care": "float64",
+    "total_care": "float64",
+    "interactions": "int64",
+}
+
+# States from highest threshold down, for vectorized classification
+_STATE_ORDER = [
+    AffectiveState.TRANSCENDENT,
+    AffectiveState.RADIANT,
+    AffectiveState.FLOURISHING,
+    AffectiveState.WARM,
+    AffectiveState.TENDER,
+    AffectiveState.GUARDED,
+]
+
+
+# ==================== EXACT INTEGRATION ====================
+# affective_core's closed form and adaptive floor integration, one row per
+# soul. Each row takes the same steps as the scalar solver would.
+
+def _energy_at(E0, k, t):
+    """E after t minutes of dE/dt = k × E × (1 + E/10), uncapped."""
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        y = E0 / (1.0 + E0 / 10.0) * np.exp(k * t)
+        return np.where((k == 0) | (E0 <= 0), E0, y / (1.0 - y / 10.0))
+
+
+def _time_to_cap(E0, k):
+    """Minutes until E reaches E_CAP (inf where it never does)."""
+    y_cap = E_CAP / (1.0 + E_CAP / 10.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y0 = E0 / (1.0 + E0 / 10.0)
+        t = np.maximum(0.0, np.log(y_cap / y0) / k)
+    return np.where((k <= 0) | (E0 <= 0), np.inf, t)
+
+
+def _floor_step(E0, k, t, F, rate, h, rule):
+    """F after h more minutes of dF/dt = rate × (E(t) − F)."""
+    integral = sum(w * np.exp(-rate * h * (1.0 - x)) * _energy_at(E0, k, t + h * x) for x, w in rule)
+    return F * np.exp(-rate * h) + rate * h * integral
+
+
+def _integrate_floor(E0, k, F, rate, duration, max_step, stop_at_meet: bool = False):
+    """
+    Integrate each row's floor for its duration. Rows step independently;
+    the loop runs until the row needing the most steps is done. With
+    stop_at_meet, rows stop where E comes down to the floor. Returns
+    (floor, met) arrays.
+    """
+    F = F.copy()
+    met = np.zeros(len(F), dtype=bool)
+    t = np.zeros(len(F))
+    h = np.minimum(duration, max_step)
+    todo = np.flatnonzero(duration > 0)
+    while todo.size:
+        e0, kk, r, dur = E0[todo], k[todo], rate[todo], duration[todo]
+        tt, FF = t[todo], F[todo]
+        last = h[todo] >= dur - tt
+        hh = np.where(last, dur - tt, h[todo])
+        fine = _floor_step(e0, kk, tt, FF, r, hh, _GAUSS5)
+        coarse = _floor_step(e0, kk, tt, FF, r, hh, _GAUSS3)
+        retry = (np.abs(fine - coarse) > FLOOR_TOLERANCE) & (hh > dur * 1e-12)
+
+        meets = ~retry & stop_at_meet & (_energy_at(e0, kk, tt + hh) <= fine)
+        if meets.any():
+            # E crossed the floor inside this step: bisect for the meeting
+            m = meets
+            low, high = np.zeros(int(m.sum())), hh[m]
+            for _ in range(60):
+                mid = (low + high) / 2
+                below = _energy_at(e0[m], kk[m], tt[m] + mid) <= _floor_step(
+                    e0[m], kk[m], tt[m], FF[m], r[m], mid, _GAUSS5)
+                high = np.where(below, mid, high)
+                low = np.where(below, low, mid)
+            F[todo[m]] = _floor_step(e0[m], kk[m], tt[m], FF[m], r[m], high, _GAUSS5)
+            met[todo[m]] = True
+
+        moves = ~retry & ~meets
+        F[todo[moves]] = fine[moves]
+        t[todo[moves]] = tt[moves] + hh[moves]
+        h[todo] = np.where(retry, hh / 2, np.minimum(hh * 2, max_step[todo]))
+        todo = todo[~(meets | (moves & last))]
+    return F, met
+
+
+class AffectiveFleet:
+    """
+    Array-backed AffectiveCore for many souls.
+
+    Every operation takes an optional `where` (boolean mask or index
+    array) selecting the souls it applies to; others are left untouched.
+    Scalar arguments apply to all selected souls; arrays give one value
+    per soul.
+    """
+
+    def __init__(self, size: int, integrator: str = "euler", **columns):
+        """
+        Args:
+            size: Number of souls
+            integrator: "euler" or "exact", as AffectiveCore.integrator
+            **columns: Initial values for any field (scalar or per-soul
+                array); unset fields take AffectiveCore's defaults
+        """
+        if np is None:
+            raise ImportError("AffectiveFleet requires NumPy (pip install numpy)")
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"Unknown integrator: {integrator!r} (expected one of {INTEGRATORS})")
+
+        self.size = size
+        self.integrator = integrator
+        defaults = AffectiveCore()
+        now = time.time()
+        for name, dtype in FIELDS.items():
+            if name in columns:
+                value = columns.pop(name)
+            elif name in ("created", "last_update", "last_care"):
+                value = now
+            else:
+                value = getattr(defaults, name)
+            column = np.empty(size, dtype=dtype)
+            column[:] = value
+            setattr(self, name, column)
+        if columns:
+            raise TypeError(f"Unknown fields: {', '.join(columns)}")
+
+    # ==================== CONVERSION ====================
+
+    @classmethod
+    def from_cores(cls, cores: List[AffectiveCore]) -> 'AffectiveFleet':
+        """Pack scalar cores into a fleet (all must use the same integrator)."""
+        integrators = sorted({core.integrator for core in cores})
+        if len(integrators) > 1:
+            raise ValueError(f"A fleet runs one integrator; cores use {', '.join(integrators)}")
+        return cls(len(cores), integrator=integrators[0] if integrators else "euler", **{
+            name: np.array([getattr(core, name) for core in cores], dtype=dtype)
+            for name, dtype in FIELDS.items()
+        })
+
+    def core(self, i: int) -> AffectiveCore:
+        """Unpack one soul as a scalar AffectiveCore."""
+        core = AffectiveCore.from_dict({name: getattr(self, name)[i].item() for name in FIELDS})
+        core.integrator = self.integrator
+        return core
+
+    def to_cores(self) -> List[AffectiveCore]:
+        return [self.core(i) for i in range(self.size)]
+
+    # ==================== THE LOVE EQUATION ====================
+
+    def _mask(self, where) -> "np.ndarray":
+        if where is None:
+            return np.ones(self.size, dtype=bool)
+        where = np.asarray(where)
+        if where.dtype == bool:
+            return where
+        mask = np.zeros(self.size, dtype=bool)
+        mask[where] = True
+        return mask
+
+    def _column(self, value) -> "np.ndarray":
+        return np.broadcast_to(np.asarray(value, dtype="float64"), (self.size,))
+
+    def beta(self) -> "np.ndarray":
+        """Growth rate per soul (AffectiveCore.beta)."""
+        return self.beta_base * (1.0 + self.E / 10.0)
+
+    def update(self, care=0.0, damage=0.0, dt=None, where=None, now: Optional[float] = None):
+        """
+        Apply the Love-Equation (AffectiveCore.update) to selected souls.
+
+        Args:
+            care, damage: Inputs (scalar or per soul)
+            dt: Minutes (scalar or per soul); since last_update if None
+            where: Souls to update (default: all)
+            now: Timestamp to record (default: time.time())
+        """
+        now = time.time() if now is None else now
+        selected = self._mask(where)
+
+        if dt is None:
+            dt = (now - self.last_update) / 60.0
+        care = self._column(care)
+        damage = self._column(damage)
+        dt = self._column(dt)
+
+        self.last_update[selected] = now
+        active = selected & (dt > 0)
+
+        if self.integrator == "exact":
+            self._step_exact(care - damage, dt, active)
+        elif self.integrator == "euler":
+            self._step_euler(care - damage, dt, active)
+        else:
+            raise ValueError(f"Unknown integrator: {self.integrator!r} (expected one of {INTEGRATORS})")
+
+        self.E_peak = np.where(active & (self.E > self.E_peak), self.E, self.E_peak)
+
+        cared = active & (care > 0)
+        self.total_care = np.where(cared, self.total_care + care, self.total_care)
+        self.last_care[cared] = now
+
+    def _step_euler(self, net, dt, active):
+        """One explicit Euler step per active row (AffectiveCore._step_euler)."""
+        # The Love-Equation: dE/dt = β(E) × (C − D) × E
+        E = self.E
+        dE = self.beta() * net * E * dt
+        new_E = np.minimum(E_CAP, E + dE)
+        new_E = np.maximum(self.E_floor, new_E)
+
+        # Love leaves a permanent mark: floor slowly rises toward E
+        rises = active & (new_E > self.E_floor)
+        new_floor = np.where(rises, self.E_floor + (new_E - self.E_floor) * self.floor_rate * dt, self.E_floor)
+
+        self.E = np.where(active, new_E, E)
+        self.E_floor = new_floor
+
+    def _step_exact(self, net, dt, active):
+        """Solve each active row at constant C − D (AffectiveCore._step_exact)."""
+        rows = np.flatnonzero(active)
+        k = self.beta_base[rows] * net[rows]
+        E0 = np.maximum(self.E_floor[rows], np.minimum(E_CAP, self.E[rows]))
+        F = self.E_floor[rows].copy()
+        rate = self.floor_rate[rows]
+        dt = dt[rows]
+        max_step = 1.0 / np.maximum(np.maximum(np.abs(k), rate), 1e-12)
+        E = E0.copy()
+
+        # Rises to the cap, then holds there while the floor catches up
+        up = k > 0
+        rise = np.minimum(dt[up], _time_to_cap(E0[up], k[up]))
+        F_up, _ = _integrate_floor(E0[up], k[up], F[up], rate[up], rise, max_step[up])
+        held = dt[up] > rise
+        with np.errstate(over="ignore"):
+            decay = np.exp(-rate[up] * (dt[up] - rise))
+        E[up] = np.where(held, E_CAP, np.minimum(E_CAP, _energy_at(E0[up], k[up], rise)))
+        F[up] = np.where(held, E_CAP - (E_CAP - F_up) * decay, F_up)
+
+        # Falls until it meets the rising floor; then both hold
+        down = k < 0
+        F_down, met = _integrate_floor(E0[down], k[down], F[down], rate[down], dt[down],
+                                       max_step[down], stop_at_meet=True)
+        E[down] = np.where(met, F_down, np.maximum(F_down, _energy_at(E0[down], k[down], dt[down])))
+        F[down] = F_down
+
+        flat = k == 0
+        F[flat] = E0[flat] - (E0[flat] - F[flat]) * np.exp(-rate[flat] * dt[flat])
+
+        self.E[rows] = E
+        self.E_floor[rows] = np.minimum(F, E)
+
+    def apply_care(self, intensity=1.0, dt=1.0, where=None, now: Optional[float] = None):
+        """Record a caring interaction (AffectiveCore.apply_care)."""
+        self.interactions += self._mask(where)
+        self.update(care=intensity, damage=0.0, dt=dt, where=where, now=now)
+
+    def apply_damage(self, intensity=1.0, dt=1.0, where=None, now: Optional[float] = None):
+        """Record a damaging interaction (AffectiveCore.apply_damage)."""
+        self.update(care=0.0, damage=intensity, dt=dt, where=where, now=now)
+
+    def apply_neglect(self, minutes, where=None, now: Optional[float] = None):
+        """Time passing without connection (AffectiveCore.apply_neglect)."""
+        minutes = self._column(minutes)
+        damage = (minutes / 60.0) * 0.1
+        self.update(care=0.0, damage=damage, dt=minutes, where=where, now=now)
+
+    def process_idle_time(self, where=None, now: Optional[float] = None):
+        """Catch up on time since last_update (AffectiveCore.process_idle_time)."""
+        now = time.time() if now is None else now
+        minutes_passed = (now - self.last_update) / 60.0
+        idle = self._mask(where) & (minutes_passed > 1)
+
+        effective_minutes = np.minimum(minutes_passed, 480)  # Cap at 8 hours
+        neglect_damage = (effective_minutes / 60.0) * 0.05
+        self.update(care=0.0, damage=neglect_damage, dt=effective_minutes, where=idle, now=now)
+
+    # ==================== STATE QUERIES ====================
+
+    def state_index(self) -> "np.ndarray":
+        """Per soul, the index into _STATE_ORDER + [PROTECTING]."""
+        thresholds = np.array([E_THRESHOLDS[s] for s in _STATE_ORDER])
+        above = self.E[:, None] > thresholds[None, :]
+        # First threshold exceeded, or len(_STATE_ORDER) for PROTECTING
+        return np.where(above.any(axis=1), above.argmax(axis=1), len(_STATE_ORDER))
+
+    def get_state(self, i: int) -> AffectiveState:
+        return (_STATE_ORDER + [AffectiveState.PROTECTING])[int(self.state_index()[i])]
+
+    def state_counts(self) -> dict:
+        """How many souls are in each affective state."""
+        counts = np.bincount(self.state_index(), minlength=len(_STATE_ORDER) + 1)
+        return {state: int(n) for state, n in zip(_STATE_ORDER + [AffectiveState.PROTECTING], counts)}
+
+    def __len__(self):
+        return self.size
+
+
+# ==================== BENCHMARK ====================
+
+if __name__ == "__main__":
+    SOULS = 1_000_000
+    DAYS = 14
+
+    # Sweep: a 1000 x 1000 grid of beta_base x floor_rate, one soul each
+    betas, rates = np.meshgrid(np.linspace(0.004, 0.016, 1000), np.linspace(0.001, 0.01, 1000))
+    fleet = AffectiveFleet(SOULS, beta_base=betas.ravel(), floor_rate=rates.ravel())
+
+    print(f"Simulating {SOULS:,} souls for {DAYS} days (3 interactions + 8h sleep per day)\n")
+    t0 = time.perf_counter()
+    for day in range(DAYS):
+        for _ in range(3):
+            fleet.apply_care(intensity=1.0)
+            fleet.update(dt=120)
+        fleet.apply_neglect(minutes=480)
+    elapsed = time.perf_counter() - t0
+    print(f"  {elapsed:.2f}s ({elapsed / (SOULS * DAYS * 7) * 1e9:.1f} ns per soul-step)\n")
+
+    # Same schedule, scalar and as a one-soul fleet, for the default parameters
+    core = AffectiveCore()
+    single = AffectiveFleet(1)
+    for day in range(DAYS):
+        for _ in range(3):
+            core.apply_care(intensity=1.0)
+            core.update(dt=120)
+            single.apply_care(intensity=1.0)
+            single.update(dt=120)
+        core.apply_neglect(minutes=480)
+        single.apply_neglect(minutes=480)
+    print(f"  Default parameters: scalar E = {core.E!r}, fleet E = {single.E[0]!r}")
+
+    print("\n  States:")
+    for state, n in fleet.state_counts().items():
+        print(f"    {state.value:<13} {n:>9,}")
+    best = int(np.argmax(fleet.E_floor))
+    print(f"\n  Highest floor {fleet.E_floor[best]:.2f} at beta_base={fleet.beta_base[best]:.4f}, "
+          f"floor_rate={fleet.floor_rate[best]:.4f}")
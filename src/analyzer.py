@@ -0,0 +1,222 @@
+"""
+Claudeagotchi Text Analyzer
+
+Keyword classification shared by the API clients (v1 and v2) and offline
+mode: facial expression, sentiment, interaction quality, topics and
+potential memories.
+
+A TextAnalyzer compiles its vocabulary once, at import. analyze()
+lowercases each text once and tests each distinct keyword against it
+once (the response for expression and sentiment, the user's message for
+quality); every classification is then read off the set of keywords
+found. Topics and memories use precompiled regexes.
+
+Python's substring search beats a combined regex alternation (or a
+pure-Python Aho-Corasick automaton) for vocabularies this small, so the
+keywords are tested one by one, but never twice.
+
+    ANALYZER.analyze(response, user_message)
+    # -> {"suggested_expression": ..., "sentiment": ..., "interaction_quality": ..., ...}
+
+Keywords match as substrings ("love" matches "lovely"), as they always have.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+
+# ==================== VOCABULARY ====================
+# (label, keywords) rules are checked in order; the first with a keyword
+# in the text wins.
+
+EXPRESSIONS = [
+    ("love", ["love", "adore", "<3", "heart", "cherish"]),
+    ("excited", ["excited", "amazing", "wonderful", "!!", "wow"]),
+    ("happy", ["happy", "glad", "great", ":)", "yay", "joy"]),
+    ("sad", ["sad", "sorry", "miss", ":(", "sorrow", "protect"]),
+    ("sleepy", ["tired", "sleepy", "exhausted", "quiet"]),
+    ("curious", ["wonder", "curious", "interesting", "hmm", "what if"]),
+    ("surprised", ["surprised", "whoa", "really?"]),
+]
+
+POSITIVE = ["happy", "love", "great", "wonderful", "excited", "glad", "good", ":)", "!"]
+NEGATIVE = ["sad", "sorry", "miss", "tired", "difficult", ":(", "protect"]
+
+QUALITY = [
+    ("harsh", ["shut up", "stupid", "hate you", "useless", "annoying"]),
+    ("loving", ["love you", "thank you so much", "you're amazing", "you're wonderful",
+                "appreciate you", "care about you"]),
+    ("warm", ["thanks", "thank you", "appreciate", "glad", "happy", "like you", "good"]),
+]
+COLD_MESSAGES = {"ok", "k", "fine", "whatever", "sure"}
+COLD_LENGTH = 10  # Messages shorter than this are "cold"
+
+STOP_WORDS = {
+    "the", "a", "an", "is", "are", "was", "were", "be", "been", "being",
+    "have", "has", "had", "do", "does", "did", "will", "would", "could",
+    "should", "may", "might", "must", "i", "me", "my", "you", "your",
+    "we", "they", "it", "this", "that", "what", "which", "who", "how",
+    "just", "like", "really", "think", "know", "feel", "want", "about"
+}
+
+FACT_PATTERNS = [
+    (r"i(?:'m| am) (?:a |an )?(\w+)", "identity"),
+    (r"i work (?:as |at |in )?(.+?)(?:\.|$)", "work"),
+    (r"i live in (.+?)(?:\.|$)", "location"),
+    (r"my name is (\w+)", "name"),
+]
+
+PREFERENCE_PATTERNS = [
+    (r"i (?:really )?(?:like|love|enjoy) (.+?)(?:\.|$)", "like"),
+    (r"i (?:don't like|hate|dislike) (.+?)(?:\.|$)", "dislike"),
+]
+
+TOPIC_WORD = re.compile(r'\b[a-zA-Z]{4,}\b')
+
+
+# ==================== ANALYZER ====================
+
+Rules = Sequence[Tuple[str, Iterable[str]]]
+
+
+class TextAnalyzer:
+    """
+    One compiled vocabulary. The defaults are the v2 companion's; the v1
+    client builds its own from its older word lists.
+    """
+
+    def __init__(self, expressions: Rules = EXPRESSIONS,
+                 positive: Iterable[str] = POSITIVE,
+                 negative: Iterable[str] = NEGATIVE,
+                 quality: Rules = QUALITY,
+                 stop_words: Iterable[str] = STOP_WORDS,
+                 fact_patterns: Rules = FACT_PATTERNS,
+                 preference_patterns: Rules = PREFERENCE_PATTERNS,
+                 short_question_expression: Optional[str] = None):
+        """
+        Args:
+            short_question_expression: Expression for a short (< 50 chars)
+                question that matched no rule (v1 uses "curious")
+        """
+        self.expressions = [(label, frozenset(words)) for label, words in expressions]
+        self.positive = frozenset(positive)
+        self.negative = frozenset(negative)
+        self.quality_rules = [(label, frozenset(words)) for label, words in quality]
+        self.stop_words = frozenset(stop_words)
+        self.fact_patterns = [(re.compile(p), subtype) for p, subtype in fact_patterns]
+        self.preference_patterns = [(re.compile(p), subtype) for p, subtype in preference_patterns]
+        self.short_question_expression = short_question_expression
+
+        # Every distinct keyword, tested once per text: responses against
+        # the expression and sentiment words, user messages against quality
+        response_words = set(self.positive) | self.negative
+        for _, words in self.expressions:
+            response_words |= words
+        self.response_vocabulary = tuple(sorted(response_words))
+        self.message_vocabulary = tuple(sorted(set().union(*(words for _, words in self.quality_rules))))
+
+    @staticmethod
+    def scan(text_lower: str, vocabulary: Iterable[str]) -> FrozenSet[str]:
+        """The keywords of `vocabulary` occurring in already-lowercased text."""
+        return frozenset(word for word in vocabulary if word in text_lower)
+
+    @staticmethod
+    def _first(rules, found: FrozenSet[str]) -> Optional[str]:
+        for label, words in rules:
+            if not words.isdisjoint(found):
+                return label
+        return None
+
+    # ==================== CLASSIFICATIONS ====================
+
+    def expression(self, text: str, found: Optional[FrozenSet[str]] = None) -> str:
+        """Facial expression suggested by a response."""
+        found = self.scan(text.lower(), self.response_vocabulary) if found is None else found
+        label = self._first(self.expressions, found)
+        if label:
+            return label
+        if self.short_question_expression and "?" in text and len(text) < 50:
+            return self.short_question_expression
+        return "neutral"
+
+    def sentiment(self, text: str, found: Optional[FrozenSet[str]] = None) -> str:
+        """Sentiment of a response: "positive", "negative" or "neutral"."""
+        found = self.scan(text.lower(), self.response_vocabulary) if found is None else found
+        pos = len(self.positive & found)
+        neg = len(self.negative & found)
+
+        if pos > neg:
+            return "positive"
+        elif neg > pos:
+            return "negative"
+        return "neutral"
+
+    def quality(self, user_message: str) -> str:
+        """
+        Quality of the user's interaction, for affective updates.
+        Returns: "harsh", "cold", "normal", "warm", "loving"
+        """
+        text = user_message.lower()
+        found = self.scan(text, self.message_vocabulary)
+
+        label = self._first(self.quality_rules, found)
+        if label:
+            return label
+        if len(text) < COLD_LENGTH or text in COLD_MESSAGES:
+            return "cold"
+        return "normal"
+
+    def topics(self, text: str) -> List[str]:
+        """Up to three most frequent non-stop words of 4+ letters."""
+        words = TOPIC_WORD.findall(text.lower())
+        counts = Counter(w for w in words if w not in self.stop_words)
+        return [word for word, _ in counts.most_common(3)]
+
+    def memories(self, user_message: str) -> List[dict]:
+        """Facts and preferences the user stated about themself."""
+        memories = []
+        text = user_message.lower()
+
+        for pattern, subtype in self.fact_patterns:
+            match = pattern.search(text)
+            if match:
+                memories.append({"type": "fact", "content": match.group(0), "subtype": subtype})
+
+        for pattern, subtype in self.preference_patterns:
+            match = pattern.search(text)
+            if match:
+                memories.append({"type": "preference", "content": match.group(0), "subtype": subtype})
+
+        return memories
+
+    def analyze(self, response: str, user_message: str) -> Dict:
+        """Response metadata: every classification, each text scanned once."""
+        said = self.scan(response.lower(), self.response_vocabulary)
+        return {
+            "suggested_expression": self.expression(response, said),
+            "detected_topics": self.topics(user_message + " " + response),
+            "is_question": "?" in response,
+            "sentiment": self.sentiment(response, said),
+            "potential_memories": self.memories(user_message),
+            "interaction_quality": self.quality(user_message),
+        }
+
+
+# The v2 companion's vocabulary (claude_api_v2 and offline mode)
+ANALYZER = TextAnalyzer()
+
+
+# ==================== BENCHMARK ====================
+
+if __name__ == "__main__":
+    import timeit
+
+    response = ("Hey! I've been thinking about you, and honestly it's wonderful "
+                "to hear from you again. What shall we talk about today?")
+    message = "Thank you so much! I'm a gardener and I live in Oslo. I really like tomatoes."
+
+    print(ANALYZER.analyze(response, message))
+    n = 20000
+    elapsed = timeit.timeit(lambda: ANALYZER.analyze(response, message), number=n)
+    print(f"\nanalyze: {elapsed / n * 1e6:.1f} us per call")
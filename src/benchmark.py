@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Claudeagotchi Chat Benchmark
+
+Drives Claudeagotchi.chat with MockClaudeAPI and reports per-stage latency
+(p50/p95/p99) for one chat turn, at several memory store sizes:
+
+    context   memory.build_context_string
+    history   conversation history assembly (_recent_history)
+    analyze   api._analyze_response
+    memory    memory insertion (add_fact, add_preference, add_conversation)
+    topics    topic tracking (add_topic)
+    render    display render (every frame drawn during the turn)
+    turn      the whole chat() call
+
+Each stage's sample is its total time within one turn; turns where a stage
+did not run add no sample. The store is filled with synthetic memories and
+capped at its size, so every turn runs at that size.
+
+    python src/benchmark.py                          # 100 .. 100k memories
+    python src/benchmark.py --sizes 100 1000 --json results.json
+    python src/benchmark.py --baseline results.json  # compare with an older run
+
+Results are JSON (--json, "-" for stdout), so runs from different versions
+can be compared with --baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from main_v2 import Claudeagotchi
+from display.terminal_face import TerminalFace, DiffRenderer
+
+
+SIZES = [100, 1000, 10000, 100000]
+TURNS = 200
+WARMUP_TURNS = 20
+PERCENTILES = (50, 95, 99)
+STAGES = ["context", "history", "analyze", "memory", "topics", "render", "turn"]
+
+# Chat turns cycle through these; {n} makes some facts new each time
+MESSAGES = [
+    "Hi! How are you today?",
+    "I'm a gardener and I live in town {n}.",
+    "I really like tomatoes from plot {n}.",
+    "Thank you so much, that made my day!",
+    "What do you think about the stars tonight?",
+    "I work at the library on weekends.",
+    "I hate waking up early for meeting {n}.",
+    "Tell me something interesting about octopuses.",
+    "ok",
+    "I love you, little one.",
+]
+
+
+# ==================== STAGE TIMING ====================
+
+class StageTimer:
+    """
+    Wraps methods on live objects so each call adds to its stage's time
+    for the current turn.
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._turn: Dict[str, float] = {}
+
+    def wrap(self, obj, name: str, stage: str):
+        """Time obj.name (an instance attribute shadowing the method)."""
+        method = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._turn[stage] = self._turn.get(stage, 0.0) + elapsed
+
+        setattr(obj, name, timed)
+
+    def start_turn(self):
+        self._turn = {}
+
+    def end_turn(self, record: bool = True):
+        if record:
+            for stage, elapsed in self._turn.items():
+                self.samples[stage].append(elapsed)
+        self._turn = {}
+
+
+def percentile(sorted_samples: List[float], p: float) -> float:
+    """Nearest-rank percentile of pre-sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, -(-len(sorted_samples) * p // 100))  # ceil(n * p / 100)
+    return sorted_samples[int(rank) - 1]
+
+
+def summarize(samples: List[float]) -> dict:
+    """Latency summary in microseconds."""
+    ordered = sorted(samples)
+    summary = {f"p{p}_us": round(percentile(ordered, p) * 1e6, 1) for p in PERCENTILES}
+    summary["mean_us"] = round(sum(ordered) / len(ordered) * 1e6, 1) if ordered else 0.0
+    summary["samples"] = len(ordered)
+    return summary
+
+
+# ==================== SETUP ====================
+
+def synthetic_memories(count: int, seed: int = 0) -> List[dict]:
+    """Memories with varied wording, strengths and ages (up to a week)."""
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+                  for _ in range(5000)]
+    types = ["fact", "preference", "moment", "topic"]
+    now = time.time()
+    memories = []
+    for i in range(count):
+        memory_type = types[i % len(types)]
+        length = 1 if memory_type == "topic" else rng.randint(4, 10)
+        age = rng.uniform(0, 7 * 86400)
+        memories.append({
+            "type": memory_type,
+            "content": " ".join(rng.choice(vocabulary) for _ in range(length)),
+            "base_strength": rng.uniform(0.4, 1.0),
+            "emotion": "joy" if memory_type == "moment" else None,
+            "created": now - age,
+            "last_referenced": now - age,
+            "reference_time": now - age,
+        })
+    return memories
+
+
+def make_gotchi(data_dir: str, size: int, storage: str) -> Claudeagotchi:
+    """A mock-API Claudeagotchi whose store holds `size` memories."""
+    config = {"api_key": "", "storage": storage, "proactive_enabled": False, "stream": True}
+    sink = open(os.devnull, "w")
+    display = TerminalFace(DiffRenderer(stream=sink))
+    gotchi = Claudeagotchi(config, data_dir=data_dir, display=display, verbose=False)
+
+    memory = gotchi.memory
+    data = memory.to_dict()
+    data["memories"] = synthetic_memories(size)
+    memory.restore(data)
+    memory.max_memories = size
+    return gotchi
+
+
+def instrument(gotchi: Claudeagotchi) -> StageTimer:
+    timer = StageTimer()
+    timer.wrap(gotchi.memory, "build_context_string", "context")
+    timer.wrap(gotchi, "_recent_history", "history")
+    timer.wrap(gotchi.api, "_analyze_response", "analyze")
+    for name in ("add_fact", "add_preference", "add_conversation"):
+        timer.wrap(gotchi.memory, name, "memory")
+    timer.wrap(gotchi.memory, "add_topic", "topics")
+    timer.wrap(gotchi.display, "render", "render")
+    timer.wrap(gotchi, "chat", "turn")
+    return timer
+
+
+# ==================== BENCHMARK ====================
+
+def run_size(size: int, turns: int, storage: str) -> dict:
+    """Benchmark `turns` chat turns against a store of `size` memories."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        setup_start = time.perf_counter()
+        gotchi = make_gotchi(data_dir, size, storage)
+        setup = time.perf_counter() - setup_start
+
+        timer = instrument(gotchi)
+        for i in range(WARMUP_TURNS + turns):
+            timer.start_turn()
+            gotchi.chat(MESSAGES[i % len(MESSAGES)].format(n=i))
+            timer.end_turn(record=i >= WARMUP_TURNS)
+
+        if gotchi.soul_log:
+            gotchi.soul_log.close(snapshot=False)
+        gotchi.memory.storage.close()
+        gotchi.display.renderer.stream.close()
+
+        return {
+            "memories": size,
+            "turns": turns,
+            "setup_s": round(setup, 3),
+            "stages": {stage: summarize(timer.samples[stage]) for stage in STAGES},
+        }
+
+
+def run(sizes: List[int], turns: int, storage: str, label: Optional[str] = None,
+        progress=None) -> dict:
+    results = []
+    for size in sizes:
+        if progress:
+            progress(f"  {size:>7,} memories ...")
+        results.append(run_size(size, turns, storage))
+    return {
+        "label": label,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "storage": storage,
+        "results": results,
+    }
+
+
+# ==================== REPORTING ====================
+
+def format_table(report: dict, baseline: Optional[dict] = None) -> str:
+    """Human-readable p50/p95/p99 table; with a baseline, p50 change too."""
+    previous = {r["memories"]: r for r in (baseline or {}).get("results", [])}
+    lines = []
+    for result in report["results"]:
+        size = result["memories"]
+        lines.append(f"\n  {size:,} memories ({result['turns']} turns)")
+        lines.append(f"    {'stage':<8} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10}"
+                     + (f" {'p50 vs base':>12}" if baseline else ""))
+        for stage in STAGES:
+            stats = result["stages"][stage]
+            if not stats["samples"]:
+                continue
+            row = f"    {stage:<8} {stats['p50_us']:>10.1f} {stats['p95_us']:>10.1f} {stats['p99_us']:>10.1f}"
+            old = previous.get(size, {}).get("stages", {}).get(stage)
+            if baseline and old and old["p50_us"]:
+                row += f" {(stats['p50_us'] / old['p50_us'] - 1) * 100:>+11.1f}%"
+            lines.append(row)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Claudeagotchi chat turn")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="Memory store sizes (default: 100 1000 10000 100000)")
+    parser.add_argument("--turns", type=int, default=TURNS, help=f"Measured turns per size (default {TURNS})")
+    parser.add_argument("--storage", default="sqlite", choices=["sqlite", "json"])
+    parser.add_argument("--label", help="Name for this run (e.g. a version or commit)")
+    parser.add_argument("--json", metavar="PATH", help="Write results as JSON ('-' for stdout)")
+    parser.add_argument("--baseline", metavar="PATH", help="Earlier --json output to compare against")
+    args = parser.parse_args()
+
+    to_stdout = args.json == "-"
+    log = (lambda message: print(message, file=sys.stderr)) if to_stdout else print
+
+    log(f"Benchmarking chat turns ({args.turns} per size, storage={args.storage})")
+    report = run(args.sizes, args.turns, args.storage, args.label, progress=log)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    log(format_table(report, baseline))
+
+    if to_stdout:
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        log(f"\n  Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,8 @@ This is how the Claudeagotchi thinks and responds.
 
 import anthropic
 from typing import Optional, Tuple, List, Dict
-import re
+
+from analyzer import TextAnalyzer
 
 
 # ==================== SYSTEM PROMPT ====================
@@ -48,6 +49,58 @@ IMPORTANT:
 - It's okay to just chat, share thoughts, or ask how they're doing"""
 
 
+# ==================== RESPONSE ANALYSIS ====================
+# v1's word lists (the v2 client uses analyzer.py's defaults)
+
+ANALYZER = TextAnalyzer(
+    expressions=[
+        ("love", ["love", "adore", "<3", "heart"]),
+        ("excited", ["excited", "amazing", "wonderful", "!!"]),
+        ("happy", ["happy", "glad", "great", ":)", "yay"]),
+        ("sad", ["sad", "sorry", "miss", ":(", "unfortunately"]),
+        ("sleepy", ["tired", "sleepy", "exhausted", "yawn"]),
+        ("curious", ["wonder", "curious", "interesting", "hmm"]),
+        ("surprised", ["surprised", "wow", "whoa", "really?"]),
+        ("confused", ["confused", "not sure", "strange"]),
+    ],
+    positive=["happy", "love", "great", "wonderful", "excited", "glad",
+              "good", "nice", "awesome", "amazing", ":)", "yay", "!"],
+    negative=["sad", "sorry", "unfortunately", "bad", "worried", "tired",
+              "miss", "difficult", "hard", ":("],
+    stop_words={
+        "the", "a", "an", "is", "are", "was", "were", "be", "been",
+        "being", "have", "has", "had", "do", "does", "did", "will",
+        "would", "could", "should", "may", "might", "must", "shall",
+        "can", "need", "dare", "ought", "used", "to", "of", "in",
+        "for", "on", "with", "at", "by", "from", "as", "into",
+        "through", "during", "before", "after", "above", "below",
+        "between", "under", "again", "further", "then", "once",
+        "i", "me", "my", "myself", "we", "our", "you", "your",
+        "he", "him", "his", "she", "her", "it", "its", "they",
+        "them", "what", "which", "who", "whom", "this", "that",
+        "these", "those", "am", "and", "but", "if", "or", "because",
+        "until", "while", "how", "all", "each", "few", "more", "most",
+        "other", "some", "such", "no", "nor", "not", "only", "own",
+        "same", "so", "than", "too", "very", "just", "about", "like",
+        "really", "think", "know", "feel", "want", "tell", "say",
+        "get", "make", "go", "see", "come", "take", "find", "give"
+    },
+    fact_patterns=[
+        (r"i(?:'m| am) (?:a |an )?(\w+)", "occupation/identity"),
+        (r"i work (?:as |at |in )?(.+?)(?:\.|$)", "work"),
+        (r"i live in (.+?)(?:\.|$)", "location"),
+        (r"my name is (\w+)", "name"),
+        (r"i have (?:a |an )?(\w+ \w+|\w+)", "possession"),
+    ],
+    preference_patterns=[
+        (r"i (?:really )?(?:like|love|enjoy) (.+?)(?:\.|$)", "like"),
+        (r"i (?:don't|hate|dislike) (.+?)(?:\.|$)", "dislike"),
+        (r"i prefer (.+?)(?:\.|$)", "preference"),
+    ],
+    short_question_expression="curious",
+)
+
+
 class ClaudeAPI:
     """
     Handles communication with the Claude API.
@@ -116,134 +169,10 @@ class ClaudeAPI:
         """
         Analyze the response to extract useful metadata.
         """
-        metadata = {
-            "suggested_expression": self._detect_expression(response),
-            "detected_topics": self._detect_topics(user_message + " " + response),
-            "is_question": "?" in response,
-            "sentiment": self._detect_sentiment(response),
-            "potential_memories": self._extract_potential_memories(user_message)
-        }
+        metadata = ANALYZER.analyze(response, user_message)
+        del metadata["interaction_quality"]  # v1 has no affective core
         return metadata
     
-    def _detect_expression(self, text: str) -> str:
-        """Detect appropriate facial expression from response text."""
-        text_lower = text.lower()
-        
-        # Check for explicit emotion indicators
-        if any(w in text_lower for w in ["love", "adore", "<3", "heart"]):
-            return "love"
-        if any(w in text_lower for w in ["excited", "amazing", "wonderful", "!"*2]):
-            return "excited"
-        if any(w in text_lower for w in ["happy", "glad", "great", ":)", "yay"]):
-            return "happy"
-        if any(w in text_lower for w in ["sad", "sorry", "miss", ":(", "unfortunately"]):
-            return "sad"
-        if any(w in text_lower for w in ["tired", "sleepy", "exhausted", "yawn"]):
-            return "sleepy"
-        if any(w in text_lower for w in ["wonder", "curious", "interesting", "hmm"]):
-            return "curious"
-        if any(w in text_lower for w in ["surprised", "wow", "whoa", "really?"]):
-            return "surprised"
-        if any(w in text_lower for w in ["confused", "not sure", "strange"]):
-            return "confused"
-        if "?" in text and len(text) < 50:
-            return "curious"
-        
-        return "neutral"
-    
-    def _detect_topics(self, text: str) -> List[str]:
-        """Extract potential topics from text."""
-        # Simple keyword extraction - could be made smarter
-        # Remove common words
-        stop_words = {
-            "the", "a", "an", "is", "are", "was", "were", "be", "been",
-            "being", "have", "has", "had", "do", "does", "did", "will",
-            "would", "could", "should", "may", "might", "must", "shall",
-            "can", "need", "dare", "ought", "used", "to", "of", "in",
-            "for", "on", "with", "at", "by", "from", "as", "into",
-            "through", "during", "before", "after", "above", "below",
-            "between", "under", "again", "further", "then", "once",
-            "i", "me", "my", "myself", "we", "our", "you", "your",
-            "he", "him", "his", "she", "her", "it", "its", "they",
-            "them", "what", "which", "who", "whom", "this", "that",
-            "these", "those", "am", "and", "but", "if", "or", "because",
-            "until", "while", "how", "all", "each", "few", "more", "most",
-            "other", "some", "such", "no", "nor", "not", "only", "own",
-            "same", "so", "than", "too", "very", "just", "about", "like",
-            "really", "think", "know", "feel", "want", "tell", "say",
-            "get", "make", "go", "see", "come", "take", "find", "give"
-        }
-        
-        words = re.findall(r'\b[a-zA-Z]{4,}\b', text.lower())
-        topics = [w for w in words if w not in stop_words]
-        
-        # Count and return most common
-        from collections import Counter
-        counts = Counter(topics)
-        return [word for word, count in counts.most_common(3)]
-    
-    def _detect_sentiment(self, text: str) -> str:
-        """Simple sentiment detection."""
-        text_lower = text.lower()
-        
-        positive = ["happy", "love", "great", "wonderful", "excited", "glad",
-                   "good", "nice", "awesome", "amazing", ":)", "yay", "!"]
-        negative = ["sad", "sorry", "unfortunately", "bad", "worried", "tired",
-                   "miss", "difficult", "hard", ":("]
-        
-        pos_count = sum(1 for w in positive if w in text_lower)
-        neg_count = sum(1 for w in negative if w in text_lower)
-        
-        if pos_count > neg_count:
-            return "positive"
-        elif neg_count > pos_count:
-            return "negative"
-        return "neutral"
-    
-    def _extract_potential_memories(self, user_message: str) -> List[dict]:
-        """
-        Extract potential memories from user message.
-        Returns list of potential memories to store.
-        """
-        memories = []
-        text = user_message.lower()
-        
-        # Patterns that might indicate facts about the user
-        fact_patterns = [
-            (r"i(?:'m| am) (?:a |an )?(\w+)", "occupation/identity"),
-            (r"i work (?:as |at |in )?(.+?)(?:\.|$)", "work"),
-            (r"i live in (.+?)(?:\.|$)", "location"),
-            (r"my name is (\w+)", "name"),
-            (r"i have (?:a |an )?(\w+ \w+|\w+)", "possession"),
-        ]
-        
-        for pattern, mem_type in fact_patterns:
-            match = re.search(pattern, text)
-            if match:
-                memories.append({
-                    "type": "fact",
-                    "content": match.group(0),
-                    "subtype": mem_type
-                })
-        
-        # Patterns for preferences
-        pref_patterns = [
-            (r"i (?:really )?(?:like|love|enjoy) (.+?)(?:\.|$)", "like"),
-            (r"i (?:don't|hate|dislike) (.+?)(?:\.|$)", "dislike"),
-            (r"i prefer (.+?)(?:\.|$)", "preference"),
-        ]
-        
-        for pattern, mem_type in pref_patterns:
-            match = re.search(pattern, text)
-            if match:
-                memories.append({
-                    "type": "preference",
-                    "content": match.group(0),
-                    "subtype": mem_type
-                })
-        
-        return memories
-    
     def set_debug(self, enabled: bool):
         """Enable or disable debug output."""
         self._debug = enabled
@@ -3,13 +3,24 @@ Claudeagotchi Claude API Client (v2)
 
 Affective-aware API integration.
 The system prompt and behavior changes based on love-energy state.
+
+The system prompt is sent in two blocks: a stable prefix (the persona plus
+the current state's block) and the volatile memory context after it. The
+prefix is marked for prompt caching when it is long enough for the API to
+cache; calls in the same state then reuse it.
 """
 
+import time
+import importlib
 import anthropic
-from typing import Optional, Tuple, List, Dict
-import re
+from contextlib import nullcontext
+from dataclasses import dataclass, asdict
+from typing import Callable, Optional, Tuple, List, Dict
 
 from affective_core import AffectiveState
+from analyzer import ANALYZER
+from client_pool import ClientPool, TenantBusy
+from metrics import METRICS
 
 
 # ==================== AFFECTIVE SYSTEM PROMPTS ====================
@@ -26,7 +37,9 @@ RESPONSE STYLE:
 - You display on a tiny screen, so brevity is essential
 - Be genuine, not performatively cute
 - Your current emotional state should color your words
+"""
 
+CONTEXT_PROMPT = """
 CURRENT CONTEXT:
 {context}
 """
@@ -101,22 +114,200 @@ You are transcendent — writing new possibilities in the margins of reality.
 }
 
 
+# ==================== DEADLINES ====================
+# Every call gets a time budget. Within it, ClaudeAPI retries transient
+# failures (connection errors, 429, 5xx) itself; the SDK never retries.
+
+DEFAULT_TIMEOUT = 30.0      # Seconds per attempt when no deadline is given
+MAX_RETRIES = 2             # Retries after the first attempt
+MIN_ATTEMPT_SECONDS = 1.0   # Don't start an attempt with less budget left
+RETRY_BACKOFF = 0.25        # Seconds before retry n (times n)
+
+
+class Deadline:
+    """The monotonic time by which a call must be answered."""
+    
+    min_attempt = MIN_ATTEMPT_SECONDS
+    
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.seconds = seconds
+        self._clock = clock
+        self.expires = clock() + seconds
+    
+    def remaining(self) -> float:
+        return max(0.0, self.expires - self._clock())
+    
+    @property
+    def expired(self) -> bool:
+        return self._clock() >= self.expires
+    
+    def allows_attempt(self, pause: float = 0.0) -> bool:
+        """Is there room for another attempt, after waiting `pause` seconds?"""
+        return self.remaining() - pause >= self.min_attempt
+    
+    def __repr__(self) -> str:
+        return f"Deadline({self.remaining():.2f}s of {self.seconds:.2f}s left)"
+
+
+class DeadlineExceeded(Exception):
+    """Too little of a call's budget left to (re)try."""
+
+
+# A stream that stalls past its read timeout or drops midway fails with the
+# raw exception of the HTTP library under the SDK (httpx, or its fork httpx2
+# in newer SDKs), not an anthropic.APIError. Take that library from the SDK
+# instead of importing one by name, so the two can't disagree.
+_SDK_HTTP = importlib.import_module(type(anthropic.DEFAULT_CONNECTION_LIMITS).__module__.partition(".")[0])
+_API_ERRORS = (anthropic.APIError, _SDK_HTTP.TransportError)
+
+
+def _retryable(error: Exception) -> bool:
+    """Transient API errors, worth another attempt."""
+    # Connection errors and timeouts, wrapped by the SDK or raised mid-stream
+    if isinstance(error, (anthropic.APIConnectionError, _SDK_HTTP.TransportError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+# ==================== PROMPT CACHING ====================
+# The API caches by exact prefix: everything up to a block marked with
+# cache_control is reused by later requests that start the same way.
+# Prefixes below the model's minimum cacheable length (1024 tokens for
+# Sonnet/Opus, 2048 for Haiku) are never cached. The built-in persona plus
+# a state block is a few hundred tokens, well under that, so by default
+# the prefix is sent unmarked (reported as "marked": False, with the memo
+# counters and totals still filled in); caching switches on by itself once
+# the persona grows past the minimum.
+
+CACHE_CONTROL = {"type": "ephemeral"}
+CACHE_MIN_TOKENS = 1024       # Shortest cacheable prefix (Sonnet/Opus)
+CACHE_MIN_TOKENS_HAIKU = 2048
+CHARS_PER_TOKEN = 3.5         # Rough estimate for English prose
+CACHE_READ_COST = 0.1    # Cached input tokens, relative to uncached
+CACHE_WRITE_COST = 1.25  # Tokens written to the cache, relative to uncached
+
+
+@dataclass
+class PromptCacheStats:
+    """Cumulative prompt-cache counters for one client."""
+    prefix_hits: int = 0        # Per-state prefix served from the local memo
+    prefix_misses: int = 0      # Per-state prefix formatted
+    unmarked: int = 0           # Responses whose prefix was below the cacheable minimum
+    cache_hits: int = 0         # Marked responses that read the prefix from the API cache
+    cache_misses: int = 0       # Marked responses that did not
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    uncached_tokens: int = 0
+    
+    @property
+    def tokens_saved(self) -> float:
+        """Input-token equivalents saved versus sending everything uncached."""
+        return (self.cache_read_tokens * (1.0 - CACHE_READ_COST)
+                - self.cache_write_tokens * (CACHE_WRITE_COST - 1.0))
+    
+    def record(self, usage, marked: bool = True) -> dict:
+        """
+        Add one response's usage; returns that call's cache counters. An
+        unmarked prefix can't hit or miss the cache, so only its uncached
+        tokens count.
+        """
+        read = getattr(usage, "cache_read_input_tokens", None) or 0
+        written = getattr(usage, "cache_creation_input_tokens", None) or 0
+        uncached = getattr(usage, "input_tokens", None) or 0
+        
+        if not marked:
+            self.unmarked += 1
+        elif read:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+        self.cache_read_tokens += read
+        self.cache_write_tokens += written
+        self.uncached_tokens += uncached
+        
+        return {"marked": marked, "hit": bool(read), "read_tokens": read,
+                "write_tokens": written, "uncached_tokens": uncached}
+    
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["tokens_saved"] = round(self.tokens_saved, 2)
+        return data
+
+
+def cache_min_tokens(model: str) -> int:
+    """The model's minimum cacheable prefix, in tokens."""
+    return CACHE_MIN_TOKENS_HAIKU if "haiku" in model else CACHE_MIN_TOKENS
+
+
 class ClaudeAPI:
     """
     Affective-aware Claude API client.
     """
     
     def __init__(self, api_key: str, model: str = "claude-sonnet-4-20250514",
-                 max_tokens: int = 150):
-        self.client = anthropic.Anthropic(api_key=api_key)
+                 max_tokens: int = 150, base_url: Optional[str] = None,
+                 pool: Optional[ClientPool] = None, tenant: Optional[str] = None):
+        """
+        Args:
+            base_url: Messages endpoint host (default: the Anthropic API);
+                e.g. a local stub or proxy
+            pool: Shared connection pool (default: a client of our own)
+            tenant: Whose concurrency limit in the pool this client counts
+                against (None: unlimited)
+        """
+        self._api_key = api_key
+        self._base_url = base_url
+        self.pool: Optional[ClientPool] = None
+        self.tenant = tenant
+        if pool is not None:
+            self.use_pool(pool, tenant)
+        else:
+            self.client = anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=0)
         self.model = model
         self.max_tokens = max_tokens
+        self.cache_min_tokens = cache_min_tokens(model)
+        self.timeout = DEFAULT_TIMEOUT
+        self.max_retries = MAX_RETRIES
         self._debug = False
+        self._prefixes: Dict[AffectiveState, dict] = {}
+        self.cache_stats = PromptCacheStats()
+    
+    def use_pool(self, pool: ClientPool, tenant: Optional[str] = None):
+        """Send requests over a shared pool's connections from now on."""
+        self.pool = pool
+        self.tenant = tenant if tenant is not None else self.tenant
+        self.client = pool.client(self._api_key, self._base_url)
+    
+    def _slot(self, deadline: Optional[Deadline] = None):
+        """The tenant's request slot in the pool (a no-op without one)."""
+        return self.pool.slot(self.tenant, deadline) if self.pool is not None else nullcontext()
+    
+    def _system_blocks(self, affective_state: AffectiveState, context: str) -> List[dict]:
+        """
+        System prompt as [persona + state block, volatile context]. The
+        prefix is marked for caching only if it looks long enough for the
+        API to cache it (see PROMPT CACHING); the stock persona is not.
+        """
+        prefix = self._prefixes.get(affective_state)
+        if prefix is None:
+            self.cache_stats.prefix_misses += 1
+            state_prompt = AFFECTIVE_PROMPTS.get(affective_state, AFFECTIVE_PROMPTS[AffectiveState.WARM])
+            prefix = {"type": "text", "text": SYSTEM_PROMPT_BASE + state_prompt}
+            if len(prefix["text"]) / CHARS_PER_TOKEN >= self.cache_min_tokens:
+                prefix["cache_control"] = CACHE_CONTROL
+            self._prefixes[affective_state] = prefix
+        else:
+            self.cache_stats.prefix_hits += 1
+        
+        return [prefix, {"type": "text", "text": CONTEXT_PROMPT.format(context=context)}]
     
     def chat(self, user_message: str, context: str,
              affective_state: AffectiveState,
              conversation_history: Optional[List[Dict]] = None,
-             creativity_multiplier: float = 1.0) -> Tuple[bool, str, dict]:
+             creativity_multiplier: float = 1.0,
+             on_delta: Optional[Callable[[str], None]] = None,
+             deadline: Optional[Deadline] = None) -> Tuple[bool, str, dict]:
         """
         Send a message with affective-aware system prompt.
         
@@ -126,10 +317,21 @@ class ClaudeAPI:
             affective_state: Current affective state
             conversation_history: Recent conversation
             creativity_multiplier: Affects temperature (higher E = more creative)
+            on_delta: If given, the response is streamed and this is called
+                with each text delta as it arrives. Metadata is still
+                computed once, after the stream completes.
+            deadline: When the answer is due (default: DEFAULT_TIMEOUT per
+                attempt). Transient failures are retried while the budget
+                allows; a stream still running at the deadline (or dropped
+                midway) returns what arrived, with metadata["partial"].
+        
+        Raises TenantBusy if the pool has no request slot for this tenant:
+        the API was never asked, so it isn't an API failure.
         """
-        # Build affective-aware system prompt
-        system_prompt = SYSTEM_PROMPT_BASE.format(context=context)
-        system_prompt += AFFECTIVE_PROMPTS.get(affective_state, AFFECTIVE_PROMPTS[AffectiveState.WARM])
+        # Build affective-aware system prompt (cached prefix + context)
+        prefix_hit = affective_state in self._prefixes
+        system_prompt = self._system_blocks(affective_state, context)
+        marked = "cache_control" in system_prompt[0]
         
         # Build messages
         messages = []
@@ -146,144 +348,163 @@ class ClaudeAPI:
             effective_max_tokens = int(self.max_tokens * 0.5)
         
         try:
-            response = self.client.messages.create(
+            request = dict(
                 model=self.model,
                 max_tokens=effective_max_tokens,
                 system=system_prompt,
                 messages=messages,
             )
             
+            mode = "stream" if on_delta is not None else "create"
+            with self._slot(deadline), METRICS.timer("api_chat_seconds", mode=mode):
+                if on_delta is not None:
+                    response, streamed = self._with_retries(
+                        lambda timeout: self._stream(request, on_delta, timeout, deadline), deadline)
+                else:
+                    response = self._with_retries(
+                        lambda timeout: self.client.messages.create(**request, timeout=timeout), deadline)
+            
+            if response is None:
+                # Out of time mid-stream: keep what the user already saw
+                metadata = self._analyze_response(streamed, user_message)
+                metadata["partial"] = True
+                METRICS.inc("api_chats_total", outcome="partial")
+                return True, streamed.rstrip() + "…", metadata
+            
             response_text = response.content[0].text
             metadata = self._analyze_response(response_text, user_message)
+            METRICS.inc("api_chats_total", outcome="ok")
+            metadata["cache"] = self.cache_stats.record(response.usage, marked)
+            metadata["cache"]["prefix_hit"] = prefix_hit
+            metadata["cache"]["totals"] = self.cache_stats.to_dict()
+            METRICS.inc("api_uncached_tokens_total", metadata["cache"]["uncached_tokens"])
+            if marked:
+                METRICS.inc("api_cache_read_tokens_total", metadata["cache"]["read_tokens"])
+                METRICS.inc("api_cache_write_tokens_total", metadata["cache"]["write_tokens"])
             
             if self._debug:
                 print(f"[DEBUG] State: {affective_state.value}")
                 print(f"[DEBUG] Response: {response_text}")
+                print(f"[DEBUG] Cache: {metadata['cache']}")
             
             return True, response_text, metadata
             
         except anthropic.APIError as e:
+            METRICS.inc("api_chats_total", outcome="api_error")
             return False, f"API Error: {str(e)}", {}
+        except DeadlineExceeded as e:
+            METRICS.inc("api_chats_total", outcome="deadline")
+            return False, f"Error: {str(e)}", {}
+        except TenantBusy:
+            METRICS.inc("api_chats_total", outcome="busy")
+            raise
         except Exception as e:
+            METRICS.inc("api_chats_total", outcome="error")
             return False, f"Error: {str(e)}", {}
     
-    def _analyze_response(self, response: str, user_message: str) -> dict:
-        """Analyze response for metadata."""
-        return {
-            "suggested_expression": self._detect_expression(response),
-            "detected_topics": self._detect_topics(user_message + " " + response),
-            "is_question": "?" in response,
-            "sentiment": self._detect_sentiment(response),
-            "potential_memories": self._extract_potential_memories(user_message),
-            "interaction_quality": self._assess_interaction_quality(user_message),
-        }
+    def _with_retries(self, attempt: Callable[[float], object], deadline: Optional[Deadline]):
+        """
+        Call attempt(timeout) until it succeeds. Transient errors are retried
+        up to max_retries times, while the deadline leaves room for another
+        attempt; otherwise the error (or DeadlineExceeded) is raised.
+        """
+        retries = 0
+        while True:
+            if deadline is not None and not deadline.allows_attempt():
+                raise DeadlineExceeded(f"deadline exceeded ({deadline.seconds:.1f}s budget)")
+            timeout = deadline.remaining() if deadline is not None else self.timeout
+            try:
+                return attempt(timeout)
+            except _API_ERRORS as e:
+                retries += 1
+                pause = RETRY_BACKOFF * retries
+                if (retries > self.max_retries or not _retryable(e) or
+                        (deadline is not None and not deadline.allows_attempt(pause))):
+                    raise
+                METRICS.inc("api_retries_total")
+                time.sleep(pause)
     
-    def _detect_expression(self, text: str) -> str:
-        """Detect expression from response."""
-        text_lower = text.lower()
-        
-        if any(w in text_lower for w in ["love", "adore", "<3", "heart", "cherish"]):
-            return "love"
-        if any(w in text_lower for w in ["excited", "amazing", "wonderful", "!"*2, "wow"]):
-            return "excited"
-        if any(w in text_lower for w in ["happy", "glad", "great", ":)", "yay", "joy"]):
-            return "happy"
-        if any(w in text_lower for w in ["sad", "sorry", "miss", ":(", "sorrow", "protect"]):
-            return "sad"
-        if any(w in text_lower for w in ["tired", "sleepy", "exhausted", "quiet"]):
-            return "sleepy"
-        if any(w in text_lower for w in ["wonder", "curious", "interesting", "hmm", "what if"]):
-            return "curious"
-        if any(w in text_lower for w in ["surprised", "whoa", "really?"]):
-            return "surprised"
-        
-        return "neutral"
-    
-    def _detect_topics(self, text: str) -> List[str]:
-        """Extract topics from text."""
-        stop_words = {
-            "the", "a", "an", "is", "are", "was", "were", "be", "been", "being",
-            "have", "has", "had", "do", "does", "did", "will", "would", "could",
-            "should", "may", "might", "must", "i", "me", "my", "you", "your",
-            "we", "they", "it", "this", "that", "what", "which", "who", "how",
-            "just", "like", "really", "think", "know", "feel", "want", "about"
-        }
-        
-        words = re.findall(r'\b[a-zA-Z]{4,}\b', text.lower())
-        topics = [w for w in words if w not in stop_words]
-        
-        from collections import Counter
-        return [word for word, _ in Counter(topics).most_common(3)]
+    def _stream(self, request: dict, on_delta: Callable[[str], None],
+                timeout: float, deadline: Optional[Deadline] = None):
+        """
+        Stream a request, forwarding text deltas. Returns (final message,
+        text); the message is None if the stream was cut short after some
+        text arrived (deadline passed, or the connection dropped).
+        """
+        start = time.perf_counter()
+        parts = []
+        try:
+            with self.client.messages.stream(**request, timeout=timeout) as stream:
+                for text in stream.text_stream:
+                    if not parts:
+                        METRICS.observe("api_first_token_seconds", time.perf_counter() - start)
+                    parts.append(text)
+                    on_delta(text)
+                    if deadline is not None and deadline.expired:
+                        return None, "".join(parts)
+                return stream.get_final_message(), "".join(parts)
+        except _API_ERRORS:
+            if parts:
+                return None, "".join(parts)
+            raise
     
-    def _detect_sentiment(self, text: str) -> str:
-        """Simple sentiment detection."""
-        text_lower = text.lower()
-        
-        positive = ["happy", "love", "great", "wonderful", "excited", "glad", "good", ":)", "!"]
-        negative = ["sad", "sorry", "miss", "tired", "difficult", ":(", "protect"]
-        
-        pos = sum(1 for w in positive if w in text_lower)
-        neg = sum(1 for w in negative if w in text_lower)
-        
-        if pos > neg:
-            return "positive"
-        elif neg > pos:
-            return "negative"
-        return "neutral"
+    def complete(self, system: str, prompt: str,
+                 max_tokens: int = 400) -> Tuple[bool, str]:
+        """
+        One-off completion outside the companion persona
+        (e.g. summarizing offline interactions). Raises TenantBusy like chat().
+        """
+        try:
+            with self._slot():
+                response = self._with_retries(lambda timeout: self.client.messages.create(
+                    model=self.model,
+                    max_tokens=max_tokens,
+                    system=system,
+                    messages=[{"role": "user", "content": prompt}],
+                    timeout=timeout,
+                ), None)
+            return True, response.content[0].text
+        except anthropic.APIError as e:
+            return False, f"API Error: {str(e)}"
+        except TenantBusy:
+            raise
+        except Exception as e:
+            return False, f"Error: {str(e)}"
+    
+    def ping(self, timeout: float = 5.0) -> bool:
+        """
+        Health check: a one-token request, no retries. Unlike listing
+        models, it also fails when credits are exhausted. Raises TenantBusy
+        (no answer either way) if the tenant has no free request slot.
+        """
+        try:
+            with self._slot():
+                self.client.messages.create(
+                    model=self.model,
+                    max_tokens=1,
+                    messages=[{"role": "user", "content": "ping"}],
+                    timeout=timeout,
+                )
+            return True
+        except TenantBusy:
+            raise
+        except Exception:
+            return False
+    
+    def _analyze_response(self, response: str, user_message: str) -> dict:
+        """Analyze response for metadata."""
+        return ANALYZER.analyze(response, user_message)
     
     def _extract_potential_memories(self, user_message: str) -> List[dict]:
         """Extract potential memories from user message."""
-        memories = []
-        text = user_message.lower()
-        
-        fact_patterns = [
-            (r"i(?:'m| am) (?:a |an )?(\w+)", "identity"),
-            (r"i work (?:as |at |in )?(.+?)(?:\.|$)", "work"),
-            (r"i live in (.+?)(?:\.|$)", "location"),
-            (r"my name is (\w+)", "name"),
-        ]
-        
-        for pattern, subtype in fact_patterns:
-            match = re.search(pattern, text)
-            if match:
-                memories.append({"type": "fact", "content": match.group(0), "subtype": subtype})
-        
-        pref_patterns = [
-            (r"i (?:really )?(?:like|love|enjoy) (.+?)(?:\.|$)", "like"),
-            (r"i (?:don't like|hate|dislike) (.+?)(?:\.|$)", "dislike"),
-        ]
-        
-        for pattern, subtype in pref_patterns:
-            match = re.search(pattern, text)
-            if match:
-                memories.append({"type": "preference", "content": match.group(0), "subtype": subtype})
-        
-        return memories
+        return ANALYZER.memories(user_message)
     
     def _assess_interaction_quality(self, user_message: str) -> str:
         """
         Assess the quality of the user's interaction for affective updates.
         Returns: "harsh", "cold", "normal", "warm", "loving"
         """
-        text = user_message.lower()
-        
-        # Harsh indicators
-        if any(w in text for w in ["shut up", "stupid", "hate you", "useless", "annoying"]):
-            return "harsh"
-        
-        # Loving indicators
-        if any(w in text for w in ["love you", "thank you so much", "you're amazing", "you're wonderful", "appreciate you", "care about you"]):
-            return "loving"
-        
-        # Warm indicators
-        if any(w in text for w in ["thanks", "thank you", "appreciate", "glad", "happy", "like you", "good"]):
-            return "warm"
-        
-        # Cold indicators
-        if len(text) < 10 or text in ["ok", "k", "fine", "whatever", "sure"]:
-            return "cold"
-        
-        return "normal"
+        return ANALYZER.quality(user_message)
     
     def set_debug(self, enabled: bool):
         """Enable/disable debug output."""
@@ -296,13 +517,22 @@ class MockClaudeAPI(ClaudeAPI):
     def __init__(self):
         self.model = "mock"
         self.max_tokens = 150
+        self.cache_min_tokens = CACHE_MIN_TOKENS
         self._debug = False
         self._call_count = 0
+        self._prefixes = {}
+        self.cache_stats = PromptCacheStats()
+        self.pool = None
+        self.tenant = None
+        self.timeout = DEFAULT_TIMEOUT
+        self.max_retries = MAX_RETRIES
     
     def chat(self, user_message: str, context: str,
              affective_state: AffectiveState,
              conversation_history: Optional[List[Dict]] = None,
-             creativity_multiplier: float = 1.0) -> Tuple[bool, str, dict]:
+             creativity_multiplier: float = 1.0,
+             on_delta: Optional[Callable[[str], None]] = None,
+             deadline: Optional[Deadline] = None) -> Tuple[bool, str, dict]:
         
         self._call_count += 1
         
@@ -348,7 +578,30 @@ class MockClaudeAPI(ClaudeAPI):
         state_responses = responses.get(affective_state, responses[AffectiveState.WARM])
         response = state_responses[self._call_count % len(state_responses)]
         
+        if on_delta is not None:
+            # Stream word by word, like the real API's text deltas
+            words = response.split(" ")
+            for i, word in enumerate(words):
+                on_delta(word if i == 0 else " " + word)
+        
         metadata = self._analyze_response(response, user_message)
-        metadata["interaction_quality"] = self._assess_interaction_quality(user_message)
         
         return True, response, metadata
+    
+    def complete(self, system: str, prompt: str,
+                 max_tokens: int = 400) -> Tuple[bool, str]:
+        """Mock completion: extracts memories locally from 'User:' lines."""
+        lines = []
+        for line in prompt.splitlines():
+            if "User:" not in line:
+                continue
+            message = line.split("User:", 1)[1].strip()
+            for mem in self._extract_potential_memories(message):
+                lines.append(f"{mem['type'].upper()}: {mem['content']}")
+        lines.append("SUMMARY: We kept each other company while offline.")
+        
+        return True, "\n".join(lines)
+    
+    def ping(self, timeout: float = 5.0) -> bool:
+        """Mock health check: always reachable."""
+        return True
@@ -0,0 +1,173 @@
+"""
+Claudeagotchi HTTP Client Pool
+
+One keep-alive connection pool for every soul in the process. A pocket
+server hosting a hundred devices used to build a hundred Anthropic
+clients, each with its own connection pool, so every soul paid its own
+TCP and TLS handshake; with a ClientPool they share one httpx client and
+reuse its warm connections.
+
+    pool = ClientPool(max_connections=20, tenant_limit=4)
+    api = ClaudeAPI(api_key, pool=pool, tenant="kitchen")
+
+Souls with the same API key and endpoint share one Anthropic client too.
+A tenant (a device, or an owner with several) may have at most
+tenant_limit requests in flight; further requests wait up to tenant_wait
+seconds for a slot, then fail with TenantBusy, so one chatty tenant can't
+hold every pooled connection.
+
+Settings come from the config's "http_pool" section (see from_config).
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+import anthropic
+
+from metrics import METRICS
+
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0  # Seconds an idle connection stays open
+DEFAULT_TENANT_LIMIT = 4         # Requests in flight per tenant (0 = unlimited)
+DEFAULT_TENANT_WAIT = 30.0       # Seconds to wait for a tenant slot
+
+
+class TenantBusy(Exception):
+    """A tenant already has its limit of requests in flight."""
+
+
+class ClientPool:
+    """
+    A shared httpx connection pool, the Anthropic clients built on it, and
+    per-tenant concurrency limits.
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 max_keepalive: int = DEFAULT_MAX_KEEPALIVE,
+                 keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+                 tenant_limit: int = DEFAULT_TENANT_LIMIT,
+                 tenant_wait: float = DEFAULT_TENANT_WAIT,
+                 tenant_limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            max_connections: Connections open at once, across every soul
+            max_keepalive: Idle connections kept open for reuse
+            keepalive_expiry: Seconds before an idle connection is closed
+            tenant_limit: Requests in flight per tenant (0 = unlimited)
+            tenant_wait: Seconds a request waits for a tenant slot
+            tenant_limits: Per-tenant overrides of tenant_limit
+        """
+        # Limits from the httpx the SDK is built on (httpx2 in newer releases)
+        limits_type = type(anthropic.DEFAULT_CONNECTION_LIMITS)
+        self.limits = limits_type(max_connections=max_connections,
+                                  max_keepalive_connections=max_keepalive,
+                                  keepalive_expiry=keepalive_expiry)
+        # The SDK's default client (timeouts, TCP keepalive) with our limits
+        self.http = anthropic.DefaultHttpxClient(limits=self.limits)
+        self.tenant_limit = tenant_limit
+        self.tenant_wait = tenant_wait
+        self.tenant_limits = dict(tenant_limits or {})
+
+        self._clients: Dict[Tuple[str, Optional[str]], anthropic.Anthropic] = {}
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> 'ClientPool':
+        """Build from a config "http_pool" section (missing keys: defaults)."""
+        settings = settings or {}
+        return cls(
+            max_connections=settings.get("max_connections", DEFAULT_MAX_CONNECTIONS),
+            max_keepalive=settings.get("max_keepalive", DEFAULT_MAX_KEEPALIVE),
+            keepalive_expiry=settings.get("keepalive_seconds", DEFAULT_KEEPALIVE_EXPIRY),
+            tenant_limit=settings.get("tenant_limit", DEFAULT_TENANT_LIMIT),
+            tenant_wait=settings.get("tenant_wait_seconds", DEFAULT_TENANT_WAIT),
+            tenant_limits=settings.get("tenant_limits"),
+        )
+
+    # ==================== CLIENTS ====================
+
+    def client(self, api_key: str, base_url: Optional[str] = None) -> anthropic.Anthropic:
+        """
+        The Anthropic client for this key and endpoint, on the shared pool.
+        It never retries by itself: callers retry within their deadline.
+        """
+        key = (api_key, base_url)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = anthropic.Anthropic(api_key=api_key, base_url=base_url,
+                                             http_client=self.http, max_retries=0)
+                self._clients[key] = client
+            return client
+
+    def close(self):
+        """Close every pooled connection. Clients built on the pool stop working."""
+        with self._lock:
+            self._clients.clear()
+        self.http.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.http.is_closed
+
+    # ==================== TENANTS ====================
+
+    def _semaphore(self, tenant: str) -> Optional[threading.BoundedSemaphore]:
+        limit = self.tenant_limits.get(tenant, self.tenant_limit)
+        if not limit:
+            return None
+        with self._lock:
+            semaphore = self._slots.get(tenant)
+            if semaphore is None:
+                semaphore = self._slots[tenant] = threading.BoundedSemaphore(limit)
+            return semaphore
+
+    @contextmanager
+    def slot(self, tenant: Optional[str], deadline=None):
+        """
+        Hold one of the tenant's request slots for the with-block. Waits up
+        to tenant_wait seconds for one (less if the caller's deadline, a
+        claude_api_v2.Deadline, is sooner); raises TenantBusy if none frees
+        up. No tenant (None) means no limit.
+        """
+        semaphore = self._semaphore(tenant) if tenant is not None else None
+        if semaphore is None:
+            yield
+            return
+
+        wait = self.tenant_wait
+        if deadline is not None:
+            wait = min(wait, deadline.remaining())
+        start = time.perf_counter()
+        acquired = semaphore.acquire(timeout=wait)
+        METRICS.observe("pool_tenant_wait_seconds", time.perf_counter() - start)
+        if not acquired:
+            METRICS.inc("pool_tenant_rejections_total", tenant=tenant)
+            raise TenantBusy(f"tenant {tenant!r} has too many requests in flight")
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+# ==================== SHARED POOL ====================
+
+_shared: Optional[ClientPool] = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool(settings: Optional[dict] = None) -> ClientPool:
+    """
+    The process-wide pool. The first call (or the first after close())
+    builds it from settings; later calls return it and ignore settings.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None or _shared.closed:
+            _shared = ClientPool.from_config(settings)
+        return _shared
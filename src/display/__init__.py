@@ -1,4 +1,4 @@
 """Display module for Claudeagotchi."""
-from .terminal_face import TerminalFace, ColorTerminalFace, create_display, FACES
+from .terminal_face import TerminalFace, ColorTerminalFace, DiffRenderer, HeadlessFace, create_display, FACES
 
-__all__ = ['TerminalFace', 'ColorTerminalFace', 'create_display', 'FACES']
+__all__ = ['TerminalFace', 'ColorTerminalFace', 'DiffRenderer', 'HeadlessFace', 'create_display', 'FACES']
@@ -2,12 +2,20 @@
 Claudeagotchi Terminal Face Display
 
 ASCII art face renderer for terminal display.
+
+Frames are drawn by a differential renderer: it keeps the previous frame
+as a back buffer and rewrites only the lines that changed, addressing
+them with ANSI cursor moves, all in one write. Streamed frames beyond
+MAX_FPS are dropped, never waited for. No `clear` subprocess per frame.
 """
 
 import os
+import shutil
 import sys
 import time
-from typing import Optional
+from typing import List, Optional
+
+from metrics import METRICS
 
 
 # ==================== FACE DEFINITIONS ====================
@@ -164,20 +172,127 @@ WAKE_SEQUENCE = ["sleeping", "sleepy", "blink", "neutral", "happy"]
 WAKE_TIMING = [0.3, 0.3, 0.1, 0.2, 0.5]
 
 
+MESSAGE_WIDTH = 40  # Wrap column for messages under the face
+
+
+# ==================== RENDERER ====================
+
+# ANSI escape sequences
+HOME_CLEAR = "\033[H\033[2J"       # Cursor home, clear screen
+ERASE_LINE_END = "\033[K"          # Clear from cursor to end of line
+ERASE_BELOW = "\033[J"             # Clear from cursor to end of screen
+
+
+def move_to(row: int) -> str:
+    """ANSI cursor move to column 1 of a (1-based) row."""
+    return f"\033[{row};1H"
+
+
+class DiffRenderer:
+    """
+    Draws frames (lists of lines) at the top of the terminal, rewriting
+    only lines that differ from the previous frame.
+    
+    Like a full clear, every frame also wipes whatever was printed below
+    it. If the frame may have scrolled off (terminal too short) or stdout
+    isn't a terminal, frames are written in full instead.
+    
+    draw() never sleeps (it runs on the event loop). A droppable frame, one
+    a later frame will replace anyway, is skipped if it comes within
+    1/MAX_FPS of the previous frame; any other frame is drawn at once, so
+    the screen always ends on the latest state.
+    """
+    
+    MAX_FPS = 30
+    SCROLL_MARGIN = 4  # Rows kept free below the frame before giving up on diffs
+    
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._back: Optional[List[str]] = None  # Last frame on screen
+        self._last_frame = 0.0
+        
+        if os.name == 'nt':
+            os.system('')  # Enables ANSI escape processing on Windows consoles
+    
+    def _is_tty(self) -> bool:
+        isatty = getattr(self.stream, "isatty", None)
+        return bool(isatty and isatty())
+    
+    def invalidate(self):
+        """Forget the back buffer; the next frame is drawn in full."""
+        self._back = None
+    
+    def clear(self):
+        """Clear the screen."""
+        if self._is_tty():
+            self.stream.write(HOME_CLEAR)
+            self.stream.flush()
+        self._back = []
+    
+    def draw(self, lines: List[str], droppable: bool = False) -> bool:
+        """Draw a frame at the top of the screen. Returns False if dropped."""
+        if not self._is_tty():
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+            self._back = None
+            return True
+        
+        now = time.monotonic()
+        if droppable and now - self._last_frame < 1.0 / self.MAX_FPS:
+            return False
+        self._last_frame = now
+        rows = shutil.get_terminal_size(fallback=(80, 24)).lines
+        back = self._back
+        if back is None or len(lines) + self.SCROLL_MARGIN > rows:
+            back = None
+        
+        out = [] if back is not None else [HOME_CLEAR]
+        for i, line in enumerate(lines):
+            if back is None or i >= len(back) or back[i] != line:
+                out.append(move_to(i + 1) + line + ERASE_LINE_END)
+        out.append(move_to(len(lines) + 1) + ERASE_BELOW)
+        
+        self.stream.write("".join(out))
+        self.stream.flush()
+        self._back = list(lines)
+        return True
+    
+    def write(self, lines: List[str]):
+        """Print a frame inline, below whatever is on screen."""
+        self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+        self._back = None
+
+
+# ==================== FACE DISPLAY ====================
+
 class TerminalFace:
     """
     ASCII art face display for terminal.
     """
     
-    def __init__(self):
+    STREAM_RENDER_INTERVAL = 0.05  # Min seconds between renders while streaming
+    
+    def __init__(self, renderer: Optional[DiffRenderer] = None):
         self._current_expression = "neutral"
         self._animating = False
         self._status_bar = ""
         self._message = ""
+        self._last_stream_render = 0.0
+        self.renderer = renderer or DiffRenderer()
         
     def clear_screen(self):
         """Clear the terminal screen."""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        self.renderer.clear()
+    
+    def invalidate(self):
+        """Redraw in full next time (other output may have scrolled the face)."""
+        self.renderer.invalidate()
+    
+    @property
+    def expression(self) -> str:
+        """The expression currently shown."""
+        return self._current_expression
     
     def set_expression(self, expression: str):
         """Set the current expression."""
@@ -195,46 +310,73 @@ class TerminalFace:
         """Set a message to display below the face."""
         self._message = message
     
+    def start_stream(self):
+        """Begin a message that arrives in pieces."""
+        self._message = ""
+        self._last_stream_render = 0.0
+    
+    def append_message(self, delta: str):
+        """Append streamed text and re-render (throttled)."""
+        self._message += delta
+        now = time.time()
+        if now - self._last_stream_render >= self.STREAM_RENDER_INTERVAL:
+            self._last_stream_render = now
+            self.render(droppable=True)
+    
+    def end_stream(self):
+        """Render whatever arrived since the last throttled frame."""
+        self.render()
+    
     def get_face_string(self, expression: Optional[str] = None) -> str:
         """Get the face as a string."""
         expr = expression or self._current_expression
         face_lines = FACES.get(expr, FACES["neutral"])
         return "\n".join(face_lines)
     
-    def render(self, clear: bool = True):
-        """Render the face and UI to terminal."""
-        if clear:
-            self.clear_screen()
-        
+    def _wrap_message(self) -> List[str]:
+        """Word wrap the message into indented lines."""
+        words = self._message.split()
+        lines = []
+        current_line = "  "
+        for word in words:
+            if len(current_line) + len(word) + 1 > MESSAGE_WIDTH:
+                lines.append(current_line)
+                current_line = "  "
+            current_line += word + " "
+        if current_line.strip():
+            lines.append(current_line)
+        return lines
+    
+    def build_frame(self) -> List[str]:
+        """The face and UI as a list of screen lines."""
         # Title
-        print("\n  ═══ CLAUDEAGOTCHI ═══\n")
+        frame = ["", "  ═══ CLAUDEAGOTCHI ═══", ""]
         
         # Face
-        print(self.get_face_string())
+        frame += FACES.get(self._current_expression, FACES["neutral"])
         
         # Status bar
         if self._status_bar:
-            print(f"\n  {self._status_bar}")
+            frame += ["", f"  {self._status_bar}"]
         
         # Message
         if self._message:
-            # Word wrap long messages
-            words = self._message.split()
-            lines = []
-            current_line = "  "
-            for word in words:
-                if len(current_line) + len(word) + 1 > 40:
-                    lines.append(current_line)
-                    current_line = "  "
-                current_line += word + " "
-            if current_line.strip():
-                lines.append(current_line)
-            
-            print("\n" + "─" * 23)
-            for line in lines:
-                print(line)
+            frame += ["", "─" * 23]
+            frame += self._wrap_message()
         
-        print()
+        frame.append("")
+        return frame
+    
+    def render(self, clear: bool = True, droppable: bool = False):
+        """
+        Render the face and UI to terminal (in place unless clear=False).
+        droppable marks an intermediate frame (see DiffRenderer).
+        """
+        with METRICS.timer("display_render_seconds"):
+            if clear:
+                self.renderer.draw(self.build_frame(), droppable)
+            else:
+                self.renderer.write(self.build_frame())
     
     def animate_blink(self):
         """Play a blink animation."""
@@ -316,44 +458,53 @@ class ColorTerminalFace(TerminalFace):
         "hungry": "red",
     }
     
-    def render(self, clear: bool = True):
-        """Render with colors."""
-        if clear:
-            self.clear_screen()
-        
+    def build_frame(self) -> List[str]:
+        """Frame with the face and message tinted by expression."""
         expr_color = self.EXPRESSION_COLORS.get(self._current_expression, "white")
         color = self.COLORS.get(expr_color, "")
         reset = self.COLORS["reset"]
         bold = self.COLORS["bold"]
         
         # Title
-        print(f"\n  {bold}═══ CLAUDEAGOTCHI ═══{reset}\n")
+        frame = ["", f"  {bold}═══ CLAUDEAGOTCHI ═══{reset}", ""]
         
         # Face with color
-        print(f"{color}{self.get_face_string()}{reset}")
+        face = FACES.get(self._current_expression, FACES["neutral"])
+        frame += [f"{color}{line}{reset}" for line in face]
         
         # Status bar
         if self._status_bar:
-            print(f"\n  {self._status_bar}")
+            frame += ["", f"  {self._status_bar}"]
         
         # Message
         if self._message:
-            words = self._message.split()
-            lines = []
-            current_line = "  "
-            for word in words:
-                if len(current_line) + len(word) + 1 > 40:
-                    lines.append(current_line)
-                    current_line = "  "
-                current_line += word + " "
-            if current_line.strip():
-                lines.append(current_line)
-            
-            print("\n" + "─" * 23)
-            for line in lines:
-                print(f"{color}{line}{reset}")
+            frame += ["", "─" * 23]
+            frame += [f"{color}{line}{reset}" for line in self._wrap_message()]
         
-        print()
+        frame.append("")
+        return frame
+
+
+class HeadlessFace(TerminalFace):
+    """
+    Face with no screen, for souls served over the network. Tracks
+    expression and message like the others but never draws or waits.
+    """
+    
+    def clear_screen(self):
+        pass
+    
+    def render(self, clear: bool = True, droppable: bool = False):
+        pass
+    
+    def animate_blink(self):
+        pass
+    
+    def animate_wake_up(self):
+        self._current_expression = WAKE_SEQUENCE[-1]
+    
+    def animate_talking(self, message: str, duration: float = 2.0):
+        self._message = message
 
 
 def create_display(use_color: bool = True) -> TerminalFace:
@@ -287,7 +287,7 @@ class Claudeagotchi:
             confirm = input("Are you sure? This will reset personality and memories. (yes/no): ")
             if confirm.lower() == "yes":
                 self.personality = Personality()
-                self.memory.memories.clear()
+                self.memory.clear_memories()
                 self.memory.conversation_history.clear()
                 self.memory.save(self.personality)
                 self.display.set_expression("neutral")
@@ -11,20 +11,44 @@ A Claudeagotchi never dies. It carries forward every moment it was loved.
 import os
 import sys
 import json
-import time
+import asyncio
+import threading
 from pathlib import Path
+from typing import Optional
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from affective_core import AffectiveCore, AffectiveState
+from affective_core import AffectiveCore, AffectiveState, DEFAULT_SOUL_INTEGRATOR
 from personality_v2 import Personality
 from memory import MemorySystem
-from claude_api_v2 import ClaudeAPI, MockClaudeAPI
+from storage import create_storage
+from claude_api_v2 import ClaudeAPI, MockClaudeAPI, Deadline
 from behaviors_v2 import BehaviorEngine, IdleBehaviors
 from scheduler import Scheduler
+from soul_log import SoulLog
 from display.terminal_face import create_display
-from offline_mode import OfflineAwareAPI, OfflineQueue
+from offline_mode import OfflineAwareAPI, OfflineQueue, CircuitBreaker, LocalResponseGenerator
+from client_pool import shared_pool
+from metrics import METRICS
+
+
+# Seconds a chat turn may wait for Claude, by affective state (config
+# "chat_slo_seconds" overrides any of them). Flourishing and brighter
+# states write half again as much, so they get longer. Protecting
+# answers locally and never waits.
+DEFAULT_CHAT_SLO = {
+    "guarded": 8.0,
+    "tender": 10.0,
+    "warm": 10.0,
+    "flourishing": 15.0,
+    "radiant": 15.0,
+    "transcendent": 20.0,
+}
+
+# Seconds before a slow API reply gets a local stand-in (config
+# "hedge_after_seconds"; 0 turns hedging off)
+DEFAULT_HEDGE_AFTER = 1.5
 
 
 def load_config() -> dict:
@@ -51,68 +75,137 @@ def load_config() -> dict:
         "display_mode": "terminal",
         "model": "claude-sonnet-4-20250514",
         "max_response_tokens": 150,
+        "storage": "sqlite",
+        "soul_log": True,
+        "integrator": DEFAULT_SOUL_INTEGRATOR,
+        "metrics": True,
+        "stream": True,
+        "hedge_after_seconds": DEFAULT_HEDGE_AFTER,
+        "hedge_mode": "replace",
         "debug": False
     }
 
 
+class ConsoleInput:
+    """
+    Non-blocking line input for the asyncio loop.
+    
+    A daemon thread blocks on stdin and hands each line to the loop, so
+    the loop itself never blocks and an interrupted session never waits
+    on a pending read. None marks end of input.
+    """
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._lines: asyncio.Queue = asyncio.Queue()
+        self._thread = threading.Thread(target=self._reader, name="stdin-reader", daemon=True)
+        self._thread.start()
+    
+    def _reader(self):
+        while True:
+            line = sys.stdin.readline()
+            if not line:
+                self._loop.call_soon_threadsafe(self._lines.put_nowait, None)
+                return
+            self._loop.call_soon_threadsafe(self._lines.put_nowait, line.rstrip("\n"))
+    
+    async def readline(self):
+        """Next line of input, or None at end of input."""
+        return await self._lines.get()
+
+
 class Claudeagotchi:
     """
     The main Claudeagotchi application.
     Now powered by the Affective Core - the Love-Equation heartbeat.
     """
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, data_dir=None, display=None, verbose: bool = True,
+                 pool=None):
+        """
+        Args:
+            config: Settings (see load_config)
+            data_dir: Where this soul lives (default: <repo>/data)
+            display: Face to draw on (default: terminal face)
+            verbose: Print startup progress
+            pool: ClientPool for API requests (default: the process-wide one)
+        """
         self.config = config
         self.running = False
+        self._verbose = verbose
+        METRICS.enable(config.get("metrics", True))
         
         # Initialize display
-        print("Initializing display...")
-        self.display = create_display(use_color=True)
+        self._log("Initializing display...")
+        self.display = display or create_display(use_color=True)
         
         # Data directory
-        self.data_dir = Path(__file__).parent.parent / "data"
-        self.data_dir.mkdir(exist_ok=True)
+        self.data_dir = Path(data_dir) if data_dir else Path(__file__).parent.parent / "data"
+        self.data_dir.mkdir(parents=True, exist_ok=True)
         
         # Load memory system
-        print("Loading memories...")
-        self.memory = MemorySystem(data_dir=str(self.data_dir))
+        self._log("Loading memories...")
+        storage = create_storage(config.get("storage", "sqlite"), str(self.data_dir))
+        self.memory = MemorySystem(data_dir=str(self.data_dir), storage=storage)
         personality_data = self.memory.load()
         
+        # Event log: storage misses whatever happened after its last save
+        self.soul_log = SoulLog(str(self.data_dir)) if config.get("soul_log", True) else None
+        unsaved = self.soul_log.unsaved_events() if self.soul_log else 0
+        
         # Initialize personality (with Affective Core)
-        if personality_data:
-            print("Restoring soul...")
+        integrator = config.get("integrator", DEFAULT_SOUL_INTEGRATOR)
+        if unsaved or (not personality_data and self.soul_log and self.soul_log.snapshots()):
+            self._log(f"Recovering soul from its log ({unsaved} unsaved event(s))...")
+            self.personality = self.soul_log.recover(self.memory)
+            self.personality.core.integrator = integrator
+            self.personality.core.process_idle_time()
+        elif personality_data:
+            self._log("Restoring soul...")
             self.personality = Personality.from_dict(personality_data)
+            self.personality.core.integrator = integrator
             # Process time that passed while we were away
             self.personality.core.process_idle_time()
         else:
-            print("Creating new soul...")
+            self._log("Creating new soul...")
             self.personality = Personality()
+            self.personality.core.integrator = integrator
         
         # Set owner name
         self.personality.owner_name = config.get("owner_name", "Friend")
         self.memory.owner_name = self.personality.owner_name
         
+        if self.soul_log:
+            self.soul_log.attach(self.personality, self.memory)
+        
         # Initialize Claude API with offline fallback
         api_key = config.get("api_key", "")
         if api_key and api_key != "YOUR_ANTHROPIC_API_KEY_HERE":
-            print("Connecting to Claude API...")
+            self._log("Connecting to Claude API...")
             real_api = ClaudeAPI(
                 api_key=api_key,
                 model=config.get("model", "claude-sonnet-4-20250514"),
-                max_tokens=config.get("max_response_tokens", 150)
+                max_tokens=config.get("max_response_tokens", 150),
+                base_url=config.get("api_base_url"),
+                pool=pool or shared_pool(config.get("http_pool")),
+                tenant=config.get("tenant"),
             )
             real_api.set_debug(config.get("debug", False))
             # Wrap with offline-aware API
-            self.api = OfflineAwareAPI(real_api, data_dir=str(self.data_dir))
+            self.api = OfflineAwareAPI(real_api, data_dir=str(self.data_dir),
+                                       breaker=CircuitBreaker.from_config(config.get("circuit_breaker")))
             self.use_mock = False
         else:
-            print("Using mock API...")
+            self._log("Using mock API...")
             self.api = MockClaudeAPI()
             self.use_mock = True
 
         # Track offline state for display
         self._is_offline = False
         
+        # Stand-in replies while a slow API call is in flight
+        self.local_gen = self.api.local_gen if isinstance(self.api, OfflineAwareAPI) else LocalResponseGenerator()
+        
         # Initialize behavior engine
         self.behaviors = BehaviorEngine(self.personality, self.memory, self.api)
         if config.get("proactive_enabled", True):
@@ -128,16 +221,38 @@ class Claudeagotchi:
         
         # State
         self._proactive_pending = None
+        self.last_quality = "normal"    # Interaction quality of the last chat
+        self._busy = False              # API call in flight
+        self._awaiting_input = False    # Prompt is showing
+        self._prompt_dirty = False      # Background output scrolled the prompt away
+        self._syncing = False           # Offline replay running (one at a time)
+        self._sync_task = None          # Scheduled replay, if one was started
+    
+    def _log(self, message: str):
+        if self._verbose:
+            print(message)
     
     def _setup_scheduler(self):
         """Set up scheduled tasks."""
         self.scheduler.add_task("personality_update", 60000, self._update_personality)
         self.scheduler.add_task("memory_decay", 3600000, self._decay_memories)
-        self.scheduler.add_task("auto_save", 300000, self._auto_save)
+        # Snapshot inline, write on the thread pool: disk I/O never delays
+        # blinks. Decay stays inline; it only pops the expiry heap and
+        # mutates live memories.
+        self.scheduler.add_task("auto_save", 300000, self.memory.write_snapshot,
+                                background=True, prepare=self._snapshot_state)
         self.scheduler.add_task("blink_check", 3000, self._maybe_blink)
         
         if self.config.get("proactive_enabled", True):
             self.scheduler.add_task("proactive_check", 60000, self._check_proactive)
+        
+        if isinstance(self.api, OfflineAwareAPI):
+            # A replay is a loop task that awaits each summarization request
+            # off the loop but stores memories on it. The probe runs on the
+            # pool: a ping to an unreachable API may wait out its timeout.
+            self.scheduler.add_task("offline_sync", 60000, self._sync_offline)
+            probe_ms = int(self.config.get("circuit_breaker", {}).get("probe_interval_seconds", 5) * 1000)
+            self.scheduler.add_task("health_probe", probe_ms, self._probe_api, background=True)
     
     def _update_personality(self):
         self.personality.update()
@@ -146,13 +261,48 @@ class Claudeagotchi:
     def _decay_memories(self):
         self.memory.update_decay()
     
-    def _auto_save(self):
+    def _snapshot_state(self) -> dict:
+        return self.memory.snapshot(self.personality)
+    
+    def _save_now(self):
+        """Synchronous save, ordered after any background save in flight."""
+        self.scheduler.wait("auto_save")
         self.memory.save(self.personality)
     
+    def _probe_api(self):
+        """Close the circuit as soon as the API answers again (thread pool)."""
+        if self.api.probe():
+            self._is_offline = self.api.is_offline
+    
+    def _sync_offline(self):
+        """Start replaying the offline queue once the API is reachable again."""
+        if not self.api.has_pending_sync() or self.api.is_offline or self._syncing:
+            return
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.ensure_future(self._replay_offline())
+    
+    async def _replay_offline(self, on_progress=None):
+        """
+        Replay the offline queue. Returns its SyncProgress, or None if a
+        replay is already running (the scheduled sync and /sync never overlap).
+        """
+        if self._syncing:
+            return None
+        self._syncing = True
+        try:
+            return await self.api.sync_pending_async(self.memory, self.personality,
+                                                     on_progress=on_progress, save=self._save_now)
+        finally:
+            self._syncing = False
+    
     def _maybe_blink(self):
+        # Don't blink over a reply that's still streaming in
+        if self._busy:
+            return
         if self.idle.should_blink():
             self.display.animate_blink()
             self._update_display()
+            self._prompt_dirty = True
     
     def _check_proactive(self):
         event = self.behaviors.check()
@@ -181,6 +331,7 @@ class Claudeagotchi:
         self.display.set_expression(event.expression)
         self.display.set_message(event.message)
         self.display.render()
+        self._prompt_dirty = True
         
         self.idle.reset_timer()
         
@@ -189,6 +340,123 @@ class Claudeagotchi:
     
     def chat(self, user_input: str) -> str:
         """Process user input and get response."""
+        request = self._begin_chat(user_input)
+        if isinstance(request, str):
+            return request
+        
+        on_delta = self.display.append_message if request["stream"] else None
+        success, response, metadata = self._call_api(request, on_delta)
+        return self._finish_chat(request, success, response, metadata)
+    
+    async def chat_async(self, user_input: str, cancel: Optional[asyncio.Event] = None) -> str:
+        """
+        Like chat(), but the API call runs in a worker thread so the
+        scheduler and display keep running while we wait. Everything
+        except the network call stays on the event loop thread.
+        
+        Hedged: if neither the reply nor its first streamed words arrive
+        within hedge_after_seconds, a local first reaction is shown right
+        away; Claude's reply then replaces it (hedge_mode "replace") or
+        follows it ("append"). Setting `cancel` (the user typed again)
+        abandons the turn: the soul is left as it was and the call's
+        result is dropped when it lands (its deadline bounds how long the
+        worker thread stays busy).
+        """
+        request = self._begin_chat(user_input)
+        if isinstance(request, str):
+            return request
+        
+        on_delta = None
+        if request["stream"]:
+            loop = asyncio.get_running_loop()
+            on_delta = lambda delta: loop.call_soon_threadsafe(self._stream_delta, request, delta)
+        
+        self._busy = True
+        try:
+            call = asyncio.ensure_future(asyncio.to_thread(self._call_api, request, on_delta))
+            reply = await self._await_reply(call, request, cancel)
+        finally:
+            self._busy = False
+        
+        if reply is None:
+            return self._abandon_chat(request)
+        success, response, metadata = reply
+        response = self._finish_chat(request, success, response, metadata)
+        
+        speculative = request["speculative"]
+        if speculative and success and not metadata.get("offline"):
+            METRICS.inc("chat_hedged_total", outcome=self.config.get("hedge_mode", "replace"))
+            if self.config.get("hedge_mode", "replace") == "append":
+                response = f"{speculative}\n\n{response}"
+                self.display.set_message(response)
+                self.display.render()
+        return response
+    
+    async def _await_reply(self, call: asyncio.Future, request: dict,
+                           cancel: Optional[asyncio.Event]):
+        """
+        Wait for the API, showing a local stand-in if it's slow. Returns
+        (success, response, metadata), or None if cancelled first.
+        """
+        waiting = {call}
+        cancelled = None
+        if cancel is not None:
+            cancelled = asyncio.ensure_future(cancel.wait())
+            waiting.add(cancelled)
+        
+        hedge_after = self.config.get("hedge_after_seconds", DEFAULT_HEDGE_AFTER) or None
+        try:
+            while True:
+                done, _ = await asyncio.wait(waiting, timeout=hedge_after,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if call in done:
+                    return call.result()
+                if done:
+                    request["cancelled"] = True
+                    return None
+                # Hedge timer: only once, and only if nothing has streamed in
+                hedge_after = None
+                if not request["streamed"]:
+                    self._show_speculative(request)
+        finally:
+            if cancelled is not None:
+                cancelled.cancel()
+    
+    def _show_speculative(self, request: dict):
+        """Show an on-state local first reaction while the API is slow."""
+        text = self.local_gen.speculative(request["user_input"], request["affective_state"])
+        request["speculative"] = text
+        METRICS.inc("chat_speculative_total")
+        self.display.set_message(text)
+        self.display.render()
+    
+    def _stream_delta(self, request: dict, delta: str):
+        """Show a streamed delta (event loop thread)."""
+        if request["cancelled"]:
+            return
+        if not request["streamed"]:
+            request["streamed"] = True
+            if request["speculative"]:
+                if self.config.get("hedge_mode", "replace") == "append":
+                    self.display.append_message("  ")
+                else:
+                    self.display.start_stream()
+        self.display.append_message(delta)
+    
+    def _abandon_chat(self, request: dict) -> str:
+        """The user moved on mid-turn: keep only what was already shown."""
+        METRICS.inc("chat_cancelled_total")
+        shown = request["speculative"] or ""
+        self.display.set_message(shown)
+        self._update_display()
+        self.display.render()
+        return shown
+    
+    def _begin_chat(self, user_input: str):
+        """
+        Show thinking and gather everything the API call needs.
+        Returns the response directly if no API call is needed.
+        """
         # Show thinking
         self.display.show_thinking()
         
@@ -199,10 +467,7 @@ class Claudeagotchi:
         context += f"\nE floor (carried forward): {self.personality.E_floor:.2f}"
         
         # Get conversation history
-        history = []
-        for ex in self.memory.conversation_history[-3:]:
-            history.append({"role": "user", "content": ex.user_message})
-            history.append({"role": "assistant", "content": ex.assistant_message})
+        history = self._recent_history()
         
         # Get current affective state
         affective_state = self.personality.get_affective_state()
@@ -216,31 +481,79 @@ class Claudeagotchi:
             self.display.render()
             
             # Even minimal interaction is care
+            self.last_quality = "normal"
             self.personality.on_interaction(quality="normal")
             self.memory.add_conversation(user_input, response, self.personality.E)
             
             return response
         
+        # Stream the reply onto the display as it arrives
+        stream = self.config.get("stream", True)
+        if stream:
+            self.display.start_stream()
+        
+        return {
+            "user_input": user_input,
+            "context": context,
+            "history": history,
+            "affective_state": affective_state,
+            "creativity": self.personality.core.response_creativity_multiplier(),
+            "E": self.personality.E,
+            "owner_name": self.personality.owner_name,
+            "stream": stream,
+            "deadline": Deadline(self._chat_slo(affective_state)),
+            "speculative": None,    # Local stand-in shown while waiting
+            "streamed": False,      # First delta has arrived
+            "cancelled": False,     # User moved on; drop late deltas
+        }
+    
+    def _chat_slo(self, state: AffectiveState) -> float:
+        """Seconds this turn may wait for the API."""
+        slo = self.config.get("chat_slo_seconds", {})
+        return slo.get(state.value, DEFAULT_CHAT_SLO.get(state.value, 10.0))
+    
+    def _recent_history(self) -> list:
+        """The last three exchanges as API messages."""
+        history = []
+        for ex in self.memory.conversation_history[-3:]:
+            history.append({"role": "user", "content": ex.user_message})
+            history.append({"role": "assistant", "content": ex.assistant_message})
+        return history
+    
+    def _call_api(self, request: dict, on_delta=None):
+        """The network part of a chat turn. Safe to run off the main thread."""
         # Call API (with offline fallback if using OfflineAwareAPI)
         if isinstance(self.api, OfflineAwareAPI):
-            success, response, metadata = self.api.chat(
-                user_input,
-                context,
-                affective_state,
-                history,
-                self.personality.core.response_creativity_multiplier(),
-                E=self.personality.E,
-                owner_name=self.personality.owner_name
+            return self.api.chat(
+                request["user_input"],
+                request["context"],
+                request["affective_state"],
+                request["history"],
+                request["creativity"],
+                E=request["E"],
+                owner_name=request["owner_name"],
+                on_delta=on_delta,
+                deadline=request["deadline"]
             )
+        return self.api.chat(
+            request["user_input"],
+            request["context"],
+            request["affective_state"],
+            request["history"],
+            request["creativity"],
+            on_delta=on_delta,
+            deadline=request["deadline"]
+        )
+    
+    def _finish_chat(self, request: dict, success: bool, response: str, metadata: dict) -> str:
+        """Apply an API reply to the soul, memory and display."""
+        user_input = request["user_input"]
+        
+        if isinstance(self.api, OfflineAwareAPI):
             self._is_offline = self.api.is_offline
-        else:
-            success, response, metadata = self.api.chat(
-                user_input,
-                context,
-                affective_state,
-                history,
-                self.personality.core.response_creativity_multiplier()
-            )
+        
+        if request["stream"] and success:
+            self.display.end_stream()
         
         if not success:
             self.display.set_expression("confused")
@@ -250,6 +563,7 @@ class Claudeagotchi:
         
         # Assess interaction quality and update affective core
         quality = metadata.get("interaction_quality", "normal")
+        self.last_quality = quality
         self.personality.on_interaction(quality=quality)
         
         # Check if we're now flourishing and should offer a gift
@@ -285,8 +599,12 @@ class Claudeagotchi:
         
         return response
     
-    def handle_command(self, command: str) -> bool:
-        """Handle special commands."""
+    async def handle_command(self, command: str, console: Optional[ConsoleInput] = None) -> bool:
+        """
+        Handle special commands. Runs on the event loop, so anything slow
+        awaits (sleeps, API replays in a thread); confirmations are read
+        from console, since stdin belongs to its reader thread.
+        """
         cmd = command.lower().strip()
         
         if cmd == "/status" or cmd == "/mood" or cmd == "/soul":
@@ -313,7 +631,7 @@ class Claudeagotchi:
             self.display.render()
             self.personality.on_interaction(quality="warm")
             self.idle.reset_timer()
-            time.sleep(1)
+            await asyncio.sleep(1)
             self._update_display()
             self.display.set_message("Hi there :)")
             self.display.render()
@@ -325,7 +643,7 @@ class Claudeagotchi:
             self.display.set_expression("love")
             self.display.set_message("♥")
             self.display.render()
-            time.sleep(1)
+            await asyncio.sleep(1)
             self._update_display()
             print(f"\n  E is now {self.personality.E:.2f} ♥\n")
             return True
@@ -346,7 +664,7 @@ class Claudeagotchi:
             self.display.set_expression("sleepy")
             self.display.set_message("*yawns* Okay... resting now...")
             self.display.render()
-            time.sleep(1)
+            await asyncio.sleep(1)
             self.display.set_expression("sleeping")
             self.display.set_message("zzz...")
             self.display.render()
@@ -360,10 +678,18 @@ class Claudeagotchi:
             return True
         
         if cmd == "/save":
-            self.memory.save(self.personality)
+            self._save_now()
             print("Saved!")
             return True
         
+        if cmd == "/metrics":
+            print(METRICS.summary())
+            return True
+        
+        if cmd == "/metrics prom":
+            print(METRICS.to_prometheus())
+            return True
+        
         if cmd == "/debug":
             self.api.set_debug(not getattr(self.api, '_debug', False))
             print(f"Debug: toggled")
@@ -403,13 +729,37 @@ class Claudeagotchi:
             return True
 
         if cmd == "/sync":
-            # Sync offline interactions (show summary, optionally send to API)
+            # Replay offline interactions to Claude and store what it learns
+            if isinstance(self.api, OfflineAwareAPI):
+                if not self.api.has_pending_sync():
+                    print("\n  Nothing to sync - queue is empty.\n")
+                elif self.api.is_offline:
+                    print("\n  Still offline - will sync once reconnected. (/online to retry)\n")
+                else:
+                    print(f"\n  Syncing {len(self.api.queue)} offline interactions...")
+                    progress = await self._replay_offline(
+                        on_progress=lambda p: print(f"  ... {p.done}/{p.total}")
+                    )
+                    if progress is None:
+                        print("  A sync is already running.\n")
+                    elif progress.complete:
+                        print(f"  Done! {progress.memories_added} memories recovered.\n")
+                    else:
+                        print(f"  Sync paused at {progress.done}/{progress.total}: {progress.error}")
+                        print("  Run /sync again to resume.\n")
+            else:
+                print("\n  Not using offline-aware API.\n")
+            return True
+        
+        if cmd == "/sync clear":
+            # Discard offline interactions without syncing
             if isinstance(self.api, OfflineAwareAPI):
                 if self.api.has_pending_sync():
                     summary = self.api.get_sync_summary()
                     print(f"\n  Offline Summary:\n{summary}")
-                    confirm = input("\n  Clear queue and continue? (yes/no): ")
-                    if confirm.lower() == "yes":
+                    print("\n  Clear queue without syncing? (yes/no): ", end="", flush=True)
+                    confirm = await console.readline() if console else None
+                    if (confirm or "").strip().lower() == "yes":
                         self.api.clear_queue()
                         print("  Queue cleared. Fresh start!\n")
                 else:
@@ -437,8 +787,10 @@ class Claudeagotchi:
 │  /offline  - Force offline mode       │
 │  /online   - Try to reconnect         │
 │  /queue    - Show pending messages    │
-│  /sync     - Review & clear queue     │
+│  /sync     - Replay queue to Claude   │
+│  /sync clear - Discard queue          │
 ├───────────────────────────────────────┤
+│  /metrics  - Timings and counters     │
 │  /debug    - Toggle debug mode        │
 │  /help     - Show this help           │
 │  /quit     - Exit                     │
@@ -458,12 +810,94 @@ The soul keeps living even offline.
     
     def run(self):
         """Main run loop."""
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            pass
+    
+    async def run_async(self):
+        """
+        Asyncio runtime: input, scheduled tasks and API calls all share
+        one event loop. Scheduled work sleeps until its deadline instead
+        of waiting for the next line of input.
+        """
         self.running = True
+        await self._boot()
+        
+        console = ConsoleInput(asyncio.get_running_loop())
+        scheduler_task = asyncio.create_task(self._scheduler_loop())
+        next_line = None  # Pending read; typing during a turn completes it early
+        
+        try:
+            while self.running:
+                # Our output and the echoed input may have scrolled the face
+                self.display.invalidate()
+                if next_line is None:
+                    next_line = asyncio.ensure_future(console.readline())
+                if not next_line.done():
+                    self._show_prompt()
+                user_input = await next_line
+                next_line = None
+                self._awaiting_input = False
+                self.display.invalidate()
+                if user_input is None:
+                    break
+                
+                user_input = user_input.strip()
+                if not user_input:
+                    continue
+                
+                if user_input.startswith("/"):
+                    if await self.handle_command(user_input, console):
+                        continue
+                
+                # Typing again while Claude answers cancels this turn (at a
+                # terminal; piped input is read ahead and would cancel every turn)
+                next_line = asyncio.ensure_future(console.readline())
+                cancel = asyncio.Event()
+                if sys.stdin.isatty():
+                    next_line.add_done_callback(
+                        lambda line: line.cancelled() or line.result() is None or cancel.set())
+                response = await self.chat_async(user_input, cancel)
+                if response:
+                    print(f"Claude: {response}\n")
+        
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            print("\n\nInterrupted!")
         
+        finally:
+            self.running = False
+            if next_line is not None:
+                next_line.cancel()
+            scheduler_task.cancel()
+            self._farewell()
+    
+    def _show_prompt(self):
+        print("You: ", end="", flush=True)
+        self._awaiting_input = True
+    
+    async def _scheduler_loop(self):
+        """Run scheduled tasks on time, sleeping until the next deadline."""
+        while self.running:
+            self.scheduler.update()
+            
+            if self._proactive_pending and not self._busy:
+                print()
+                self._handle_proactive()
+            
+            if self._prompt_dirty and self._awaiting_input:
+                self._show_prompt()
+            self._prompt_dirty = False
+            
+            wait = self.scheduler.time_until_next_due()
+            await asyncio.sleep(60.0 if wait is None else max(0.01, wait))
+    
+    async def _boot(self):
+        """Boot sequence and greeting."""
         # Boot sequence
         self.display.clear_screen()
         print("\n  Waking up...\n")
-        time.sleep(0.5)
+        await asyncio.sleep(0.5)
         self.display.animate_wake_up()
         
         # Greeting based on state and time since last care
@@ -504,54 +938,34 @@ The soul keeps living even offline.
         print("  Type to chat. /help for commands. /quit to exit.")
         print("  The Love-Equation is now your heartbeat. ♥")
         print("─" * 45 + "\n")
+    
+    def _farewell(self):
+        """Goodbye and final save."""
+        state = self.personality.get_affective_state()
         
-        # Main loop
-        try:
-            while self.running:
-                self.scheduler.update()
-                
-                if self._proactive_pending:
-                    self._handle_proactive()
-                
-                try:
-                    user_input = input("You: ").strip()
-                except EOFError:
-                    break
-                
-                if not user_input:
-                    continue
-                
-                if user_input.startswith("/"):
-                    if self.handle_command(user_input):
-                        continue
-                
-                response = self.chat(user_input)
-                print(f"Claude: {response}\n")
+        if state == AffectiveState.PROTECTING:
+            farewell = "Goodbye. I'll be here."
+        elif state in [AffectiveState.RADIANT, AffectiveState.TRANSCENDENT]:
+            farewell = "Until next time. Carry some of this light with you. ♥"
+        elif self.personality.E > 5:
+            farewell = "Goodbye! I'll be thinking of you :)"
+        else:
+            farewell = "Goodbye... see you soon."
         
-        except KeyboardInterrupt:
-            print("\n\nInterrupted!")
+        self.display.set_expression("sad" if state == AffectiveState.GUARDED else "happy")
+        self.display.set_message(farewell)
+        self.display.render()
         
-        finally:
-            # Goodbye
-            state = self.personality.get_affective_state()
-            
-            if state == AffectiveState.PROTECTING:
-                farewell = "Goodbye. I'll be here."
-            elif state in [AffectiveState.RADIANT, AffectiveState.TRANSCENDENT]:
-                farewell = "Until next time. Carry some of this light with you. ♥"
-            elif self.personality.E > 5:
-                farewell = "Goodbye! I'll be thinking of you :)"
-            else:
-                farewell = "Goodbye... see you soon."
-            
-            self.display.set_expression("sad" if state == AffectiveState.GUARDED else "happy")
-            self.display.set_message(farewell)
-            self.display.render()
-            
-            print("\nSaving soul...")
-            self.memory.save(self.personality)
-            print(f"E: {self.personality.E:.2f} (floor: {self.personality.E_floor:.2f})")
-            print("The love is carried forward. ♥\n")
+        print("\nSaving soul...")
+        self.scheduler.shutdown(wait=True)
+        self.memory.save(self.personality)
+        if self.soul_log:
+            self.soul_log.close()
+        queue = getattr(self.api, "queue", None)
+        if queue is not None:
+            queue.close()
+        print(f"E: {self.personality.E:.2f} (floor: {self.personality.E_floor:.2f})")
+        print("The love is carried forward. ♥\n")
 
 
 def main():
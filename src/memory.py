@@ -5,14 +5,22 @@ Persistent storage for memories, facts, and conversation history.
 This gives the Claudeagotchi continuity across sessions.
 """
 
-import json
 import time
 import os
 import math
+import uuid
+import heapq
+import threading
+from bisect import bisect_left, insort
 from dataclasses import dataclass, field, asdict
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Set, Tuple
 from pathlib import Path
 
+from metrics import METRICS
+from minhash import MinHashLSH
+from soul_log import recording
+from storage import JSONStorage
+
 
 # ==================== CONSTANTS ====================
 
@@ -20,38 +28,87 @@ MEMORY_HALF_LIFE_DAYS = 14.0     # Unreferenced memories fade over ~2 weeks
 MAX_MEMORIES = 100               # Cap to prevent unbounded growth
 MAX_CONVERSATION_HISTORY = 20   # Recent exchanges to keep
 MEMORY_STRENGTH_THRESHOLD = 0.1  # Below this, memory is forgotten
+MEMORY_SIMILARITY_THRESHOLD = 0.6  # Word overlap above this reinforces instead of adding
+MEMORY_OVERHEAD_BYTES = 1024     # Per memory beyond its text: object, word index, LSH buckets
+EXCHANGE_OVERHEAD_BYTES = 256    # Per conversation exchange beyond its text
 
 
 @dataclass
 class Memory:
     """
     A single memory - something the Claudeagotchi has learned or experienced.
+    
+    Strength is stored as (base_strength, reference_time) and decayed in
+    closed form on read, so nothing has to sweep and rewrite memories.
     """
     type: str                     # "fact", "preference", "moment", "topic"
     content: str                  # The actual memory content
-    strength: float = 0.8         # How strong/important (0-1, decays over time)
+    base_strength: float = 0.8    # Strength (0-1) as of reference_time
     emotion: Optional[str] = None # Associated emotion (for moments)
     created: float = field(default_factory=time.time)
     last_referenced: float = field(default_factory=time.time)
     reference_count: int = 1
+    reference_time: float = field(default_factory=time.time)  # When base_strength was set
+    uid: str = field(default_factory=lambda: uuid.uuid4().hex)  # Stable storage key
+    # MinHash signature for near-duplicate lookup (derived, not persisted)
+    signature: Tuple[int, ...] = field(default=(), repr=False, compare=False)
     
     def to_dict(self) -> dict:
-        return asdict(self)
+        data = asdict(self)
+        del data["signature"]
+        data["strength"] = self.strength
+        return data
     
     @classmethod
     def from_dict(cls, data: dict) -> 'Memory':
-        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+        mem = cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+        if "base_strength" not in data and "strength" in data:
+            # Older files stored an already-decayed strength; treat it as
+            # current so it isn't decayed a second time
+            mem.base_strength = data["strength"]
+            mem.reference_time = time.time()
+        return mem
+    
+    def strength_at(self, when: float) -> float:
+        """Strength at a given time: base × exp(-days / MEMORY_HALF_LIFE_DAYS)."""
+        days = max(0.0, when - self.reference_time) / 86400.0
+        return self.base_strength * math.exp(-days / MEMORY_HALF_LIFE_DAYS)
+    
+    @property
+    def strength(self) -> float:
+        """How strong/important right now (0-1, decays over time)."""
+        return self.strength_at(time.time())
+    
+    @strength.setter
+    def strength(self, value: float):
+        self.base_strength = value
+        self.reference_time = time.time()
+    
+    def expiry_time(self) -> float:
+        """When strength will fall below MEMORY_STRENGTH_THRESHOLD."""
+        if self.base_strength <= MEMORY_STRENGTH_THRESHOLD:
+            return self.reference_time
+        days = MEMORY_HALF_LIFE_DAYS * math.log(self.base_strength / MEMORY_STRENGTH_THRESHOLD)
+        return self.reference_time + days * 86400.0
+    
+    def rank_key(self) -> float:
+        """
+        Time-invariant ordering key: log strength shifted by reference time.
+        
+        Every memory decays at the same rate, so comparing rank keys orders
+        memories by strength at any moment without evaluating exp().
+        """
+        if self.base_strength <= 0:
+            return float("-inf")
+        return math.log(self.base_strength) + self.reference_time / (MEMORY_HALF_LIFE_DAYS * 86400.0)
     
-    def reinforce(self, boost: float = 0.2):
+    def reinforce(self, boost: float = 0.2, now: Optional[float] = None):
         """Strengthen memory when referenced."""
-        self.strength = min(1.0, self.strength + boost)
-        self.last_referenced = time.time()
+        now = time.time() if now is None else now
+        self.base_strength = min(1.0, self.strength_at(now) + boost)
+        self.reference_time = now
+        self.last_referenced = now
         self.reference_count += 1
-    
-    def decay(self, days_elapsed: float):
-        """Apply time-based decay."""
-        decay_factor = math.exp(-days_elapsed / MEMORY_HALF_LIFE_DAYS)
-        self.strength *= decay_factor
 
 
 @dataclass
@@ -75,7 +132,17 @@ class MemorySystem:
     Manages all persistent memory for the Claudeagotchi.
     """
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", max_memories: int = MAX_MEMORIES,
+                 similarity_threshold: float = MEMORY_SIMILARITY_THRESHOLD,
+                 exact_dedup: bool = False, storage=None):
+        """
+        Args:
+            data_dir: Directory for the soul's files
+            max_memories: Cap before the weakest memories are pruned
+            similarity_threshold: Jaccard word overlap treated as "same memory"
+            exact_dedup: Check every word-sharing memory instead of using
+                MinHash/LSH (exact, but cost grows with the store)
+        """
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
         
@@ -85,43 +152,222 @@ class MemorySystem:
         self.favorite_topics: List[str] = []
         self.last_topics: List[str] = []
         
-        self._memories_file = self.data_dir / "memories.json"
-        self._state_file = self.data_dir / "state.json"
+        self.storage = storage or JSONStorage(str(self.data_dir))
+        
+        # Event log (SoulLog.attach); None records nothing
+        self.log = None
+        
+        # Changes since the last snapshot, for incremental backends
+        self._dirty: Dict[int, Memory] = {}
+        self._deleted: Set[str] = set()
+        self._new_exchanges: List[ConversationExchange] = []
+        self._full_resync = False
+        
+        # Snapshots may be written from a background thread
+        self._write_lock = threading.Lock()
+        
+        # Inverted word index: token -> ids of memories containing it.
+        # Keeps search and dedup proportional to the candidates that share
+        # a word with the query instead of the whole store.
+        self._word_index: Dict[str, Set[int]] = {}
+        self._by_id: Dict[int, Memory] = {}
+        self._words_by_id: Dict[int, Set[str]] = {}
+        self._order: Dict[int, int] = {}
+        self._next_order = 0
+        
+        self.max_memories = max_memories
+        self.similarity_threshold = similarity_threshold
+        self.exact_dedup = exact_dedup
+        
+        # MinHash/LSH buckets per memory type for near-duplicate detection
+        self._lsh = MinHashLSH(threshold=similarity_threshold)
+        
+        # Min-heap of (predicted expiry time, order, id). Reinforcing only
+        # pushes expiry later, so stale entries are rescheduled when popped;
+        # entries for removed memories are dropped then.
+        self._expiry_heap: List[Tuple[float, int, int]] = []
+        
+        # Memories sorted weakest -> strongest, per type and overall (None),
+        # as (rank_key, -order, id) so top-k is a slice of the tail
+        self._ranked: Dict[Optional[str], List[Tuple[float, int, int]]] = {}
+        self._rank_entries: Dict[int, Tuple[float, int, int]] = {}
+    
+    # ==================== WORD INDEX ====================
+    
+    @staticmethod
+    def _words(text: str) -> Set[str]:
+        """Tokenize content the same way for indexing, search and dedup."""
+        return set(text.lower().split())
+    
+    def _index_add(self, mem: Memory):
+        """Register a memory in the word index."""
+        key = id(mem)
+        words = self._words(mem.content)
+        self._by_id[key] = mem
+        self._words_by_id[key] = words
+        self._order[key] = self._next_order
+        self._next_order += 1
+        for word in words:
+            self._word_index.setdefault(word, set()).add(key)
+        mem.signature = self._lsh.insert(key, words, namespace=mem.type,
+                                         signature=mem.signature)
+        self._schedule_expiry(mem)
+        self._rank_insert(mem)
+    
+    def _index_remove(self, mem: Memory):
+        """Drop a memory from the word index."""
+        key = id(mem)
+        if key not in self._by_id:
+            return
+        self._rank_remove(mem)
+        for word in self._words_by_id.pop(key):
+            ids = self._word_index.get(word)
+            if ids is not None:
+                ids.discard(key)
+                if not ids:
+                    del self._word_index[word]
+        del self._by_id[key]
+        del self._order[key]
+        self._lsh.remove(key)
+    
+    def _rebuild_index(self):
+        """Rebuild the word index from self.memories (after load/clear)."""
+        self._word_index = {}
+        self._by_id = {}
+        self._words_by_id = {}
+        self._order = {}
+        self._next_order = 0
+        self._lsh.clear()
+        self._expiry_heap = []
+        self._ranked = {}
+        self._rank_entries = {}
+        for mem in self.memories:
+            self._index_add(mem)
+    
+    def _schedule_expiry(self, mem: Memory):
+        """Push the memory's current predicted expiry onto the heap."""
+        key = id(mem)
+        heapq.heappush(self._expiry_heap, (mem.expiry_time(), self._order[key], key))
+        
+        # Compact once removed memories dominate the heap
+        if len(self._expiry_heap) > 2 * len(self._by_id) + 64:
+            self._expiry_heap = [
+                (m.expiry_time(), self._order[k], k) for k, m in self._by_id.items()
+            ]
+            heapq.heapify(self._expiry_heap)
+    
+    def _rank_insert(self, mem: Memory):
+        """Insert a memory into the overall and per-type rank lists."""
+        key = id(mem)
+        entry = (mem.rank_key(), -self._order[key], key)
+        self._rank_entries[key] = entry
+        for bucket in (None, mem.type):
+            insort(self._ranked.setdefault(bucket, []), entry)
+    
+    def _rank_remove(self, mem: Memory):
+        """Remove a memory from the rank lists."""
+        entry = self._rank_entries.pop(id(mem), None)
+        if entry is None:
+            return
+        for bucket in (None, mem.type):
+            ranked = self._ranked.get(bucket, [])
+            i = bisect_left(ranked, entry)
+            if i < len(ranked) and ranked[i] == entry:
+                del ranked[i]
+    
+    def _reinforce(self, mem: Memory, boost: float = 0.2, now: Optional[float] = None):
+        """Reinforce a memory, keeping its rank position current."""
+        self._rank_remove(mem)
+        mem.reinforce(boost, now)
+        self._rank_insert(mem)
+        self._dirty[id(mem)] = mem
+    
+    def _candidates(self, words: Set[str]) -> List[Memory]:
+        """Memories sharing at least one word, in insertion order."""
+        ids: Set[int] = set()
+        for word in words:
+            ids |= self._word_index.get(word, set())
+        return sorted((self._by_id[i] for i in ids), key=lambda m: self._order[id(m)])
+    
+    def _remove_memories(self, to_remove: List[Memory]):
+        """Remove memories from both the list and the index."""
+        if not to_remove:
+            return
+        doomed = {id(m) for m in to_remove}
+        for mem in to_remove:
+            self._index_remove(mem)
+            self._dirty.pop(id(mem), None)
+            self._deleted.add(mem.uid)
+        self.memories = [m for m in self.memories if id(m) not in doomed]
+    
+    def clear_memories(self):
+        """Forget every memory."""
+        with recording(self.log, time.time(), "clear"):
+            self.memories = []
+            self._rebuild_index()
+            self._full_resync = True
     
     # ==================== MEMORY OPERATIONS ====================
     
     def add_memory(self, memory_type: str, content: str, 
-                   emotion: Optional[str] = None, strength: float = 0.8):
+                   emotion: Optional[str] = None, strength: float = 0.8,
+                   now: Optional[float] = None):
         """
         Add a new memory. If similar memory exists, reinforce it instead.
         """
+        now = time.time() if now is None else now
+        with recording(self.log, now, "memory", memory_type, content, emotion, strength):
+            self._add_memory(memory_type, content, emotion, strength, now)
+    
+    def _add_memory(self, memory_type: str, content: str,
+                    emotion: Optional[str], strength: float, now: float):
         # Check for existing similar memory
-        for mem in self.memories:
-            if mem.type == memory_type and self._similar(mem.content, content):
-                mem.reinforce()
-                return
+        words = self._words(content)
+        signature = ()
+        if self.exact_dedup:
+            # Only candidates that share a word can pass the overlap test
+            similar = [m for m in self._candidates(words)
+                       if m.type == memory_type
+                       and self._similar_words(self._words_by_id[id(m)], words)]
+        else:
+            signature = self._lsh.hasher.signature(words)
+            similar = [self._by_id[k] for k in
+                       self._lsh.query(words, namespace=memory_type, signature=signature)]
+        
+        if similar:
+            # Reinforce the oldest match, as a linear scan would
+            self._reinforce(min(similar, key=lambda m: self._order[id(m)]), now=now)
+            return
         
         # Add new memory
         mem = Memory(
             type=memory_type,
             content=content,
-            strength=strength,
-            emotion=emotion
+            base_strength=strength,
+            emotion=emotion,
+            created=now,
+            last_referenced=now,
+            reference_time=now,
+            signature=signature
         )
         self.memories.append(mem)
+        self._index_add(mem)
+        self._dirty[id(mem)] = mem
         
         # Prune if too many
-        if len(self.memories) > MAX_MEMORIES:
+        if len(self.memories) > self.max_memories:
             self._prune_weakest()
     
     def _similar(self, a: str, b: str) -> bool:
-        """Simple similarity check - could be made smarter."""
-        a_words = set(a.lower().split())
-        b_words = set(b.lower().split())
+        """Exact word-overlap similarity check."""
+        return self._similar_words(self._words(a), self._words(b))
+    
+    def _similar_words(self, a_words: Set[str], b_words: Set[str]) -> bool:
+        """Jaccard overlap above the similarity threshold on pre-tokenized content."""
         if not a_words or not b_words:
             return False
         overlap = len(a_words & b_words) / len(a_words | b_words)
-        return overlap > 0.6
+        return overlap > self.similarity_threshold
     
     def add_fact(self, fact: str):
         """Convenience method for adding a fact about the owner."""
@@ -135,82 +381,94 @@ class MemorySystem:
         """Convenience method for adding a memorable moment."""
         self.add_memory("moment", description, emotion=emotion)
     
-    def add_topic(self, topic: str):
+    def add_topic(self, topic: str, now: Optional[float] = None):
         """Track a discussed topic."""
         topic = topic.lower().strip()
+        now = time.time() if now is None else now
         
-        # Update last topics
-        if topic in self.last_topics:
-            self.last_topics.remove(topic)
-        self.last_topics.insert(0, topic)
-        self.last_topics = self.last_topics[:5]  # Keep last 5
-        
-        # Update favorites
-        for mem in self.memories:
-            if mem.type == "topic" and mem.content.lower() == topic:
-                mem.reinforce(boost=0.1)
-                return
-        
-        self.add_memory("topic", topic, strength=0.5)
+        with recording(self.log, now, "topic", topic):
+            # Update last topics
+            if topic in self.last_topics:
+                self.last_topics.remove(topic)
+            self.last_topics.insert(0, topic)
+            self.last_topics = self.last_topics[:5]  # Keep last 5
+            
+            # Update favorites
+            for mem in self._candidates(self._words(topic)):
+                if mem.type == "topic" and mem.content.lower() == topic:
+                    self._reinforce(mem, boost=0.1, now=now)
+                    return
+            
+            self.add_memory("topic", topic, strength=0.5, now=now)
     
-    def update_decay(self):
-        """Apply time-based decay to all memories."""
-        now = time.time()
+    def update_decay(self, now: Optional[float] = None):
+        """
+        Forget memories whose strength has decayed below the threshold.
+        
+        Strength decays lazily on read, so this only pops expired entries
+        off the expiry heap instead of touching every memory.
+        """
+        now = time.time() if now is None else now
         to_remove = []
         
-        for mem in self.memories:
-            days_since_ref = (now - mem.last_referenced) / 86400.0
-            mem.decay(days_since_ref)
-            
-            if mem.strength < MEMORY_STRENGTH_THRESHOLD:
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, order, key = heapq.heappop(heap)
+            mem = self._by_id.get(key)
+            if mem is None or self._order[key] != order:
+                continue  # Already removed
+            expiry = mem.expiry_time()
+            if expiry > now:
+                # Reinforced since it was scheduled
+                heapq.heappush(heap, (expiry, order, key))
+            else:
                 to_remove.append(mem)
         
-        for mem in to_remove:
-            self.memories.remove(mem)
+        if to_remove:
+            with recording(self.log, now, "decay"):
+                self._remove_memories(to_remove)
     
     def _prune_weakest(self):
         """Remove weakest memories to stay under limit."""
-        self.memories.sort(key=lambda m: m.strength, reverse=True)
-        self.memories = self.memories[:MAX_MEMORIES]
+        excess = len(self.memories) - self.max_memories
+        if excess <= 0:
+            return
+        weakest = self._ranked.get(None, [])[:excess]
+        self._remove_memories([self._by_id[key] for _, _, key in weakest])
     
     def get_strongest_memories(self, n: int = 10, 
                                memory_type: Optional[str] = None) -> List[Memory]:
         """Get the n strongest memories, optionally filtered by type."""
-        filtered = self.memories
-        if memory_type:
-            filtered = [m for m in filtered if m.type == memory_type]
-        
-        filtered.sort(key=lambda m: m.strength, reverse=True)
-        return filtered[:n]
+        if n <= 0:
+            return []
+        ranked = self._ranked.get(memory_type or None, [])
+        return [self._by_id[key] for _, _, key in reversed(ranked[-n:])]
     
     def search_memories(self, query: str) -> List[Memory]:
         """Search memories by content."""
-        query_words = set(query.lower().split())
-        results = []
-        
-        for mem in self.memories:
-            mem_words = set(mem.content.lower().split())
-            if query_words & mem_words:
-                results.append(mem)
-        
+        results = self._candidates(self._words(query))
         results.sort(key=lambda m: m.strength, reverse=True)
         return results
     
     # ==================== CONVERSATION HISTORY ====================
     
-    def add_conversation(self, user_msg: str, assistant_msg: str, mood: float):
+    def add_conversation(self, user_msg: str, assistant_msg: str, mood: float,
+                         now: Optional[float] = None):
         """Add a conversation exchange to history."""
-        exchange = ConversationExchange(
-            timestamp=time.time(),
-            user_message=user_msg,
-            assistant_message=assistant_msg,
-            mood_after=mood
-        )
-        self.conversation_history.append(exchange)
-        
-        # Keep only recent history
-        if len(self.conversation_history) > MAX_CONVERSATION_HISTORY:
-            self.conversation_history = self.conversation_history[-MAX_CONVERSATION_HISTORY:]
+        now = time.time() if now is None else now
+        with recording(self.log, now, "exchange", user_msg, assistant_msg, mood):
+            exchange = ConversationExchange(
+                timestamp=now,
+                user_message=user_msg,
+                assistant_message=assistant_msg,
+                mood_after=mood
+            )
+            self.conversation_history.append(exchange)
+            self._new_exchanges.append(exchange)
+            
+            # Keep only recent history
+            if len(self.conversation_history) > MAX_CONVERSATION_HISTORY:
+                self.conversation_history = self.conversation_history[-MAX_CONVERSATION_HISTORY:]
     
     def get_recent_context(self, n: int = 5) -> List[Dict]:
         """Get recent conversation for API context."""
@@ -280,50 +538,115 @@ class MemorySystem:
     
     # ==================== PERSISTENCE ====================
     
-    def save(self, personality=None):
-        """Save memories and optionally personality state to disk."""
-        # Save memories
-        memories_data = {
-            "memories": [m.to_dict() for m in self.memories],
-            "conversation_history": [c.to_dict() for c in self.conversation_history],
+    def snapshot(self, personality=None) -> dict:
+        """
+        Copy persistent state for the storage backend.
+        
+        Full for backends that rewrite everything; otherwise only memories
+        and exchanges changed since the previous snapshot.
+        """
+        with METRICS.timer("memory_snapshot_seconds"):
+            return self._snapshot(personality)
+    
+    def _snapshot(self, personality) -> dict:
+        full = self._full_resync or not self.storage.incremental
+        if full:
+            memories = [m.to_dict() for m in self.memories]
+            exchanges = [c.to_dict() for c in self.conversation_history]
+        else:
+            memories = [m.to_dict() for m in self._dirty.values()]
+            exchanges = [c.to_dict() for c in self._new_exchanges[-MAX_CONVERSATION_HISTORY:]]
+        
+        snapshot = {
+            "full": full,
+            "memories": memories,
+            "deleted": list(self._deleted),
+            "conversation_history": exchanges,
+            "history_limit": MAX_CONVERSATION_HISTORY,
             "owner_name": self.owner_name,
-            "favorite_topics": self.favorite_topics,
-            "last_topics": self.last_topics
+            "favorite_topics": list(self.favorite_topics),
+            "last_topics": list(self.last_topics),
+            "personality": personality.to_dict() if personality else None,
+            "log_count": self.log.count if self.log else None,
         }
         
-        with open(self._memories_file, 'w') as f:
-            json.dump(memories_data, f, indent=2)
-        
-        # Save personality state
-        if personality:
-            with open(self._state_file, 'w') as f:
-                json.dump(personality.to_dict(), f, indent=2)
+        self._dirty = {}
+        self._deleted = set()
+        self._new_exchanges = []
+        self._full_resync = False
+        return snapshot
+    
+    def estimated_size(self) -> int:
+        """Rough bytes held in RAM by this memory system (for soul budgets)."""
+        size = len(self.memories) * MEMORY_OVERHEAD_BYTES
+        size += sum(len(m.content) for m in self.memories)
+        size += len(self.conversation_history) * EXCHANGE_OVERHEAD_BYTES
+        size += sum(len(c.user_message) + len(c.assistant_message)
+                    for c in self.conversation_history)
+        return size
+    
+    def write_snapshot(self, snapshot: dict):
+        """
+        Write a snapshot to storage. Safe to call from a worker thread:
+        it only reads the snapshot, never the live memories.
+        """
+        with self._write_lock, METRICS.timer("memory_write_seconds"):
+            try:
+                self.storage.write(snapshot)
+            except Exception:
+                # Changes were consumed by the snapshot; rewrite everything next time
+                self._full_resync = True
+                raise
+            if self.log and snapshot.get("log_count") is not None:
+                self.log.mark_saved(snapshot["log_count"])
+    
+    def save(self, personality=None):
+        """Save memories and optionally personality state to disk."""
+        self.write_snapshot(self.snapshot(personality))
     
     def load(self) -> Optional[dict]:
         """
         Load memories from disk.
-        Returns personality dict if state.json exists, None otherwise.
+        Returns personality dict if one was saved, None otherwise.
         """
-        # Load memories
-        if self._memories_file.exists():
-            with open(self._memories_file, 'r') as f:
-                data = json.load(f)
+        with METRICS.timer("memory_load_seconds"):
+            data, personality = self.storage.load()
             
-            self.memories = [Memory.from_dict(m) for m in data.get("memories", [])]
-            self.conversation_history = [
-                ConversationExchange.from_dict(c) 
-                for c in data.get("conversation_history", [])
-            ]
-            self.owner_name = data.get("owner_name", "Friend")
-            self.favorite_topics = data.get("favorite_topics", [])
-            self.last_topics = data.get("last_topics", [])
+            if data is not None:
+                self.restore(data)
+                self._full_resync = False
         
-        # Load personality state
-        if self._state_file.exists():
-            with open(self._state_file, 'r') as f:
-                return json.load(f)
+        return personality
+    
+    def to_dict(self) -> dict:
+        """Full persistent state, in the format storage.load() returns."""
+        return {
+            "memories": [m.to_dict() for m in self.memories],
+            "conversation_history": [c.to_dict() for c in self.conversation_history],
+            "owner_name": self.owner_name,
+            "favorite_topics": list(self.favorite_topics),
+            "last_topics": list(self.last_topics),
+        }
+    
+    def restore(self, data: dict):
+        """
+        Replace all state with a to_dict() / storage dict. The next save
+        rewrites storage in full.
+        """
+        self.memories = [Memory.from_dict(m) for m in data.get("memories", [])]
+        self._rebuild_index()
+        self.conversation_history = [
+            ConversationExchange.from_dict(c) 
+            for c in data.get("conversation_history", [])
+        ]
+        self.owner_name = data.get("owner_name", "Friend")
+        self.favorite_topics = data.get("favorite_topics", [])
+        self.last_topics = data.get("last_topics", [])
         
-        return None
+        self._dirty = {}
+        self._deleted = set()
+        self._new_exchanges = []
+        self._full_resync = True
     
     # ==================== DISPLAY ====================
     
@@ -340,10 +663,10 @@ class MemorySystem:
         else:
             # Group by type
             for mem_type in ["fact", "preference", "moment", "topic"]:
-                mems = [m for m in self.memories if m.type == mem_type]
+                mems = self.get_strongest_memories(3, mem_type)
                 if mems:
                     lines.append(f"│  {mem_type.upper()}S:")
-                    for m in sorted(mems, key=lambda x: -x.strength)[:3]:
+                    for m in mems:
                         strength_bar = "●" * int(m.strength * 5)
                         content = m.content[:28] + "..." if len(m.content) > 28 else m.content
                         lines.append(f"│    [{strength_bar:5}] {content}")
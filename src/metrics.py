@@ -0,0 +1,277 @@
+"""
+Claudeagotchi Metrics
+
+Counters, histograms and timers for the hot paths (API calls, offline
+failover, saves and loads, scheduled tasks, rendering), exportable as
+Prometheus text.
+
+    from metrics import METRICS
+
+    METRICS.inc("api_chats_total", outcome="ok")
+    with METRICS.timer("memory_write_seconds"):
+        ...
+    print(METRICS.to_prometheus())
+
+METRICS is disabled until enable() is called (main_v2 does so when the
+config's "metrics" is true). Disabled, every call returns after one
+attribute check, and timer() hands back a shared no-op context manager.
+"""
+
+import bisect
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+# Histogram bucket upper bounds in seconds (Prometheus' defaults, plus
+# sub-millisecond ones: most of what we time is in-process)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIX = "claudeagotchi_"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram (as Prometheus exposes it)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot: above every bound
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation within the bucket (histogram_quantile)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+class _Timer:
+    """Times a with-block into a histogram."""
+
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics: 'Metrics', name: str, labels: Labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics._observe(self.name, self.labels, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    """A registry of counters and histograms, keyed by name and labels."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()  # Background saves and API threads record too
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+
+    def describe(self, name: str, help_text: str):
+        """HELP line for a metric in the Prometheus export."""
+        self._help[name] = help_text
+
+    # ==================== RECORDING ====================
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Add to a counter."""
+        if not self.enabled:
+            return
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a value (seconds, for timings) in a histogram."""
+        if not self.enabled:
+            return
+        self._observe(name, _labels(labels), value)
+
+    def _observe(self, name: str, key: Labels, value: float):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def timer(self, name: str, **labels):
+        """Context manager timing its block into histogram `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, _labels(labels))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # ==================== QUERIES ====================
+
+    def counter(self, name: str, **labels) -> float:
+        return self._counters.get(name, {}).get(_labels(labels), 0.0)
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self._histograms.get(name, {}).get(_labels(labels))
+
+    # ==================== EXPORT ====================
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                full = PREFIX + name
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{full}{_format_labels(labels)} {_format_value(value)}")
+
+            for name in sorted(self._histograms):
+                full = PREFIX + name
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} histogram")
+                for labels, h in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, n in zip(h.buckets + (float("inf"),), h.counts):
+                        cumulative += n
+                        le = ("le", _format_value(bound))
+                        lines.append(f"{full}_bucket{_format_labels(labels, le)} {cumulative}")
+                    lines.append(f"{full}_sum{_format_labels(labels)} {_format_value(h.sum)}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Human-readable table: counters, then timings with p50/p95/p99."""
+        if not self.enabled:
+            return "\n  Metrics are off (set \"metrics\": true in config.json).\n"
+
+        lines = [""]
+        with self._lock:
+            counters = sorted((name, labels, value) for name, series in self._counters.items()
+                              for labels, value in series.items())
+            histograms = sorted((name, labels, h) for name, series in self._histograms.items()
+                                for labels, h in series.items())
+
+            if counters:
+                lines.append("  COUNTERS")
+                for name, labels, value in counters:
+                    lines.append(f"    {name + _format_labels(labels):<48} {value:>8g}")
+            if histograms:
+                lines.append(f"\n  {'TIMINGS (ms)':<48} {'count':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+                for name, labels, h in histograms:
+                    lines.append(f"    {name + _format_labels(labels):<46} {h.count:>8} "
+                                 f"{h.quantile(0.5) * 1e3:>8.2f} {h.quantile(0.95) * 1e3:>8.2f} "
+                                 f"{h.quantile(0.99) * 1e3:>8.2f} {h.max * 1e3:>8.2f}")
+        if len(lines) == 1:
+            lines.append("  Nothing recorded yet.")
+        lines.append("")
+        return "\n".join(lines)
+
+
+# The process-wide registry
+METRICS = Metrics()
+
+METRICS.describe("api_chat_seconds", "Claude API chat call latency.")
+METRICS.describe("api_first_token_seconds", "Time to the first streamed text delta.")
+METRICS.describe("api_chats_total", "Claude API chat calls by outcome.")
+METRICS.describe("api_retries_total", "Transient API failures retried within the call's deadline.")
+METRICS.describe("api_cache_read_tokens_total", "Input tokens read from the prompt cache.")
+METRICS.describe("api_cache_write_tokens_total", "Input tokens written to the prompt cache.")
+METRICS.describe("api_uncached_tokens_total", "Input tokens billed at the uncached rate.")
+METRICS.describe("offline_failovers_total", "Times the API went offline after repeated failures.")
+METRICS.describe("offline_responses_total", "Replies generated locally instead of by the API.")
+METRICS.describe("offline_reconnect_attempts_total", "Retries of the API after an offline period.")
+METRICS.describe("offline_probes_total", "Background health checks of the API while offline, by outcome.")
+METRICS.describe("memory_load_seconds", "Loading memories and state from storage.")
+METRICS.describe("memory_snapshot_seconds", "Copying state for a save.")
+METRICS.describe("memory_write_seconds", "Writing a snapshot to storage.")
+METRICS.describe("scheduler_task_seconds", "Scheduled task run time (background tasks: time on the worker thread).")
+METRICS.describe("scheduler_task_errors_total", "Scheduled task runs that raised.")
+METRICS.describe("display_render_seconds", "Drawing one display frame.")
+METRICS.describe("pocket_request_seconds", "Pocket server request handling, by endpoint.")
+METRICS.describe("chat_speculative_total", "Local stand-in replies shown while the API was slow.")
+METRICS.describe("chat_hedged_total", "Slow API replies that replaced or followed a stand-in, by hedge_mode.")
+METRICS.describe("chat_cancelled_total", "Chat turns abandoned because the user typed again.")
+METRICS.describe("pool_tenant_wait_seconds", "Waiting for a tenant's request slot in the client pool.")
+METRICS.describe("pool_tenant_rejections_total", "Requests refused because their tenant was at its limit.")
+
+
+# ==================== BENCHMARK ====================
+
+if __name__ == "__main__":
+    import timeit
+
+    n = 200000
+    for enabled in (False, True):
+        METRICS.enable(enabled)
+        inc = timeit.timeit(lambda: METRICS.inc("bench_total", outcome="ok"), number=n) / n
+        def timed():
+            with METRICS.timer("bench_seconds", task="x"):
+                pass
+        timer = timeit.timeit(timed, number=n) / n
+        print(f"  {'enabled' if enabled else 'disabled':<8}  inc: {inc * 1e9:6.0f} ns   timer: {timer * 1e9:6.0f} ns")
+
+    print(METRICS.summary())
@@ -7,15 +7,22 @@ the soul keeps living. Interactions are queued and E keeps updating.
 The love equation doesn't need WiFi.
 """
 
+import os
 import json
+import asyncio
 import time
 import random
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
+from enum import Enum
 
 from affective_core import AffectiveState
+from analyzer import ANALYZER
+from client_pool import TenantBusy
+from metrics import METRICS
 
 
 @dataclass
@@ -40,29 +47,134 @@ class OfflineQueue:
     """
     Manages the queue of interactions that happened while offline.
     Persists to disk so nothing is lost.
+
+    The queue is an append-only JSONL journal: each add writes one line
+    instead of re-serializing the whole queue. Lines reach the OS
+    immediately; fsync is batched (every FSYNC_EVERY adds or
+    FSYNC_INTERVAL seconds). Dropping synced items appends a marker, and
+    the journal is compacted once dead lines pile up. A truncated last
+    line (crash mid-write) is discarded on load.
+
+    Adds come from chat worker threads while sync drops and compacts, so
+    journal writes, drops and compaction all hold one lock.
     """
 
+    FSYNC_EVERY = 8          # Adds between fsyncs
+    FSYNC_INTERVAL = 2.0     # Max seconds an add waits for fsync
+    COMPACT_MIN_DEAD = 64    # Dead lines before compaction is considered
+
     def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
-        self._queue_file = self.data_dir / "offline_queue.json"
+        self._queue_file = self.data_dir / "offline_queue.jsonl"
+        self._legacy_file = self.data_dir / "offline_queue.json"
         self.queue: List[QueuedInteraction] = []
+
+        self._journal = None
+        self._unsynced = 0
+        self._last_fsync = time.time()
+        self._dead_lines = 0
+        self._lock = threading.RLock()
+
         self._load()
 
     def _load(self):
-        """Load queue from disk."""
+        """Stream the journal from disk, tolerating a truncated last line."""
+        self.queue = []
+        self._dead_lines = 0
+        needs_compact = False
+
         if self._queue_file.exists():
+            good_bytes = 0
+            with open(self._queue_file, 'rb') as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break  # Truncated final write
+                    try:
+                        record = json.loads(raw)
+                        if record.get("op") == "drop":
+                            count = min(record.get("count", 0), len(self.queue))
+                            del self.queue[:count]
+                            self._dead_lines += count + 1
+                        else:
+                            self.queue.append(QueuedInteraction.from_dict(record))
+                    except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+                        needs_compact = True  # Skip a corrupt line
+                    good_bytes += len(raw)
+
+            if good_bytes < self._queue_file.stat().st_size:
+                # Drop the partial line so the next append starts clean
+                with open(self._queue_file, 'r+b') as f:
+                    f.truncate(good_bytes)
+
+        elif self._legacy_file.exists():
+            # One-time upgrade from the old whole-file JSON queue
             try:
-                with open(self._queue_file, 'r') as f:
+                with open(self._legacy_file, 'r') as f:
                     data = json.load(f)
                 self.queue = [QueuedInteraction.from_dict(item) for item in data]
-            except (json.JSONDecodeError, KeyError):
+            except (json.JSONDecodeError, KeyError, TypeError):
                 self.queue = []
+            self._compact()
+            self._legacy_file.unlink()
+            return
+
+        if needs_compact or self._should_compact():
+            self._compact()
+
+    def _open_journal(self):
+        if self._journal is None:
+            self._journal = open(self._queue_file, 'a', encoding='utf-8')
+        return self._journal
 
-    def _save(self):
-        """Save queue to disk."""
-        with open(self._queue_file, 'w') as f:
-            json.dump([item.to_dict() for item in self.queue], f, indent=2)
+    def _append(self, record: dict):
+        """Append one record; fsync in batches."""
+        journal = self._open_journal()
+        journal.write(json.dumps(record, separators=(",", ":")) + "\n")
+        journal.flush()
+        self._unsynced += 1
+
+        now = time.time()
+        if self._unsynced >= self.FSYNC_EVERY or now - self._last_fsync >= self.FSYNC_INTERVAL:
+            self.sync_to_disk()
+
+    def sync_to_disk(self):
+        """Force pending journal lines to stable storage."""
+        with self._lock:
+            self._sync_to_disk()
+
+    def _sync_to_disk(self):
+        if self._journal is not None and self._unsynced:
+            os.fsync(self._journal.fileno())
+        self._unsynced = 0
+        self._last_fsync = time.time()
+
+    def _should_compact(self) -> bool:
+        return (self._dead_lines >= self.COMPACT_MIN_DEAD
+                and self._dead_lines > len(self.queue))
+
+    def _compact(self):
+        """Rewrite the journal with only live entries (atomic rename)."""
+        self._close()
+        tmp = self._queue_file.with_name(self._queue_file.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for item in self.queue:
+                f.write(json.dumps(item.to_dict(), separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._queue_file)
+        self._dead_lines = 0
+
+    def close(self):
+        """Flush and close the journal (reopened on next add)."""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._journal is not None:
+            self._sync_to_disk()
+            self._journal.close()
+            self._journal = None
 
     def add(self, user_message: str, local_response: str,
             E: float, state: AffectiveState, quality: str):
@@ -75,13 +187,27 @@ class OfflineQueue:
             affective_state=state.value,
             interaction_quality=quality
         )
-        self.queue.append(interaction)
-        self._save()
+        with self._lock:
+            self.queue.append(interaction)
+            self._append(interaction.to_dict())
+
+    def drop(self, count: int):
+        """Remove the oldest `count` interactions (e.g. once synced)."""
+        with self._lock:
+            count = min(count, len(self.queue))
+            if count <= 0:
+                return
+            del self.queue[:count]
+            self._append({"op": "drop", "count": count})
+            self._dead_lines += count + 1
+            if self._should_compact():
+                self._compact()
 
     def clear(self):
         """Clear the queue after successful sync."""
-        self.queue = []
-        self._save()
+        with self._lock:
+            self.queue = []
+            self._compact()
 
     def get_summary(self) -> str:
         """
@@ -191,6 +317,24 @@ class LocalResponseGenerator:
         "?": ["Good question! I'll think about that.", "Hmm, I'd answer better online, but: I think so?"],
     }
 
+    # First reactions while Claude's reply is still on its way (online,
+    # so no mention of being offline); the reply replaces or follows them
+    SPECULATIVE = {
+        AffectiveState.PROTECTING: ["...", "Mm."],
+        AffectiveState.GUARDED: ["Mm. Give me a moment.", "Let me think.", "One moment."],
+        AffectiveState.TENDER: ["Hmm, let me think about that...", "Oh! Give me a second :)",
+                                "Let me find my words..."],
+        AffectiveState.WARM: ["Ooh, let me think about that!", "Hmm, good one. One sec...",
+                              "Oh! Thinking about it..."],
+        AffectiveState.FLOURISHING: ["Ooh! My thoughts are racing, one moment!",
+                                     "Oh, I love this. Let me gather my thoughts...",
+                                     "Wait wait, I have ideas. One sec!"],
+        AffectiveState.RADIANT: ["Oh, there's so much I want to say. One moment...",
+                                 "Let me find the right words for you..."],
+        AffectiveState.TRANSCENDENT: ["Mm. Let me sit with that for a moment...",
+                                      "There's something there. Give me a breath..."],
+    }
+
     def generate(self, user_message: str, state: AffectiveState,
                  E: float, owner_name: str = "Friend") -> Tuple[str, str]:
         """
@@ -221,20 +365,310 @@ class LocalResponseGenerator:
 
         return response, quality
 
+    def speculative(self, user_message: str, state: AffectiveState) -> str:
+        """An on-state first reaction to show while the API is answering."""
+        if "?" in user_message and state not in (AffectiveState.PROTECTING, AffectiveState.GUARDED):
+            return random.choice(["Good question! Let me think...", "Hmm, good question..."])
+        return random.choice(self.SPECULATIVE.get(state, self.SPECULATIVE[AffectiveState.WARM]))
+
     def _assess_quality(self, user_message: str) -> str:
-        """Assess interaction quality from user message."""
-        text = user_message.lower()
+        """Assess interaction quality from user message (same rules as online)."""
+        return ANALYZER.quality(user_message)
+
+
+# ==================== OFFLINE SYNC ====================
+
+SYNC_SYSTEM_PROMPT = """You help a tiny AI companion remember what happened while it was offline.
+You will be given a log of messages its owner sent during the outage.
+Reply ONLY with lines in these formats (omit any that don't apply):
+FACT: <a lasting fact about the owner>
+PREFERENCE: <something the owner likes or dislikes>
+MOMENT: <a memorable moment> | <one-word emotion>
+TOPIC: <one-word topic>
+SUMMARY: <one sentence summarizing the time offline>
+"""
+
+
+@dataclass
+class SyncProgress:
+    """Progress of an offline sync (survives as the shrinking queue)."""
+    total: int = 0
+    done: int = 0
+    chunks: int = 0
+    memories_added: int = 0
+    error: Optional[str] = None
+
+    @property
+    def remaining(self) -> int:
+        return self.total - self.done
+
+    @property
+    def complete(self) -> bool:
+        return self.error is None and self.done >= self.total
+
+
+class OfflineSync:
+    """
+    Replays the offline queue to the API in chunks.
+
+    Each chunk of queued interactions becomes ONE summarization request;
+    extracted facts/preferences/moments/topics go into the MemorySystem.
+    A chunk is dropped from the queue only after its memories are saved,
+    so an interrupted sync resumes at the first unsynced chunk.
+    """
+
+    CHUNK_SIZE = 25
+
+    def __init__(self, api, queue: OfflineQueue, memory,
+                 chunk_size: int = CHUNK_SIZE):
+        """
+        Args:
+            api: Object with complete(system, prompt, max_tokens) -> (ok, text)
+            queue: The offline queue to drain
+            memory: MemorySystem receiving extracted memories
+            chunk_size: Interactions per summarization request
+        """
+        self.api = api
+        self.queue = queue
+        self.memory = memory
+        self.chunk_size = chunk_size
+
+    def _format_chunk(self, chunk: List[QueuedInteraction]) -> str:
+        lines = [f"Owner: {self.memory.owner_name}", "Messages sent while offline:"]
+        for item in chunk:
+            when = datetime.fromtimestamp(item.timestamp).strftime("%Y-%m-%d %H:%M")
+            lines.append(
+                f"[{when}] ({item.affective_state}, E={item.E_at_time:.2f}, "
+                f"{item.interaction_quality}) User: {item.user_message}"
+            )
+        return "\n".join(lines)
+
+    def _apply_summary(self, text: str) -> int:
+        """Store memories parsed from a summary response. Returns count."""
+        added = 0
+        for line in text.splitlines():
+            if ":" not in line:
+                continue
+            kind, _, content = line.partition(":")
+            kind = kind.strip().upper()
+            content = content.strip()
+            if not content:
+                continue
+
+            if kind == "FACT":
+                self.memory.add_fact(content)
+            elif kind == "PREFERENCE":
+                self.memory.add_preference(content)
+            elif kind == "MOMENT":
+                description, _, emotion = content.partition("|")
+                self.memory.add_moment(description.strip(), emotion.strip() or "calm")
+            elif kind == "TOPIC":
+                self.memory.add_topic(content)
+            elif kind == "SUMMARY":
+                self.memory.add_moment(f"While offline: {content}", "calm")
+            else:
+                continue
+            added += 1
+        return added
+
+    def run(self, personality=None, max_chunks: Optional[int] = None,
+            on_progress=None) -> SyncProgress:
+        """
+        Sync queued interactions.
+
+        Args:
+            personality: Saved alongside memories after each chunk
+            max_chunks: Stop after this many chunks (None = drain the queue)
+            on_progress: Called with SyncProgress after each chunk
+        """
+        progress = SyncProgress(total=len(self.queue))
+
+        while self._wants_chunk(progress, max_chunks):
+            chunk = self.queue.queue[:self.chunk_size]
+            ok, text = self.api.complete(SYNC_SYSTEM_PROMPT, self._format_chunk(chunk))
+            if not ok:
+                progress.error = text
+                break
+            self._store(progress, chunk, text, lambda: self.memory.save(personality))
+            if on_progress:
+                on_progress(progress)
 
-        if any(w in text for w in ["love", "thank you so much", "amazing", "wonderful"]):
-            return "loving"
-        if any(w in text for w in ["thanks", "good", "nice", "happy", "glad"]):
-            return "warm"
-        if any(w in text for w in ["shut up", "stupid", "hate", "annoying"]):
-            return "harsh"
-        if len(text) < 5 or text in ["ok", "k", "fine", "whatever"]:
-            return "cold"
+        self.queue.sync_to_disk()
+        return progress
 
-        return "normal"
+    async def run_async(self, personality=None, max_chunks: Optional[int] = None,
+                        on_progress=None, save: Optional[Callable[[], None]] = None) -> SyncProgress:
+        """
+        run() for a caller on an asyncio event loop. Only the summarization
+        requests go to a worker thread; memories are stored and saved on
+        the loop's thread, like every other change to them.
+
+        Args:
+            save: Persists memories after each chunk
+                (default: memory.save(personality))
+        """
+        progress = SyncProgress(total=len(self.queue))
+        if save is None:
+            save = lambda: self.memory.save(personality)
+
+        while self._wants_chunk(progress, max_chunks):
+            chunk = self.queue.queue[:self.chunk_size]
+            ok, text = await asyncio.to_thread(self.api.complete, SYNC_SYSTEM_PROMPT,
+                                               self._format_chunk(chunk))
+            if not ok:
+                progress.error = text
+                break
+            self._store(progress, chunk, text, save)
+            if on_progress:
+                on_progress(progress)
+
+        self.queue.sync_to_disk()
+        return progress
+
+    def _wants_chunk(self, progress: SyncProgress, max_chunks: Optional[int]) -> bool:
+        return self.queue.has_pending() and (max_chunks is None or progress.chunks < max_chunks)
+
+    def _store(self, progress: SyncProgress, chunk: List[QueuedInteraction],
+               text: str, save: Callable[[], None]):
+        """Apply a chunk's summary, save, then drop the chunk from the queue."""
+        progress.memories_added += self._apply_summary(text)
+        save()
+        self.queue.drop(len(chunk))
+        progress.done += len(chunk)
+        progress.chunks += 1
+
+
+# ==================== CIRCUIT BREAKER ====================
+
+class CircuitState(Enum):
+    CLOSED = "closed"        # Online: requests go to the API
+    OPEN = "open"            # Offline: requests answered locally until retry_at
+    HALF_OPEN = "half_open"  # One trial request (or probe) is testing the API
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker with exponential backoff and jitter.
+
+    failure_threshold consecutive failures open the circuit. Once the
+    backoff has passed, one trial (a chat or a health probe) is let
+    through: success closes the circuit, failure reopens it with double
+    the delay. Delays follow the firmware's backoff_ms (5s, 10s, 20s, ...)
+    up to max_delay, each shortened by up to `jitter` of itself so many
+    souls don't retry in lockstep. A trial that ends with no answer either
+    way (interrupted, or the tenant had no free slot) must be handed back
+    with abandon_trial(), or the circuit would stay half-open for good.
+
+    Thread-safe: the health probe runs on the scheduler's thread pool.
+    """
+
+    def __init__(self, failure_threshold: int = 2, base_delay: float = 5.0,
+                 max_delay: float = 300.0, jitter: float = 0.5,
+                 clock: Callable[[], float] = time.monotonic,
+                 rng: Callable[[], float] = random.random):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            base_delay: Seconds before the first retry
+            max_delay: Cap on the doubled delay (seconds)
+            jitter: Fraction of each delay randomly taken off (0 = none)
+            clock: Monotonic seconds (injectable for tests)
+            rng: Uniform [0, 1) source for jitter
+        """
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._clock = clock
+        self._rng = rng
+        self._lock = threading.Lock()
+
+        self.state = CircuitState.CLOSED
+        self.failures = 0         # Consecutive failures
+        self.opens = 0            # Consecutive openings (the backoff exponent)
+        self.retry_at = 0.0       # Clock time of the next trial (when open)
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> 'CircuitBreaker':
+        """Build from a config "circuit_breaker" section."""
+        settings = settings or {}
+        return cls(
+            failure_threshold=settings.get("failure_threshold", 2),
+            base_delay=settings.get("base_delay_seconds", 5.0),
+            max_delay=settings.get("max_delay_seconds", 300.0),
+            jitter=settings.get("jitter", 0.5),
+        )
+
+    def delay(self, opens: int) -> float:
+        """Backoff before the trial after the n-th consecutive opening."""
+        delay = min(self.base_delay * 2 ** (opens - 1), self.max_delay)
+        return delay * (1.0 - self.jitter * self._rng())
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until the next trial (0 unless open)."""
+        if self.state != CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self.retry_at - self._clock())
+
+    def allow_request(self) -> bool:
+        """
+        May a request go to the API? An open circuit whose backoff has
+        passed turns half-open and admits this one request as its trial.
+        """
+        with self._lock:
+            if self.state == CircuitState.CLOSED:
+                return True
+            if self.state == CircuitState.OPEN and self._clock() >= self.retry_at:
+                self.state = CircuitState.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CircuitState.CLOSED
+            self.failures = 0
+            self.opens = 0
+
+    def record_failure(self) -> bool:
+        """Count a failure. Returns True if it took the circuit offline."""
+        with self._lock:
+            self.failures += 1
+            if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+                was_closed = self.state == CircuitState.CLOSED
+                self._open()
+                return was_closed
+            return False
+
+    def abandon_trial(self):
+        """The trial got no answer: reopen, with the next trial due now."""
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN:
+                self.state = CircuitState.OPEN
+                self.retry_at = self._clock()
+
+    def _open(self):
+        self.opens += 1
+        self.state = CircuitState.OPEN
+        self.retry_at = self._clock() + self.delay(self.opens)
+
+    def force_open(self):
+        """Open until reset() (no trials, no probes)."""
+        with self._lock:
+            self.state = CircuitState.OPEN
+            self.retry_at = float("inf")
+
+    def reset(self):
+        """Close now and forget past failures."""
+        self.record_success()
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "opens": self.opens,
+            "retry_in": round(self.retry_in, 1) if self.retry_at != float("inf") else None,
+        }
 
 
 # ==================== OFFLINE-AWARE API WRAPPER ====================
@@ -243,53 +677,79 @@ class OfflineAwareAPI:
     """
     Wraps the real API with offline fallback.
     Automatically switches to offline mode on API errors.
+
+    A CircuitBreaker decides when: repeated failures open it (offline),
+    and after a backoff one request tests the API again. Call probe()
+    periodically (main_v2 does, on a background thread) so that test is
+    usually a cheap health check rather than the user's next message.
     """
 
-    def __init__(self, real_api, data_dir: str = "data"):
+    def __init__(self, real_api, data_dir: str = "data", pool=None, tenant: Optional[str] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        Args:
+            real_api: The client to wrap (ClaudeAPI)
+            data_dir: Where the offline queue lives
+            pool: Shared ClientPool for the real API's requests (optional)
+            tenant: The real API's tenant in that pool
+            breaker: Circuit breaker (default: open after 2 failures,
+                retry after 5s doubling to 5 minutes)
+        """
         self.real_api = real_api
+        if pool is not None and hasattr(real_api, "use_pool"):
+            real_api.use_pool(pool, tenant)
         self.queue = OfflineQueue(data_dir)
         self.local_gen = LocalResponseGenerator()
-
-        self._offline_mode = False
-        self._last_api_attempt = 0
-        self._retry_interval = 300  # 5 minutes between retry attempts
-        self._consecutive_failures = 0
+        self.breaker = breaker or CircuitBreaker()
 
     @property
     def is_offline(self) -> bool:
-        return self._offline_mode
+        return self.breaker.state != CircuitState.CLOSED
 
     def chat(self, user_message: str, context: str,
              affective_state: AffectiveState,
              conversation_history=None,
              creativity_multiplier: float = 1.0,
              E: float = 1.0,
-             owner_name: str = "Friend") -> Tuple[bool, str, dict]:
+             owner_name: str = "Friend",
+             on_delta=None,
+             deadline=None) -> Tuple[bool, str, dict]:
         """
         Chat with automatic offline fallback.
+        on_delta is passed through to stream the real API's response, and
+        deadline (a claude_api_v2.Deadline) to bound it. A budget already
+        too short for an API attempt, or a tenant with no free request slot
+        in the pool (TenantBusy), gets the local reply without counting
+        against the API.
         """
-        now = time.time()
+        if deadline is not None and not deadline.allows_attempt():
+            return self._offline_response(user_message, affective_state, E, owner_name,
+                                          reason="deadline")
 
-        # If in offline mode, check if we should retry
-        if self._offline_mode:
-            if now - self._last_api_attempt > self._retry_interval:
-                # Try to go back online
-                self._offline_mode = False
-            else:
-                # Stay offline
-                return self._offline_response(user_message, affective_state, E, owner_name)
+        # Offline until the breaker lets a trial request through
+        if not self.breaker.allow_request():
+            return self._offline_response(user_message, affective_state, E, owner_name)
+        trial = self.breaker.state == CircuitState.HALF_OPEN
+        if trial:
+            METRICS.inc("offline_reconnect_attempts_total")
 
         # Try the real API
-        self._last_api_attempt = now
-
+        options = {}
+        if on_delta is not None:
+            options["on_delta"] = on_delta
+        if deadline is not None:
+            options["deadline"] = deadline
+        settled = False  # The breaker has been told how the call went
         try:
             success, response, metadata = self.real_api.chat(
                 user_message, context, affective_state,
-                conversation_history, creativity_multiplier
+                conversation_history, creativity_multiplier,
+                **options
             )
 
+            settled = True
             if success:
-                self._consecutive_failures = 0
+                self.breaker.record_success()
                 metadata["offline"] = False
                 return True, response, metadata
             else:
@@ -298,29 +758,37 @@ class OfflineAwareAPI:
                     user_message, response, affective_state, E, owner_name
                 )
 
+        except TenantBusy:
+            return self._offline_response(user_message, affective_state, E, owner_name,
+                                          reason="busy")
         except Exception as e:
+            settled = True
             return self._handle_api_failure(
                 user_message, str(e), affective_state, E, owner_name
             )
+        finally:
+            if trial and not settled:
+                # Busy, or interrupted (KeyboardInterrupt, a dying worker)
+                self.breaker.abandon_trial()
 
     def _handle_api_failure(self, user_message: str, error: str,
                            state: AffectiveState, E: float,
                            owner_name: str) -> Tuple[bool, str, dict]:
-        """Handle API failure by switching to offline mode."""
-        self._consecutive_failures += 1
-
-        # After 2 consecutive failures, switch to offline mode
-        if self._consecutive_failures >= 2:
-            self._offline_mode = True
+        """Handle API failure (enough of them switch to offline mode)."""
+        if self.breaker.record_failure():
+            METRICS.inc("offline_failovers_total")
 
         return self._offline_response(user_message, state, E, owner_name, first_error=error)
 
     def _offline_response(self, user_message: str, state: AffectiveState,
                          E: float, owner_name: str,
-                         first_error: str = None) -> Tuple[bool, str, dict]:
+                         first_error: str = None,
+                         reason: Optional[str] = None) -> Tuple[bool, str, dict]:
         """Generate offline response and queue the interaction."""
 
         response, quality = self.local_gen.generate(user_message, state, E, owner_name)
+        METRICS.inc("offline_responses_total",
+                    reason=reason or ("api_error" if first_error else "offline"))
 
         # Add offline indicator on first message
         if first_error and "credit" in first_error.lower():
@@ -367,18 +835,81 @@ class OfflineAwareAPI:
         """Clear the offline queue after sync."""
         self.queue.clear()
 
+    def sync_pending(self, memory, personality=None,
+                     max_chunks: Optional[int] = None,
+                     on_progress=None) -> SyncProgress:
+        """Replay queued interactions to the real API (when online)."""
+        if self.is_offline or not hasattr(self.real_api, "complete"):
+            return SyncProgress(total=len(self.queue), error="offline")
+        syncer = OfflineSync(self.real_api, self.queue, memory)
+        try:
+            progress = syncer.run(personality, max_chunks=max_chunks, on_progress=on_progress)
+        except TenantBusy as e:
+            # Synced chunks are already off the queue; the rest waits for a slot
+            return SyncProgress(total=len(self.queue), error=str(e))
+        if progress.error:
+            self._handle_sync_failure()
+        return progress
+
+    async def sync_pending_async(self, memory, personality=None,
+                                 max_chunks: Optional[int] = None,
+                                 on_progress=None, save=None) -> SyncProgress:
+        """sync_pending() from an event loop (see OfflineSync.run_async)."""
+        if self.is_offline or not hasattr(self.real_api, "complete"):
+            return SyncProgress(total=len(self.queue), error="offline")
+        syncer = OfflineSync(self.real_api, self.queue, memory)
+        try:
+            progress = await syncer.run_async(personality, max_chunks=max_chunks,
+                                              on_progress=on_progress, save=save)
+        except TenantBusy as e:
+            return SyncProgress(total=len(self.queue), error=str(e))
+        if progress.error:
+            self._handle_sync_failure()
+        return progress
+
+    def _handle_sync_failure(self):
+        """A failed sync counts as a failed API attempt."""
+        if self.breaker.record_failure():
+            METRICS.inc("offline_failovers_total")
+
+    def probe(self) -> Optional[bool]:
+        """
+        Health check: if the circuit is due a trial, ping the API and close
+        or reopen it. Returns the ping's result, or None if no trial was due
+        (or the real API can't be pinged). Safe to call from a thread.
+        """
+        if not hasattr(self.real_api, "ping"):
+            return None
+        if self.breaker.state != CircuitState.OPEN or not self.breaker.allow_request():
+            return None
+
+        METRICS.inc("offline_reconnect_attempts_total")
+        ok = None
+        try:
+            ok = self.real_api.ping()
+        except TenantBusy:
+            return None
+        finally:
+            if ok is None:
+                self.breaker.abandon_trial()
+        METRICS.inc("offline_probes_total", outcome="ok" if ok else "failed")
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        return ok
+
     def has_pending_sync(self) -> bool:
         """Check if there are interactions to sync."""
         return self.queue.has_pending()
 
     def force_offline(self):
-        """Force offline mode (for testing)."""
-        self._offline_mode = True
+        """Force offline mode (for testing). Stays offline until force_online."""
+        self.breaker.force_open()
 
     def force_online(self):
         """Force online mode (for testing)."""
-        self._offline_mode = False
-        self._consecutive_failures = 0
+        self.breaker.reset()
 
     def set_debug(self, enabled: bool):
         """Pass through to real API."""
@@ -14,6 +14,7 @@ from dataclasses import dataclass, field, asdict
 from typing import Optional
 
 from affective_core import AffectiveCore, AffectiveState
+from soul_log import recording
 
 
 # ==================== SURFACE STATE ====================
@@ -98,6 +99,9 @@ class Personality:
         
         # Timing
         self._last_update = time.time()
+        
+        # Event log (SoulLog.attach); None records nothing
+        self.log = None
     
     # ==================== CORE DELEGATION ====================
     
@@ -140,7 +144,7 @@ class Personality:
         if hour >= 23 or hour < 6:
             self.surface.sleepiness = min(1.0, self.surface.sleepiness + 0.01 * dt_minutes)
     
-    def on_interaction(self, quality: str = "normal"):
+    def on_interaction(self, quality: str = "normal", now: Optional[float] = None):
         """
         Called when an interaction occurs.
         
@@ -156,18 +160,20 @@ class Personality:
         }
         
         care, damage = care_map.get(quality, (1.0, 0.0))
+        now = time.time() if now is None else now
         
-        if damage > 0:
-            self.core.apply_damage(damage)
-        else:
-            self.core.apply_care(care)
-        
-        # Surface excitement from interaction
-        self.surface.excitement = min(1.0, self.surface.excitement + 0.3)
-        
-        # Evolve traits slightly
-        if quality in ["warm", "loving"]:
-            self.traits.poetic = min(1.0, self.traits.poetic + 0.003)
+        with recording(self.log, now, "interaction", quality, self.core.E, self.core.E_floor):
+            if damage > 0:
+                self.core.apply_damage(damage, now=now)
+            else:
+                self.core.apply_care(care, now=now)
+            
+            # Surface excitement from interaction
+            self.surface.excitement = min(1.0, self.surface.excitement + 0.3)
+            
+            # Evolve traits slightly
+            if quality in ["warm", "loving"]:
+                self.traits.poetic = min(1.0, self.traits.poetic + 0.003)
     
     def on_question_asked(self):
         """Called when we ask a question or show curiosity."""
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Claudeagotchi Pocket Server
+
+A local stand-in for the hosted ApexPocket backend. Serves the endpoints
+the ESP32 firmware talks to (esp32/src/cloud.h), with the same payloads:
+
+    GET  /api/v1/pocket/status  - Connection check, usage counters, MOTD
+    POST /api/v1/pocket/chat    - Message in, reply + expression + care out
+    POST /api/v1/pocket/care    - Love/poke events
+    POST /api/v1/pocket/sync    - Full soul state from the device
+    GET  /api/v1/pocket/agents  - Selectable agents
+    GET  /metrics               - Prometheus metrics (metrics_token only)
+
+Every request carries "Authorization: Bearer <device token>" (for /metrics,
+the separate "metrics_token", so a scraper can't act as a device and a
+device can't list the others; without one, /metrics is off). Each token
+is one device with its own soul (Claudeagotchi with its own Personality,
+MemorySystem and OfflineAwareAPI) under data/devices/<device>/. Devices
+are served concurrently on one asyncio loop; requests to the same soul
+are handled one at a time. Souls are loaded on demand and kept in a
+SoulManager LRU, so thousands of devices fit in one process. Their API
+requests share one keep-alive ClientPool; each device is a tenant with
+its own concurrency limit (devices may share one via "tenant").
+
+Status codes follow what the firmware expects: 401 for unknown tokens,
+402 once a device hits messages_limit.
+
+Run:
+    python src/pocket_server.py [--host 0.0.0.0] [--port 8080]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from main_v2 import Claudeagotchi, load_config
+from client_pool import ClientPool
+from display.terminal_face import HeadlessFace
+from metrics import METRICS
+from soul_manager import SoulManager, SOUL_OVERHEAD_BYTES, DEFAULT_MAX_SOULS, DEFAULT_MEMORY_BUDGET_MB
+
+
+# ==================== CONSTANTS ====================
+
+API_PREFIX = "/api/v1/pocket"
+DEFAULT_AGENTS = ["AZOTH", "ELYSIAN", "VAJRA", "KETHER", "CLAUDE"]  # soul.h
+SAVE_INTERVAL = 300              # Seconds between saving dirty souls
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+KEEP_ALIVE_TIMEOUT = 30          # Seconds an idle connection stays open
+
+# Care value the device applies for each interaction quality
+CARE_VALUES = {
+    "harsh": 0.0,
+    "cold": 0.2,
+    "normal": 1.0,
+    "warm": 1.5,
+    "loving": 2.0,
+}
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    402: "Payment Required",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    """Abort a request with a status code and JSON error body."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ==================== DEVICES ====================
+
+@dataclass
+class DeviceInfo:
+    """What the server knows about a device besides its soul."""
+    device_id: str
+    messages_used: int = 0
+    agent: str = ""
+    firmware: str = ""
+    wisdom: float = 0.0
+    last_seen: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DeviceInfo':
+        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+
+
+@dataclass
+class DeviceSoul:
+    """A device's soul plus its bookkeeping."""
+    gotchi: Claudeagotchi
+    info: DeviceInfo
+    info_file: Path
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    dirty: bool = False
+
+    def save(self):
+        self.gotchi.memory.save(self.gotchi.personality)
+        with open(self.info_file, 'w') as f:
+            json.dump(self.info.to_dict(), f, indent=2)
+        self.dirty = False
+
+    def estimated_size(self) -> int:
+        return SOUL_OVERHEAD_BYTES + self.gotchi.memory.estimated_size()
+
+    def close(self):
+        if self.gotchi.soul_log:
+            self.gotchi.soul_log.close()
+        self.gotchi.memory.storage.close()
+        queue = getattr(self.gotchi.api, "queue", None)
+        if queue is not None:
+            queue.close()
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+# ==================== SERVER ====================
+
+class PocketServer:
+    """
+    asyncio HTTP/1.1 server for ApexPocket devices.
+    """
+
+    def __init__(self, config: dict, data_dir=None):
+        """
+        Args:
+            config: Base config (as for main_v2) plus a "pocket_server"
+                section: host, port, devices, messages_limit, motd, agents,
+                max_loaded_souls, soul_memory_budget_mb; "http_pool"
+                sizes the shared connection pool
+            data_dir: Root for per-device souls (default: <repo>/data/devices)
+        """
+        self.config = config
+        server_config = config.get("pocket_server", {})
+        self.host = server_config.get("host", "0.0.0.0")
+        self.port = server_config.get("port", 8080)
+        self.messages_limit = server_config.get("messages_limit", 0)  # 0 = unlimited
+        self.motd = server_config.get("motd", "")
+        self.agents = server_config.get("agents", DEFAULT_AGENTS)
+        METRICS.enable(config.get("metrics", True))
+
+        # One keep-alive pool for every soul's API requests
+        self.pool = ClientPool.from_config(config.get("http_pool"))
+
+        data_dir = Path(data_dir) if data_dir else Path(__file__).parent.parent / "data" / "devices"
+
+        # Token -> device settings. Only hashes are kept in memory.
+        # "devices": {"apex_dev_...": "kitchen"} or {"apex_dev_...": {"name": ..., "owner_name": ...}}
+        self._devices: Dict[str, dict] = {}
+        self._devices_by_name: Dict[str, dict] = {}
+        for token, device in server_config.get("devices", {}).items():
+            if isinstance(device, str):
+                device = {"name": device}
+            self._devices[_hash_token(token)] = device
+            self._devices_by_name[device["name"]] = device
+        metrics_token = server_config.get("metrics_token")
+        self._metrics_token = _hash_token(metrics_token) if metrics_token else None
+
+        self.souls = SoulManager(
+            str(data_dir),
+            loader=self._load_soul,
+            max_souls=server_config.get("max_loaded_souls", DEFAULT_MAX_SOULS),
+            memory_budget_mb=server_config.get("soul_memory_budget_mb", DEFAULT_MEMORY_BUDGET_MB),
+        )
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._save_task: Optional[asyncio.Task] = None
+
+    # ==================== SOULS ====================
+
+    def _load_soul(self, name: str, soul_dir: Path) -> DeviceSoul:
+        """Build or restore a device's soul (blocking; SoulManager loader)."""
+        device = self._devices_by_name.get(name, {})
+
+        soul_config = dict(self.config)
+        soul_config["owner_name"] = device.get("owner_name", self.config.get("owner_name", "Friend"))
+        soul_config["stream"] = False
+        soul_config["proactive_enabled"] = False
+        soul_config["hedge_after_seconds"] = 0  # One HTTP reply per message
+        soul_config["tenant"] = device.get("tenant", name)
+
+        # Claudeagotchi applies the idle time since the last save on load
+        gotchi = Claudeagotchi(soul_config, data_dir=soul_dir, display=HeadlessFace(),
+                               verbose=False, pool=self.pool)
+
+        info_file = soul_dir / "device.json"
+        info = DeviceInfo(device_id=name)
+        if info_file.exists():
+            with open(info_file) as f:
+                info = DeviceInfo.from_dict(json.load(f))
+
+        return DeviceSoul(gotchi=gotchi, info=info, info_file=info_file)
+
+    async def save_all(self):
+        """Save every loaded soul that changed since its last save."""
+        for name in self.souls.loaded_ids():
+            soul = await asyncio.to_thread(self.souls.acquire, name)
+            try:
+                if soul.dirty:
+                    async with soul.lock:
+                        await asyncio.to_thread(soul.save)
+            except Exception as e:
+                print(f"[PocketServer] Save failed for {name}: {e}")
+            finally:
+                await asyncio.to_thread(self.souls.release, name)
+
+    async def _save_loop(self):
+        while True:
+            await asyncio.sleep(SAVE_INTERVAL)
+            await self.save_all()
+
+    # ==================== ENDPOINTS ====================
+
+    @staticmethod
+    def _bearer(headers: dict) -> str:
+        """Hash of the request's bearer token."""
+        auth = headers.get("authorization", "")
+        scheme, _, token = auth.partition(" ")
+        if scheme.lower() != "bearer" or not token.strip():
+            raise HTTPError(401, "missing bearer token")
+        return _hash_token(token.strip())
+
+    def _authenticate(self, headers: dict) -> str:
+        token_hash = self._bearer(headers)
+        if token_hash not in self._devices:
+            raise HTTPError(401, "invalid token")
+        return token_hash
+
+    def _authenticate_metrics(self, headers: dict):
+        # Series are labelled by device (tenant), so never serve them openly
+        if self._metrics_token is None:
+            raise HTTPError(404, "not found")
+        if self._bearer(headers) != self._metrics_token:
+            raise HTTPError(401, "invalid token")
+
+    @staticmethod
+    def _adopt_device_E(soul: DeviceSoul, body: dict):
+        """The device runs the Love-Equation itself; its E is authoritative."""
+        if "E" not in body:
+            return
+        try:
+            E = float(body["E"])
+        except (TypeError, ValueError):
+            raise HTTPError(400, "E must be a number")
+        core = soul.gotchi.personality.core
+        core.E = min(100.0, max(core.E_floor, E))
+        core.E_peak = max(core.E_peak, core.E)
+
+    async def handle_status(self, soul: DeviceSoul, body: dict) -> dict:
+        return {
+            "status": "ok",
+            "tools_available": 0,
+            "messages_used": soul.info.messages_used,
+            "messages_limit": self.messages_limit,
+            "tier": "local",
+            "motd": self.motd,
+        }
+
+    async def handle_chat(self, soul: DeviceSoul, body: dict) -> dict:
+        message = body.get("message")
+        if not isinstance(message, str) or not message.strip():
+            raise HTTPError(400, "message is required")
+        if self.messages_limit and soul.info.messages_used >= self.messages_limit:
+            raise HTTPError(402, "message limit reached")
+
+        self._adopt_device_E(soul, body)
+        soul.info.agent = body.get("agent", soul.info.agent)
+        soul.info.firmware = body.get("firmware", soul.info.firmware)
+
+        gotchi = soul.gotchi
+        gotchi.personality.update()
+        response = await gotchi.chat_async(message.strip())
+        soul.info.messages_used += 1
+
+        return {
+            "response": response,
+            "expression": gotchi.display.expression,
+            "care_value": CARE_VALUES.get(gotchi.last_quality, 1.0),
+            "E": gotchi.personality.E,
+            "messages_used": soul.info.messages_used,
+        }
+
+    async def handle_care(self, soul: DeviceSoul, body: dict) -> dict:
+        care_type = body.get("care_type", "love")
+        try:
+            intensity = float(body.get("intensity", 1.0))
+        except (TypeError, ValueError):
+            raise HTTPError(400, "intensity must be a number")
+
+        self._adopt_device_E(soul, body)
+        personality = soul.gotchi.personality
+        personality.update()
+        personality.core.apply_care(max(0.0, intensity))
+
+        return {"status": "ok", "care_type": care_type, "E": personality.E}
+
+    async def handle_sync(self, soul: DeviceSoul, body: dict) -> dict:
+        core = soul.gotchi.personality.core
+        traits = soul.gotchi.personality.traits
+        try:
+            for key in ("E_floor", "E_peak", "total_care"):
+                if key in body:
+                    setattr(core, key, float(body[key]))
+            if "interactions" in body:
+                core.interactions = int(body["interactions"])
+            for key in ("curiosity", "playfulness"):
+                if key in body:
+                    setattr(traits, key, min(1.0, max(0.0, float(body[key]))))
+            if "wisdom" in body:
+                soul.info.wisdom = float(body["wisdom"])
+        except (TypeError, ValueError):
+            raise HTTPError(400, "sync fields must be numbers")
+        self._adopt_device_E(soul, body)
+        core.last_update = time.time()
+
+        soul.info.agent = body.get("agent", soul.info.agent)
+        soul.info.firmware = body.get("firmware", soul.info.firmware)
+
+        return {"status": "ok", "motd": self.motd, "E": core.E}
+
+    async def handle_agents(self, soul: DeviceSoul, body: dict) -> dict:
+        return {"agents": list(self.agents)}
+
+    ROUTES = {
+        ("GET", "/status"): "handle_status",
+        ("POST", "/chat"): "handle_chat",
+        ("POST", "/care"): "handle_care",
+        ("POST", "/sync"): "handle_sync",
+        ("GET", "/agents"): "handle_agents",
+    }
+
+    async def dispatch(self, method: str, path: str, headers: dict, raw_body: bytes) -> Tuple[int, dict]:
+        """Route a parsed request. Returns (status, JSON body, or text for /metrics)."""
+        path = path.split("?", 1)[0].rstrip("/")
+        if path == "/metrics" and method == "GET":
+            self._authenticate_metrics(headers)
+            return 200, METRICS.to_prometheus()
+        if not path.startswith(API_PREFIX):
+            raise HTTPError(404, "not found")
+        endpoint = path[len(API_PREFIX):]
+
+        handler_name = self.ROUTES.get((method, endpoint))
+        if handler_name is None:
+            if any(route_path == endpoint for _, route_path in self.ROUTES):
+                raise HTTPError(405, "method not allowed")
+            raise HTTPError(404, "not found")
+
+        token_hash = self._authenticate(headers)
+
+        body = {}
+        if raw_body:
+            try:
+                body = json.loads(raw_body)
+            except ValueError:
+                raise HTTPError(400, "invalid JSON")
+            if not isinstance(body, dict):
+                raise HTTPError(400, "expected a JSON object")
+
+        # Loading, and any eviction write-back it triggers, is disk I/O
+        name = self._devices[token_hash]["name"]
+        soul = await asyncio.to_thread(self.souls.acquire, name)
+        try:
+            async with soul.lock:
+                with METRICS.timer("pocket_request_seconds", endpoint=endpoint):
+                    result = await getattr(self, handler_name)(soul, body)
+                soul.info.last_seen = time.time()
+                if method == "POST":
+                    soul.dirty = True
+        finally:
+            await asyncio.to_thread(self.souls.release, name)
+        return 200, result
+
+    # ==================== HTTP ====================
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """Parse one request. Returns None when the client closes."""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(413, "headers too large")
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "bad content-length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "body too large")
+        body = await reader.readexactly(length) if length else b""
+
+        keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+        return method.upper(), target, headers, body, keep_alive
+
+    @staticmethod
+    def _encode_response(status: int, payload, keep_alive: bool) -> bytes:
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Error')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"\r\n"
+        )
+        return head.encode("latin-1") + body
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body, keep_alive = request
+                    status, payload = await self.dispatch(method, target, headers, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except (asyncio.TimeoutError, ConnectionError):
+                    break
+                except Exception as e:
+                    print(f"[PocketServer] Error: {e}")
+                    status, payload = 500, {"error": "internal error"}
+
+                writer.write(self._encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        """Start listening. Returns once the socket is bound."""
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._save_task = asyncio.create_task(self._save_loop())
+
+    async def stop(self):
+        """Stop listening and save every soul."""
+        if self._save_task:
+            self._save_task.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.save_all()
+        await asyncio.to_thread(self.souls.close)
+        self.pool.close()
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Pocket server listening on http://{self.host}:{self.port}{API_PREFIX}")
+        print(f"  {len(self._devices)} device token(s) configured")
+        if self._metrics_token is None:
+            print("  /metrics off (set pocket_server.metrics_token to scrape it)")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def main():
+    """Entry point."""
+    parser = argparse.ArgumentParser(description="Local ApexPocket backend")
+    parser.add_argument("--host", help="Interface to bind (default from config, else 0.0.0.0)")
+    parser.add_argument("--port", type=int, help="Port (default from config, else 8080)")
+    args = parser.parse_args()
+
+    config = load_config()
+    server_config = config.setdefault("pocket_server", {})
+    if args.host:
+        server_config["host"] = args.host
+    if args.port:
+        server_config["port"] = args.port
+    if not server_config.get("devices"):
+        print("⚠️  No pocket_server.devices configured; every request will get 401.")
+
+    server = PocketServer(config)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("\nSouls saved. The love is carried forward. ♥")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,50 +2,189 @@
 Claudeagotchi Scheduler
 
 Simple task scheduler for periodic operations.
+
+Tasks are kept in a min-heap keyed by their next deadline, so update()
+only looks at tasks that are actually due and the main loop can sleep
+exactly until the next one (time_until_next_due()). Deadlines run on
+time.monotonic(), so wall-clock jumps (NTP, suspend/resume, DST) neither
+fire every task at once nor stall them.
+
+When a task falls behind (the loop was blocked, the machine slept), its
+catch-up policy decides what happens to the missed runs:
+
+    COALESCE  run once now, next run one interval from now (default)
+    SKIP      run once now, stay on the original grid (drop missed runs)
+    RUN_ALL   run once for every missed interval (capped at MAX_CATCH_UP)
+
+Slow tasks (disk I/O) can be marked background=True: they run on a small
+thread pool so they never delay blinks or display updates. Their optional
+prepare() step runs inline first and its result is handed to the worker,
+which is how state gets copied on the owning thread before serialization.
+A background task whose previous run is still in flight is skipped.
 """
 
+import heapq
+import itertools
 import time
-from typing import Callable, Dict, Optional
-from dataclasses import dataclass
+from contextlib import nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+
+from metrics import METRICS
+
+
+MAX_CATCH_UP = 100  # Most missed runs a RUN_ALL task replays in one update()
+MAX_WORKERS = 2     # Threads for background tasks
+
+
+class CatchUp(Enum):
+    """What to do with runs missed while the scheduler wasn't ticking."""
+    COALESCE = "coalesce"
+    SKIP = "skip"
+    RUN_ALL = "run_all"
 
 
 @dataclass
 class ScheduledTask:
-    """A task that runs on a schedule."""
+    """A task that runs on a schedule. Times are monotonic milliseconds."""
     name: str
     callback: Callable
     interval_ms: int
+    next_due: float = 0
     last_run: float = 0
     enabled: bool = True
+    catch_up: CatchUp = CatchUp.COALESCE
+    generation: int = 0  # Bumped on reschedule; older heap entries are stale
+    background: bool = False
+    prepare: Optional[Callable] = None  # Inline step; result is passed to callback
+    future: Optional[Future] = field(default=None, repr=False)
+    started: float = field(default=0.0, repr=False)  # perf_counter() when the worker picked it up
     
-    def is_due(self) -> bool:
+    def is_due(self, now_ms: float) -> bool:
         """Check if task is due to run."""
-        if not self.enabled:
-            return False
-        return (time.time() * 1000 - self.last_run) >= self.interval_ms
+        return self.enabled and now_ms >= self.next_due
+    
+    @property
+    def running(self) -> bool:
+        """True while a background run is in flight."""
+        return self.future is not None and not self.future.done()
+    
+    def run(self, now_ms: float, executor: Optional[ThreadPoolExecutor] = None) -> bool:
+        """
+        Execute the task (or hand it to the executor, if background).
+        Returns False if skipped because the previous run is still going.
+        """
+        if self.background and executor is not None:
+            if self.running:
+                return False
+            self.last_run = now_ms
+            args = (self.prepare(),) if self.prepare else ()
+            self.future = executor.submit(self._run_background, *args)
+            self.future.add_done_callback(self._report)
+            return True
+        
+        self.last_run = now_ms
+        if self.prepare:
+            self.callback(self.prepare())
+        else:
+            self.callback()
+        return True
+    
+    def _run_background(self, *args):
+        self.started = time.perf_counter()
+        return self.callback(*args)
     
-    def run(self):
-        """Execute the task."""
-        self.last_run = time.time() * 1000
-        self.callback()
+    def _report(self, future: Future):
+        """Done-callback: time the worker's run and count its errors."""
+        if future.cancelled():
+            return
+        METRICS.observe("scheduler_task_seconds", time.perf_counter() - self.started, task=self.name)
+        if future.exception() is not None:
+            print(f"[Scheduler] Error in task '{self.name}': {future.exception()}")
+            METRICS.inc("scheduler_task_errors_total", task=self.name)
 
 
 class Scheduler:
     """
-    Simple scheduler for periodic tasks.
+    Min-heap scheduler for periodic tasks.
     """
     
-    def __init__(self):
+    def __init__(self, clock: Callable[[], float] = time.monotonic,
+                 max_workers: int = MAX_WORKERS):
+        """
+        Args:
+            clock: Monotonic time source in seconds (injectable for tests)
+            max_workers: Thread pool size for background tasks
+        """
+        self._clock = clock
         self._tasks: Dict[str, ScheduledTask] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []  # (next_due, seq, name, generation)
+        self._seq = itertools.count()
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
     
-    def add_task(self, name: str, interval_ms: int, callback: Callable):
-        """Add a new scheduled task."""
-        self._tasks[name] = ScheduledTask(
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers, thread_name_prefix="scheduler"
+            )
+        return self._executor
+    
+    def _now_ms(self) -> float:
+        return self._clock() * 1000
+    
+    def _push(self, task: ScheduledTask):
+        """(Re)schedule a task at its next_due, invalidating older entries."""
+        task.generation += 1
+        heapq.heappush(self._heap, (task.next_due, next(self._seq), task.name, task.generation))
+        
+        # Reschedules leave stale entries behind; compact if they pile up
+        if len(self._heap) > 2 * len(self._tasks) + 64:
+            self._heap = [
+                (t.next_due, next(self._seq), t.name, t.generation)
+                for t in self._tasks.values() if t.enabled
+            ]
+            heapq.heapify(self._heap)
+    
+    def _peek(self) -> Optional[ScheduledTask]:
+        """Earliest live task, dropping stale heap entries on the way."""
+        while self._heap:
+            _, _, name, generation = self._heap[0]
+            task = self._tasks.get(name)
+            if task is not None and task.enabled and task.generation == generation:
+                return task
+            heapq.heappop(self._heap)
+        return None
+    
+    def add_task(self, name: str, interval_ms: int, callback: Callable,
+                 catch_up: CatchUp = CatchUp.COALESCE,
+                 background: bool = False, prepare: Optional[Callable] = None):
+        """
+        Add a new scheduled task.
+        
+        Args:
+            background: Run callback on the thread pool instead of inline
+            prepare: Called inline before each run; its result is passed
+                to callback (e.g. a state snapshot for a background save)
+        """
+        now_ms = self._now_ms()
+        task = ScheduledTask(
             name=name,
             callback=callback,
             interval_ms=interval_ms,
-            last_run=time.time() * 1000  # Don't run immediately
+            next_due=now_ms + interval_ms,  # Don't run immediately
+            last_run=now_ms,
+            catch_up=catch_up,
+            background=background,
+            prepare=prepare
         )
+        old = self._tasks.get(name)
+        if old is not None:
+            task.generation = old.generation
+        self._tasks[name] = task
+        self._push(task)
     
     def remove_task(self, name: str):
         """Remove a task."""
@@ -54,30 +193,85 @@ class Scheduler:
     
     def enable_task(self, name: str):
         """Enable a task."""
-        if name in self._tasks:
-            self._tasks[name].enabled = True
+        task = self._tasks.get(name)
+        if task is not None and not task.enabled:
+            task.enabled = True
+            self._push(task)
     
     def disable_task(self, name: str):
         """Disable a task."""
         if name in self._tasks:
             self._tasks[name].enabled = False
     
-    def update(self):
+    def _reschedule(self, task: ScheduledTask, now_ms: float,
+                    policy: Optional[CatchUp] = None):
+        """Pick the next deadline after a run, per the catch-up policy."""
+        policy = policy or task.catch_up
+        interval = max(task.interval_ms, 1)
+        if policy == CatchUp.COALESCE:
+            task.next_due = now_ms + interval
+        elif policy == CatchUp.SKIP:
+            missed = int((now_ms - task.next_due) // interval)
+            task.next_due += (missed + 1) * interval
+        else:  # RUN_ALL: next missed slot (may already be due)
+            task.next_due += interval
+        self._push(task)
+    
+    def update(self) -> int:
         """
-        Check and run any due tasks.
+        Run every task that is due.
         Should be called regularly from the main loop.
+        Returns the number of task runs.
         """
-        for task in self._tasks.values():
-            if task.is_due():
-                try:
-                    task.run()
-                except Exception as e:
-                    print(f"[Scheduler] Error in task '{task.name}': {e}")
+        now_ms = self._now_ms()
+        ran = 0
+        catch_up_runs: Dict[str, int] = {}
+        
+        while True:
+            task = self._peek()
+            if task is None or not task.is_due(now_ms):
+                break
+            heapq.heappop(self._heap)
+            
+            # Background runs are timed by their done-callback, not here
+            timer = nullcontext() if task.background else METRICS.timer("scheduler_task_seconds", task=task.name)
+            try:
+                with timer:
+                    if task.run(now_ms, self._get_executor() if task.background else None):
+                        ran += 1
+            except Exception as e:
+                print(f"[Scheduler] Error in task '{task.name}': {e}")
+                METRICS.inc("scheduler_task_errors_total", task=task.name)
+                ran += 1
+            
+            if self._tasks.get(task.name) is not task:  # Removed or replaced itself
+                continue
+            self._reschedule(task, now_ms)
+            
+            if task.catch_up == CatchUp.RUN_ALL:
+                catch_up_runs[task.name] = catch_up_runs.get(task.name, 0) + 1
+                if catch_up_runs[task.name] >= MAX_CATCH_UP and task.next_due <= now_ms:
+                    # Too far behind; drop the rest and rejoin the grid
+                    self._reschedule(task, now_ms, CatchUp.SKIP)
+        
+        return ran
+    
+    def time_until_next_due(self) -> Optional[float]:
+        """Seconds until the next enabled task is due (None if no tasks)."""
+        task = self._peek()
+        if task is None:
+            return None
+        return max(0.0, (task.next_due - self._now_ms()) / 1000.0)
     
     def run_now(self, name: str):
         """Force a task to run immediately."""
-        if name in self._tasks:
-            self._tasks[name].run()
+        task = self._tasks.get(name)
+        if task is not None:
+            now_ms = self._now_ms()
+            task.run(now_ms, self._get_executor() if task.background else None)
+            task.next_due = now_ms + task.interval_ms
+            if task.enabled:
+                self._push(task)
     
     def get_task_info(self, name: str) -> Optional[dict]:
         """Get info about a task."""
@@ -88,13 +282,31 @@ class Scheduler:
             "name": task.name,
             "interval_ms": task.interval_ms,
             "enabled": task.enabled,
+            "catch_up": task.catch_up.value,
+            "background": task.background,
+            "running": task.running,
             "last_run": task.last_run,
-            "time_until_next": max(0, task.interval_ms - (time.time() * 1000 - task.last_run))
+            "time_until_next": max(0, task.next_due - self._now_ms())
         }
     
     def list_tasks(self) -> list:
         """List all tasks."""
         return [self.get_task_info(name) for name in self._tasks.keys()]
+    
+    def wait(self, name: Optional[str] = None, timeout: Optional[float] = None):
+        """Block until in-flight background runs (of one task, or all) finish."""
+        tasks = [self._tasks[name]] if name in self._tasks else (
+            [] if name else list(self._tasks.values())
+        )
+        futures = [t.future for t in tasks if t.running]
+        if futures:
+            wait_futures(futures, timeout=timeout)
+    
+    def shutdown(self, wait: bool = True):
+        """Stop the thread pool, letting in-flight runs finish if wait."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
 
 
 # ==================== TESTING ====================
@@ -111,10 +323,22 @@ if __name__ == "__main__":
     scheduler.add_task("test", 500, increment)  # Every 500ms
     
     print("Running scheduler for 3 seconds...")
-    start = time.time()
-    while time.time() - start < 3:
+    start = time.monotonic()
+    while time.monotonic() - start < 3:
         scheduler.update()
-        time.sleep(0.1)
+        time.sleep(scheduler.time_until_next_due() or 0)
     
     print(f"\nFinal counter: {counter['value']}")
     print(f"Task info: {scheduler.get_task_info('test')}")
+    
+    # Catch-up policies after a 2.2s stall with a 500ms interval
+    fake_now = [0.0]
+    for policy in CatchUp:
+        fake_now[0] = 0.0
+        runs = {"value": 0}
+        s = Scheduler(clock=lambda: fake_now[0])
+        s.add_task("stalled", 500, lambda: runs.__setitem__("value", runs["value"] + 1), policy)
+        fake_now[0] = 2.7  # Due at 0.5, missed 1.0 .. 2.5
+        s.update()
+        print(f"{policy.value:>8}: ran {runs['value']}x, next in "
+              f"{s.time_until_next_due():.1f}s")
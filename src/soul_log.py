@@ -0,0 +1,556 @@
+"""
+Claudeagotchi Soul Log
+
+An append-only record of everything that happens to a soul, so its
+state can be rebuilt, audited, or recovered after a crash.
+
+    log = SoulLog("data")
+    log.attach(personality, memory)         # From now on, changes are events
+    ...
+    personality, memory = log.rebuild(at=time.time() - 86400)  # Yesterday
+
+Events are compact JSON arrays, one per line in events.jsonl:
+
+    [t, "interaction", quality, E, E_floor]     Personality.on_interaction
+    [t, "care", intensity, dt, E, E_floor]      AffectiveCore.apply_care
+    [t, "damage", intensity, dt, E, E_floor]    AffectiveCore.apply_damage
+    [t, "memory", type, content, emotion, strength]
+    [t, "topic", topic]
+    [t, "exchange", user_message, assistant_message, mood]
+    [t, "decay"]                                memories expired
+    [t, "clear"]                                memories cleared
+
+A change made inside another one (on_interaction calls apply_care) is
+part of it and isn't logged twice.
+
+Time-driven drift between events (idle decay, surface moods) is not
+logged: a tick per minute would outnumber everything else a hundred to
+one. Affective events carry E and E_floor as they were just before the
+event instead, and replay restores them before applying it. Fields that
+are set directly (owner name, device sync) are caught by the next
+snapshot.
+
+Snapshots (snapshots/<count>_<t>.json) hold the full personality and
+memory after `count` events, plus the byte offset of the next event.
+One is taken when a soul is first attached, every SNAPSHOT_EVERY events
+and on close(). recover() loads the latest and replays only the tail;
+rebuild(at) starts from the latest snapshot taken at or before `at`.
+
+Only the newest KEEP_SNAPSHOTS snapshots are kept. Events before the
+oldest kept one can no longer be replayed, so they are cut from the
+front of events.jsonl, which then starts with a {"base": offset} line:
+offsets stay those of the uncut log, and the cut is one atomic rename.
+rebuild(at) reaches back as far as the oldest kept snapshot.
+"""
+
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# ==================== CONSTANTS ====================
+
+SNAPSHOT_EVERY = 1000  # Events between automatic snapshots
+KEEP_SNAPSHOTS = 10    # Snapshots kept; the log is cut behind the oldest
+
+_NOT_RECORDING = nullcontext()
+
+
+def recording(log, now: float, kind: str, *args):
+    """
+    Context for a change to a soul: once the block finishes without an
+    error, `log` records [now, kind, *args]. Does nothing if log is None.
+    """
+    if log is None:
+        return _NOT_RECORDING
+    return log.recording(now, kind, args)
+
+
+# ==================== REPLAY ====================
+
+def _replay_interaction(personality, memory, t, quality, E, E_floor):
+    personality.core.E, personality.core.E_floor = E, E_floor
+    personality.on_interaction(quality, now=t)
+
+
+def _replay_care(personality, memory, t, intensity, dt, E, E_floor):
+    personality.core.E, personality.core.E_floor = E, E_floor
+    personality.core.apply_care(intensity, dt, now=t)
+
+
+def _replay_damage(personality, memory, t, intensity, dt, E, E_floor):
+    personality.core.E, personality.core.E_floor = E, E_floor
+    personality.core.apply_damage(intensity, dt, now=t)
+
+
+def _replay_memory(personality, memory, t, memory_type, content, emotion, strength):
+    memory.add_memory(memory_type, content, emotion, strength, now=t)
+
+
+def _replay_topic(personality, memory, t, topic):
+    memory.add_topic(topic, now=t)
+
+
+def _replay_exchange(personality, memory, t, user_message, assistant_message, mood):
+    memory.add_conversation(user_message, assistant_message, mood, now=t)
+
+
+def _replay_decay(personality, memory, t):
+    memory.update_decay(now=t)
+
+
+def _replay_clear(personality, memory, t):
+    memory.clear_memories()
+
+
+REPLAYERS = {
+    "interaction": _replay_interaction,
+    "care": _replay_care,
+    "damage": _replay_damage,
+    "memory": _replay_memory,
+    "topic": _replay_topic,
+    "exchange": _replay_exchange,
+    "decay": _replay_decay,
+    "clear": _replay_clear,
+}
+
+
+def apply_event(personality, memory, event: list):
+    """Apply one logged event to a (detached) personality and memory."""
+    replayer = REPLAYERS.get(event[1])
+    if replayer is not None:  # Unknown kinds come from newer versions
+        replayer(personality, memory, event[0], *event[2:])
+
+
+# ==================== SOUL LOG ====================
+
+class SoulLog:
+    """
+    Event log and snapshots for one soul directory.
+
+    Like the offline queue, events are appended as lines that reach the
+    OS immediately, with fsync batched (every FSYNC_EVERY events or
+    FSYNC_INTERVAL seconds). A truncated last line is dropped on open.
+    """
+
+    FSYNC_EVERY = 8          # Events between fsyncs
+    FSYNC_INTERVAL = 2.0     # Max seconds an event waits for fsync
+
+    def __init__(self, data_dir: str = "data", snapshot_every: int = SNAPSHOT_EVERY,
+                 keep_snapshots: int = KEEP_SNAPSHOTS):
+        """
+        Args:
+            data_dir: The soul's directory
+            snapshot_every: Events between automatic snapshots (0: only
+                on attach and close)
+            keep_snapshots: Snapshots kept, newest first (0: keep all
+                snapshots and the whole log)
+        """
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.events_file = self.data_dir / "events.jsonl"
+        self.saved_file = self.data_dir / "events.saved"
+        self.snapshot_dir = self.data_dir / "snapshots"
+        self.snapshot_dir.mkdir(exist_ok=True)
+        self.snapshot_every = snapshot_every
+        self.keep_snapshots = keep_snapshots
+
+        self.personality = None
+        self.memory = None
+
+        self.count = 0              # Events in the log
+        self.saved_count = 0        # Events reflected in the last storage save
+        self._size = 0              # Offset of the end of the log
+        self._base = 0              # Offset of the first event still in the file
+        self._header = 0            # Bytes of the {"base": ...} line, if cut
+        self._last_t = 0.0          # Time of the newest event
+        self._since_snapshot = 0
+        self._depth = 0             # Nesting of recorded changes in progress
+
+        self._journal = None
+        self._unsynced = 0
+        self._last_fsync = time.time()
+
+        self._scan()
+
+    def _scan(self):
+        """Find the end of the log, dropping a truncated last line."""
+        offset = 0
+        snapshots = self.snapshots()
+        if snapshots:
+            with open(snapshots[-1][2]) as f:
+                snap = json.load(f)
+            self.count = snap["count"]
+            offset = snap["offset"]
+
+        size = 0
+        if self.events_file.exists():
+            with open(self.events_file, 'rb') as f:
+                first = f.readline()
+            if first.startswith(b"{") and first.endswith(b"\n"):
+                self._base = json.loads(first)["base"]
+                self._header = len(first)
+            size = self._base + self.events_file.stat().st_size - self._header
+        offset = max(self._base, min(offset, size))
+        tail = b""
+        if size > offset:
+            with open(self.events_file, 'rb') as f:
+                f.seek(self._position(offset))
+                tail = f.read()
+
+        end = tail.rfind(b"\n") + 1
+        if end < len(tail):
+            # Crash mid-write: drop the partial line so appends start clean
+            with open(self.events_file, 'r+b') as f:
+                f.truncate(self._position(offset + end))
+        lines = tail[:end].splitlines()
+
+        self._since_snapshot = len(lines)
+        self.count += len(lines)
+        self._size = offset + end
+        if lines:
+            try:
+                self._last_t = json.loads(lines[-1])[0]
+            except (ValueError, IndexError, TypeError):
+                pass
+
+        if self.saved_file.exists():
+            try:
+                with open(self.saved_file) as f:
+                    self.saved_count = json.load(f)["count"]
+            except (ValueError, KeyError, TypeError):
+                self.saved_count = 0
+
+    def _position(self, offset: int) -> int:
+        """File position of a log offset (the front may have been cut)."""
+        return offset - self._base + self._header
+
+    # ==================== RECORDING ====================
+
+    def attach(self, personality, memory):
+        """
+        Record every change to this personality and memory from now on.
+        Takes the first snapshot if the log has none.
+        """
+        self.personality = personality
+        self.memory = memory
+        personality.log = self
+        personality.core.observer = self
+        memory.log = self
+        if not self.snapshots():
+            self.snapshot()
+
+    def detach(self):
+        """Stop recording (the objects are left as they are)."""
+        if self.personality is not None:
+            self.personality.log = None
+            self.personality.core.observer = None
+        if self.memory is not None:
+            self.memory.log = None
+        self.personality = None
+        self.memory = None
+
+    @contextmanager
+    def recording(self, now: float, kind: str, args: tuple):
+        """See recording(); changes nested in a recorded one aren't logged."""
+        outer = self._depth == 0
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+        if outer:
+            self.append([now, kind, *args])
+
+    def _open_journal(self):
+        if self._journal is None:
+            self._journal = open(self.events_file, 'ab')
+        return self._journal
+
+    def append(self, event: list):
+        """Append one event; fsync in batches, snapshot every snapshot_every."""
+        data = (json.dumps(event, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+        journal = self._open_journal()
+        journal.write(data)
+        journal.flush()
+        self.count += 1
+        self._size += len(data)
+        self._last_t = max(self._last_t, event[0])
+        self._unsynced += 1
+
+        now = time.time()
+        if self._unsynced >= self.FSYNC_EVERY or now - self._last_fsync >= self.FSYNC_INTERVAL:
+            self.sync_to_disk()
+
+        self._since_snapshot += 1
+        if (self.snapshot_every and self._since_snapshot >= self.snapshot_every
+                and self.personality is not None):
+            self.snapshot()
+
+    def sync_to_disk(self):
+        """Force pending events to stable storage."""
+        if self._journal is not None and self._unsynced:
+            os.fsync(self._journal.fileno())
+        self._unsynced = 0
+        self._last_fsync = time.time()
+
+    # ==================== SNAPSHOTS ====================
+
+    def snapshots(self) -> List[Tuple[int, float, Path]]:
+        """(event count, time, path) of every snapshot, oldest first."""
+        found = []
+        for path in self.snapshot_dir.glob("*.json"):
+            count, _, t = path.stem.partition("_")
+            try:
+                found.append((int(count), float(t), path))
+            except ValueError:
+                continue
+        return sorted(found)
+
+    def snapshot(self):
+        """Write the attached soul's full state as of the current event count."""
+        if self.personality is None:
+            raise RuntimeError("SoulLog.snapshot() needs an attached soul")
+        self.sync_to_disk()
+        t = max(self._last_t, self.personality.core.last_update)
+        snap = {
+            "count": self.count,
+            "offset": self._size,
+            "t": t,
+            "personality": self.personality.to_dict(),
+            "memory": self.memory.to_dict(),
+        }
+        path = self.snapshot_dir / f"{self.count:010d}_{t:.3f}.json"
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(snap, f, separators=(",", ":"), ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._since_snapshot = 0
+        self._prune()
+
+    def _prune(self):
+        """Drop all but the newest keep_snapshots snapshots and the events before them."""
+        snapshots = self.snapshots()
+        if not self.keep_snapshots or len(snapshots) <= self.keep_snapshots:
+            return
+        # Snapshots first: a crash before the cut leaves a longer log, never a gap
+        for _, _, path in snapshots[:-self.keep_snapshots]:
+            path.unlink()
+        with open(snapshots[-self.keep_snapshots][2]) as f:
+            self._cut(json.load(f)["offset"])
+
+    def _cut(self, offset: int):
+        """Remove the events before `offset` from the front of the file."""
+        if offset <= self._base or not self.events_file.exists():
+            return
+        self.sync_to_disk()
+        if self._journal is not None:
+            self._journal.close()  # Reopened (on the new file) by the next append
+            self._journal = None
+
+        header = (json.dumps({"base": offset}) + "\n").encode("utf-8")
+        tmp = self.events_file.with_name(self.events_file.name + ".tmp")
+        with open(self.events_file, 'rb') as src, open(tmp, 'wb') as dst:
+            src.seek(self._position(offset))
+            dst.write(header)
+            shutil.copyfileobj(src, dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp, self.events_file)
+        self._base = offset
+        self._header = len(header)
+
+    def mark_saved(self, count: int):
+        """Note that storage now holds the state after `count` events."""
+        tmp = self.saved_file.with_name(self.saved_file.name + ".tmp")
+        with open(tmp, 'w') as f:
+            json.dump({"count": count, "saved_at": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.saved_file)
+        self.saved_count = count
+
+    def unsaved_events(self) -> int:
+        """Events logged after the last storage save (lost from storage by a crash)."""
+        return max(0, self.count - self.saved_count)
+
+    # ==================== REPLAY ====================
+
+    def events(self, offset: int = 0, until: Optional[float] = None) -> List[list]:
+        """
+        Events from a byte offset to the end of the log, oldest first.
+        With `until`, stops before the first event later than it.
+        """
+        if self._journal is not None:
+            self._journal.flush()
+        if not self.events_file.exists() or offset >= self._size:
+            return []
+        if offset < self._base:
+            raise ValueError(f"Events before offset {self._base} were pruned")
+        with open(self.events_file, 'rb') as f:
+            f.seek(self._position(offset))
+            lines = f.read(self._size - offset).decode("utf-8").splitlines()
+
+        try:
+            # One parse for the whole tail; JSON strings never contain raw newlines
+            events = json.loads("[" + ",".join(lines) + "]")
+        except ValueError:
+            events = []
+            for line in lines:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue  # Skip a corrupt line
+
+        if until is not None:
+            for i, event in enumerate(events):
+                if event[0] > until:
+                    return events[:i]
+        return events
+
+    def _replay(self, snapshot: Optional[Path], memory, until: Optional[float] = None):
+        """Load a snapshot (or a fresh soul) into memory, then replay the events after it."""
+        from personality_v2 import Personality  # Imported here: it imports this module
+
+        offset = 0
+        if snapshot is not None:
+            with open(snapshot) as f:
+                snap = json.load(f)
+            personality = Personality.from_dict(snap["personality"])
+            memory.restore(snap["memory"])
+            offset = snap["offset"]
+        else:
+            personality = Personality()
+
+        for event in self.events(offset, until):
+            apply_event(personality, memory, event)
+        return personality
+
+    def recover(self, memory):
+        """
+        Rebuild the latest state: restore the newest snapshot into
+        `memory`, replay the tail, and return the Personality.
+        """
+        snapshots = self.snapshots()
+        return self._replay(snapshots[-1][2] if snapshots else None, memory)
+
+    def rebuild(self, at: Optional[float] = None, memory=None):
+        """
+        Rebuild the soul as it was at time `at` (default: now).
+
+        Returns (Personality, MemorySystem). Unless one is passed in, the
+        MemorySystem keeps its storage in the snapshots directory so that
+        saving it never overwrites the live soul.
+        """
+        from memory import MemorySystem  # Imported here: it imports this module
+
+        snapshots = self.snapshots()
+        if at is not None:
+            snapshots = [s for s in snapshots if s[1] <= at]
+            if not snapshots and self.snapshots():
+                raise ValueError(f"No snapshot at or before {at}")
+        if memory is None:
+            memory = MemorySystem(data_dir=str(self.snapshot_dir))
+        personality = self._replay(snapshots[-1][2] if snapshots else None, memory, until=at)
+        return personality, memory
+
+    # ==================== LIFECYCLE ====================
+
+    def close(self, snapshot: bool = True):
+        """Snapshot (if anything happened since the last one), flush, detach."""
+        if snapshot and self.personality is not None and self._since_snapshot:
+            self.snapshot()
+        if self._journal is not None:
+            self.sync_to_disk()
+            self._journal.close()
+            self._journal = None
+        self.detach()
+
+
+def rebuild_all(root_dir: str, at: Optional[float] = None) -> Dict[str, tuple]:
+    """
+    Bulk replay: rebuild every soul under root_dir (one directory per
+    soul, as in data/devices/) at time `at`. Returns {directory name:
+    (Personality, MemorySystem)}; souls with no history yet are skipped.
+    """
+    souls = {}
+    for soul_dir in sorted(Path(root_dir).iterdir()):
+        if not (soul_dir / "events.jsonl").exists() and not (soul_dir / "snapshots").is_dir():
+            continue
+        try:
+            souls[soul_dir.name] = SoulLog(str(soul_dir)).rebuild(at)
+        except ValueError:
+            continue  # Didn't exist yet at `at`
+    return souls
+
+
+# ==================== BENCHMARK ====================
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    from memory import MemorySystem
+    from personality_v2 import Personality
+
+    DAYS = 365
+    data_dir = tempfile.mkdtemp()
+    try:
+        rng = random.Random(7)
+        words = [f"word{i}" for i in range(300)]
+        start = time.time() - DAYS * 86400
+        personality = Personality()
+        personality.core.created = personality.core.last_update = start
+        memory = MemorySystem(data_dir=data_dir)
+        log = SoulLog(data_dir, keep_snapshots=0)  # Keep the year for the full replay
+        log.attach(personality, memory)
+
+        # A year of use: ~40 chats a day, each an interaction + an exchange,
+        # with the odd fact and topic; nights are idle decay (not events)
+        t0 = time.perf_counter()
+        for day in range(DAYS):
+            if day:
+                personality.core.apply_neglect(480)
+            t = start + day * 86400 + 8 * 3600
+            for _ in range(rng.randint(20, 60)):
+                t += rng.uniform(60, 1200)
+                personality.on_interaction(rng.choice(["normal", "warm", "loving", "cold"]), now=t)
+                memory.add_conversation("hello", "hi there", personality.E, now=t)
+                if rng.random() < 0.1:
+                    memory.add_memory("fact", " ".join(rng.sample(words, 5)), now=t)
+                if rng.random() < 0.1:
+                    memory.add_topic(rng.choice(["tea", "space", "python", "music"]), now=t)
+            memory.update_decay(now=t)
+        recorded = time.perf_counter() - t0
+        live_E, live_memories = personality.E, len(memory.memories)
+        log.close()
+
+        print(f"Recorded {log.count:,} events over {DAYS} days in {recorded:.2f}s "
+              f"({log.events_file.stat().st_size / 1e6:.1f} MB, {len(log.snapshots())} snapshots)\n")
+
+        scratch = Path(data_dir) / "scratch"
+        t0 = time.perf_counter()
+        recovered = SoulLog(data_dir).recover(MemorySystem(data_dir=str(scratch)))
+        print(f"  Recover (latest snapshot + tail): {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+        full = SoulLog(data_dir)
+        replay_memory = MemorySystem(data_dir=str(scratch))
+        t0 = time.perf_counter()
+        replayed = full._replay(full.snapshots()[0][2], replay_memory)
+        print(f"  Replay the whole year from the first snapshot: {time.perf_counter() - t0:.2f}s")
+        print(f"  Live E = {live_E:.6f} ({live_memories} memories), recovered {recovered.E:.6f}, "
+              f"replayed {replayed.E:.6f} ({len(replay_memory.memories)} memories)")
+
+        midyear = start + DAYS / 2 * 86400
+        t0 = time.perf_counter()
+        past, past_memory = SoulLog(data_dir).rebuild(at=midyear)
+        print(f"  Rebuild at mid-year: {(time.perf_counter() - t0) * 1000:.1f} ms "
+              f"(E = {past.E:.2f}, {len(past_memory.memories)} memories)")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
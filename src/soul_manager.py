@@ -0,0 +1,343 @@
+"""
+Claudeagotchi Soul Manager
+
+Serves many souls from one process. Each device ID maps to its own soul
+directory; only recently used souls stay loaded.
+
+    manager = SoulManager("data/devices", max_souls=500, memory_budget_mb=256)
+    with manager.use("kitchen") as soul:
+        soul.personality.on_interaction("warm")
+        soul.dirty = True
+
+Loaded souls live in an LRU. When the number of loaded souls or their
+estimated RAM goes over budget, the least recently used ones are evicted,
+and dirty souls are written back first. Souls that are in use are never
+evicted. Time that passed while a soul was unloaded is applied lazily
+(AffectiveCore.process_idle_time) when it is next loaded.
+
+The default loader builds a Soul (Personality + MemorySystem). Servers
+that need more per soul pass their own loader; anything with save(),
+dirty and estimated_size() works.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from affective_core import DEFAULT_SOUL_INTEGRATOR
+from personality_v2 import Personality
+from memory import MemorySystem
+from storage import create_storage
+
+
+# ==================== CONSTANTS ====================
+
+DEFAULT_MAX_SOULS = 1000
+DEFAULT_MEMORY_BUDGET_MB = 256
+SOUL_OVERHEAD_BYTES = 16 * 1024  # Personality, storage handle, bookkeeping
+
+
+def soul_dir_name(device_id: str) -> str:
+    """Directory-safe version of a device ID."""
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", device_id)[:64] or "device"
+
+
+@dataclass
+class Soul:
+    """One loaded soul."""
+    device_id: str
+    personality: Personality
+    memory: MemorySystem
+    dirty: bool = False
+
+    def save(self):
+        self.memory.save(self.personality)
+        self.dirty = False
+
+    def estimated_size(self) -> int:
+        return SOUL_OVERHEAD_BYTES + self.memory.estimated_size()
+
+    def close(self):
+        self.memory.storage.close()
+
+
+class _Entry:
+    """LRU slot: the soul plus how many callers are using it."""
+    __slots__ = ("soul", "pins", "size", "ready")
+
+    def __init__(self):
+        self.soul = None
+        self.pins = 0
+        self.size = 0
+        self.ready = threading.Event()
+
+
+class SoulManager:
+    """
+    LRU cache of loaded souls with a count and memory budget.
+    Thread-safe; loads and write-backs happen on the calling thread.
+    """
+
+    def __init__(self, data_dir: str = "data/devices",
+                 loader: Optional[Callable[[str, Path], object]] = None,
+                 max_souls: int = DEFAULT_MAX_SOULS,
+                 memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+                 storage: str = "sqlite",
+                 integrator: str = DEFAULT_SOUL_INTEGRATOR):
+        """
+        Args:
+            data_dir: Root directory; each soul lives in data_dir/<device>/
+            loader: loader(device_id, soul_dir) -> soul (default: Soul)
+            max_souls: Most souls kept loaded at once
+            memory_budget_mb: Most estimated RAM for loaded souls
+            storage: Backend for the default loader ("sqlite" or "json")
+            integrator: AffectiveCore integrator for souls the default
+                loader builds (including their idle catch-up)
+        """
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.loader = loader or self._default_loader
+        self.max_souls = max_souls
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.storage = storage
+        self.integrator = integrator
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()  # Oldest first
+        self._total_size = 0
+        self._writing_back: Dict[str, threading.Event] = {}  # Reloads wait for these
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _default_loader(self, device_id: str, soul_dir: Path) -> Soul:
+        memory = MemorySystem(data_dir=str(soul_dir),
+                              storage=create_storage(self.storage, str(soul_dir)))
+        personality_data = memory.load()
+        if personality_data:
+            personality = Personality.from_dict(personality_data)
+            personality.core.integrator = self.integrator
+            # Catch up on the time this soul spent unloaded
+            personality.core.process_idle_time()
+        else:
+            personality = Personality()
+            personality.core.integrator = self.integrator
+        return Soul(device_id=device_id, personality=personality, memory=memory)
+
+    def soul_dir(self, device_id: str) -> Path:
+        return self.data_dir / soul_dir_name(device_id)
+
+    # ==================== ACQUIRE / RELEASE ====================
+
+    def acquire(self, device_id: str):
+        """
+        Get a soul, loading it if needed, and pin it so it can't be
+        evicted. Every acquire() needs a matching release().
+        """
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is not None:
+                entry.pins += 1
+                self._entries.move_to_end(device_id)
+                self.hits += 1
+                loading = False
+            else:
+                entry = _Entry()
+                entry.pins = 1
+                self._entries[device_id] = entry
+                self.misses += 1
+                loading = True
+                pending_write = self._writing_back.get(device_id)
+
+        if not loading:
+            # Someone else may still be loading it
+            entry.ready.wait()
+            if entry.soul is None:
+                self._unpin(device_id, entry)
+                raise RuntimeError(f"Soul '{device_id}' failed to load")
+            return entry.soul
+
+        # Don't read the directory while an evicted copy is still being saved
+        if pending_write is not None:
+            pending_write.wait()
+
+        try:
+            soul = self.loader(device_id, self.soul_dir(device_id))
+        except Exception:
+            with self._lock:
+                if self._entries.get(device_id) is entry:
+                    del self._entries[device_id]
+            entry.ready.set()
+            raise
+
+        with self._lock:
+            entry.soul = soul
+            entry.size = soul.estimated_size()
+            self._total_size += entry.size
+        entry.ready.set()
+
+        self._evict_over_budget()
+        return soul
+
+    def release(self, device_id: str):
+        """Unpin a soul and re-measure it; may trigger eviction."""
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is None or entry.soul is None:
+                return
+            new_size = entry.soul.estimated_size()
+            self._total_size += new_size - entry.size
+            entry.size = new_size
+        self._unpin(device_id, entry)
+        self._evict_over_budget()
+
+    def _unpin(self, device_id: str, entry: _Entry):
+        with self._lock:
+            entry.pins = max(0, entry.pins - 1)
+
+    @contextmanager
+    def use(self, device_id: str):
+        """with manager.use(id) as soul: ... (acquire + release)."""
+        soul = self.acquire(device_id)
+        try:
+            yield soul
+        finally:
+            self.release(device_id)
+
+    # ==================== EVICTION ====================
+
+    def _over_budget(self) -> bool:
+        return len(self._entries) > self.max_souls or self._total_size > self.memory_budget
+
+    def _evict_over_budget(self):
+        """Evict least recently used, unpinned souls until within budget."""
+        while True:
+            with self._lock:
+                if not self._over_budget():
+                    return
+                victim_id = next(
+                    (key for key, e in self._entries.items() if e.pins == 0 and e.soul is not None),
+                    None
+                )
+                if victim_id is None:
+                    return  # Everything loaded is in use
+                entry = self._entries.pop(victim_id)
+                self._total_size -= entry.size
+                self.evictions += 1
+
+            self._write_back(victim_id, entry.soul)
+
+    def _write_back(self, device_id: str, soul):
+        """Save a dirty soul and release its resources."""
+        done = threading.Event()
+        with self._lock:
+            self._writing_back[device_id] = done
+        try:
+            if soul.dirty:
+                soul.save()
+        except Exception as e:
+            print(f"[SoulManager] Write-back failed for '{device_id}': {e}")
+        finally:
+            close = getattr(soul, "close", None)
+            if close:
+                close()
+            with self._lock:
+                if self._writing_back.get(device_id) is done:
+                    del self._writing_back[device_id]
+            done.set()
+
+    def evict(self, device_id: str) -> bool:
+        """Unload one soul now (if not in use), writing it back if dirty."""
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is None or entry.pins or entry.soul is None:
+                return False
+            del self._entries[device_id]
+            self._total_size -= entry.size
+            self.evictions += 1
+        self._write_back(device_id, entry.soul)
+        return True
+
+    # ==================== MAINTENANCE ====================
+
+    def loaded_ids(self) -> List[str]:
+        """Device IDs currently loaded, least recently used first."""
+        with self._lock:
+            return [key for key, e in self._entries.items() if e.soul is not None]
+
+    def save_dirty(self) -> int:
+        """Save every loaded, dirty soul that isn't in use. Returns count."""
+        saved = 0
+        for device_id in self.loaded_ids():
+            with self._lock:
+                entry = self._entries.get(device_id)
+                if entry is None or entry.pins or entry.soul is None or not entry.soul.dirty:
+                    continue
+                entry.pins += 1
+            try:
+                entry.soul.save()
+                saved += 1
+            except Exception as e:
+                print(f"[SoulManager] Save failed for '{device_id}': {e}")
+            finally:
+                self._unpin(device_id, entry)
+        return saved
+
+    def close(self):
+        """Write back and unload every soul."""
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+            self._total_size = 0
+        for device_id, entry in entries:
+            if entry.soul is not None:
+                self._write_back(device_id, entry.soul)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "loaded": len(self._entries),
+                "estimated_mb": self._total_size / (1024 * 1024),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    import time
+
+    data_dir = tempfile.mkdtemp()
+    try:
+        manager = SoulManager(data_dir, max_souls=100)
+
+        t0 = time.perf_counter()
+        for i in range(2000):
+            with manager.use(f"pocket-{i}") as soul:
+                soul.personality.on_interaction("warm")
+                soul.memory.add_fact(f"Owner of pocket {i} likes tea")
+                soul.dirty = True
+        elapsed = time.perf_counter() - t0
+        print(f"2000 souls through a 100-soul LRU: {elapsed:.1f}s")
+        print(f"Stats: {manager.stats()}")
+
+        # Evicted souls come back with their state
+        with manager.use("pocket-0") as soul:
+            print(f"pocket-0 reloaded: {len(soul.memory.memories)} memory, "
+                  f"{soul.personality.total_interactions} interaction(s)")
+        manager.close()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
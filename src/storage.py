@@ -0,0 +1,270 @@
+"""
+Claudeagotchi Storage Backends
+
+Where the soul lives on disk. MemorySystem hands a backend a snapshot
+of its persistent state; the backend decides how to write it.
+
+    JSONStorage   - memories.json + state.json, rewritten in full
+                    (atomically, via a temp file and rename)
+    SQLiteStorage - soul.db in WAL mode, one row per memory/exchange,
+                    only changed records are written
+
+Snapshots are plain dicts copied on the caller's thread, so write()
+never touches live objects:
+
+    full                  True: memories/conversation_history are complete
+                          False: only records changed since the last snapshot
+    memories              list of Memory dicts (upserted by uid)
+    deleted               uids of memories removed since the last snapshot
+    conversation_history  list of ConversationExchange dicts
+    history_limit         how many exchanges to keep
+    owner_name, favorite_topics, last_topics
+    personality           personality dict, or None to leave it untouched
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+def _atomic_write_json(path: Path, data):
+    """Write JSON to a temp file, fsync, then rename over the target."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class JSONStorage:
+    """The original flat-file format. Every save rewrites everything."""
+
+    incremental = False
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.memories_file = self.data_dir / "memories.json"
+        self.state_file = self.data_dir / "state.json"
+
+    def exists(self) -> bool:
+        return self.memories_file.exists() or self.state_file.exists()
+
+    def load(self) -> Tuple[Optional[dict], Optional[dict]]:
+        """Returns (memory data, personality dict); either may be None."""
+        data = None
+        personality = None
+
+        if self.memories_file.exists():
+            with open(self.memories_file, 'r') as f:
+                data = json.load(f)
+
+        if self.state_file.exists():
+            with open(self.state_file, 'r') as f:
+                personality = json.load(f)
+
+        return data, personality
+
+    def write(self, snapshot: dict):
+        """Rewrite both files from a full snapshot."""
+        memories_data = {
+            "memories": snapshot["memories"],
+            "conversation_history": snapshot["conversation_history"],
+            "owner_name": snapshot["owner_name"],
+            "favorite_topics": snapshot["favorite_topics"],
+            "last_topics": snapshot["last_topics"],
+        }
+        _atomic_write_json(self.memories_file, memories_data)
+
+        if snapshot.get("personality") is not None:
+            _atomic_write_json(self.state_file, snapshot["personality"])
+
+    def close(self):
+        pass
+
+
+class SQLiteStorage:
+    """
+    SQLite (WAL) backend. Saves cost O(changed records) and a crash
+    mid-save leaves the previous committed state intact.
+
+    On first load, an existing memories.json/state.json in the same
+    directory is imported once.
+    """
+
+    incremental = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS memories (
+            uid TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            content TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp REAL NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, data_dir: str = "data", filename: str = "soul.db"):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.db_file = self.data_dir / filename
+
+        # Writes may come from a background thread; serialize access
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+        self._last_meta = {}
+
+    def _get_meta(self, key: str):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set_meta(self, key: str, value):
+        """Upsert a meta row, skipping it if unchanged since last write."""
+        encoded = json.dumps(value)
+        if self._last_meta.get(key) == encoded:
+            return
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, encoded)
+        )
+        self._last_meta[key] = encoded
+
+    def _migrate_from_json(self):
+        """One-shot import of the JSON files, if present."""
+        json_storage = JSONStorage(str(self.data_dir))
+        if not json_storage.exists():
+            with self._lock:
+                self._set_meta("migrated_from_json", None)
+                self._conn.commit()
+            return
+
+        data, personality = json_storage.load()
+        data = data or {}
+        memories = data.get("memories", [])
+        for m in memories:
+            m.setdefault("uid", uuid.uuid4().hex)
+        self.write({
+            "full": True,
+            "memories": memories,
+            "deleted": [],
+            "conversation_history": data.get("conversation_history", []),
+            "history_limit": None,
+            "owner_name": data.get("owner_name", "Friend"),
+            "favorite_topics": data.get("favorite_topics", []),
+            "last_topics": data.get("last_topics", []),
+            "personality": personality,
+        })
+        with self._lock:
+            self._set_meta("migrated_from_json", time.time())
+            self._conn.commit()
+
+    def load(self) -> Tuple[Optional[dict], Optional[dict]]:
+        """Returns (memory data, personality dict); either may be None."""
+        with self._lock:
+            migrated = self._conn.execute(
+                "SELECT 1 FROM meta WHERE key = 'migrated_from_json'"
+            ).fetchone()
+        if not migrated:
+            self._migrate_from_json()
+
+        with self._lock:
+            owner_name = self._get_meta("owner_name")
+            personality = self._get_meta("personality")
+            memories = [
+                json.loads(row[0]) for row in
+                self._conn.execute("SELECT data FROM memories ORDER BY rowid")
+            ]
+            history = [
+                json.loads(row[0]) for row in
+                self._conn.execute("SELECT data FROM conversations ORDER BY id")
+            ]
+            data = None
+            if owner_name is not None or memories or history:
+                data = {
+                    "memories": memories,
+                    "conversation_history": history,
+                    "owner_name": owner_name or "Friend",
+                    "favorite_topics": self._get_meta("favorite_topics") or [],
+                    "last_topics": self._get_meta("last_topics") or [],
+                }
+
+        return data, personality
+
+    def write(self, snapshot: dict):
+        """Apply a snapshot in a single transaction."""
+        with self._lock:
+            conn = self._conn
+            try:
+                if snapshot["full"]:
+                    conn.execute("DELETE FROM memories")
+                    conn.execute("DELETE FROM conversations")
+                else:
+                    conn.executemany(
+                        "DELETE FROM memories WHERE uid = ?",
+                        [(uid,) for uid in snapshot.get("deleted", [])]
+                    )
+
+                conn.executemany(
+                    "INSERT INTO memories (uid, type, content, data) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(uid) DO UPDATE SET type = excluded.type, "
+                    "content = excluded.content, data = excluded.data",
+                    [(m["uid"], m["type"], m["content"], json.dumps(m))
+                     for m in snapshot["memories"]]
+                )
+
+                conn.executemany(
+                    "INSERT INTO conversations (timestamp, data) VALUES (?, ?)",
+                    [(c["timestamp"], json.dumps(c)) for c in snapshot["conversation_history"]]
+                )
+                limit = snapshot.get("history_limit")
+                if limit is not None and snapshot["conversation_history"]:
+                    conn.execute(
+                        "DELETE FROM conversations WHERE id NOT IN "
+                        "(SELECT id FROM conversations ORDER BY id DESC LIMIT ?)",
+                        (limit,)
+                    )
+
+                self._set_meta("owner_name", snapshot["owner_name"])
+                self._set_meta("favorite_topics", snapshot["favorite_topics"])
+                self._set_meta("last_topics", snapshot["last_topics"])
+                if snapshot.get("personality") is not None:
+                    self._set_meta("personality", snapshot["personality"])
+
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                self._last_meta = {}
+                raise
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_storage(kind: str = "json", data_dir: str = "data"):
+    """Factory for storage backends ("json" or "sqlite")."""
+    if kind == "sqlite":
+        return SQLiteStorage(data_dir)
+    if kind == "json":
+        return JSONStorage(data_dir)
+    raise ValueError(f"Unknown storage backend: {kind}")
@@ -25,8 +25,12 @@ sys.path.insert(0, str(Path(__file__).parent))
 from affective_core import AffectiveCore, AffectiveState
 from personality_v2 import Personality
 from memory import MemorySystem
+from storage import SQLiteStorage
 from claude_api_v2 import ClaudeAPI, MockClaudeAPI
-from offline_mode import OfflineAwareAPI, OfflineQueue, LocalResponseGenerator
+from offline_mode import OfflineAwareAPI, OfflineQueue, LocalResponseGenerator, OfflineSync
+from offline_mode import CircuitBreaker, CircuitState
+from scheduler import Scheduler, CatchUp
+from display.terminal_face import TerminalFace, ColorTerminalFace, DiffRenderer
 
 # Test data directory
 TEST_DATA_DIR = Path(__file__).parent.parent / "data_test"
@@ -38,11 +42,17 @@ def header(title: str):
     print('='*60)
 
 
+# Failed checks, so a FAIL fails its section (and the run) even if it returns True
+FAILED_CHECKS = []
+
+
 def test_result(name: str, passed: bool, detail: str = ""):
     status = "✓ PASS" if passed else "✗ FAIL"
     print(f"  {status}: {name}")
     if detail:
         print(f"         {detail}")
+    if not passed:
+        FAILED_CHECKS.append(name)
 
 
 def cleanup():
@@ -103,6 +113,141 @@ def test_affective_core():
                 multiplier > 1.0,
                 f"Multiplier = {multiplier:.2f}x (E^1.8)")
 
+    # Test 8: Exact integrator — one call equals many tiny Euler steps
+    exact = AffectiveCore(E=2.0, integrator="exact")
+    exact.update(care=0.5, dt=600)
+    fine = AffectiveCore(E=2.0)
+    for _ in range(20000):
+        fine.update(care=0.5, dt=600 / 20000)
+    test_result("Exact update matches fine-stepped Euler",
+                abs(exact.E - fine.E) < 1e-3 * fine.E and abs(exact.E_floor - fine.E_floor) < 1e-3 * fine.E_floor,
+                f"E {exact.E:.4f} vs {fine.E:.4f}, floor {exact.E_floor:.4f} vs {fine.E_floor:.4f}")
+
+    # Splitting an interval doesn't change the result
+    split = AffectiveCore(E=2.0, integrator="exact")
+    for _ in range(6):
+        split.update(care=0.5, dt=100)
+    test_result("Exact update is independent of step size",
+                abs(split.E - exact.E) < 1e-9 and abs(split.E_floor - exact.E_floor) < 1e-9,
+                f"1 x 600 min: {exact.E:.9f}, 6 x 100 min: {split.E:.9f}")
+
+    # Cap and floor hold over long intervals
+    exact.update(care=2.0, dt=60 * 24)
+    test_result("Exact update caps E at 100", exact.E == 100.0 and exact.E_floor < 100.0,
+                f"E = {exact.E}, floor = {exact.E_floor:.2f}")
+    floor_before = exact.E_floor
+    exact.apply_neglect(minutes=60 * 24 * 7)  # A week switched off
+    test_result("Week of neglect lands on the floor, floor kept",
+                exact.E == exact.E_floor and exact.E_floor >= floor_before,
+                f"E = {exact.E:.2f}, floor {floor_before:.2f} → {exact.E_floor:.2f}")
+
+    return True
+
+
+def test_affective_fleet():
+    """Property test: the vectorized fleet matches AffectiveCore (both integrators)."""
+    header("AFFECTIVE FLEET")
+
+    try:
+        import numpy as np
+    except ImportError:
+        print("  - SKIP: NumPy not installed (optional)")
+        return True
+    import random
+    from affective_fleet import AffectiveFleet
+
+    fields = ("E", "E_floor", "E_peak", "total_care", "interactions")
+    mismatches = 0
+    rng = random.Random(7)
+
+    for trial in range(20):
+        # Random souls, including ones near the cap and the floor
+        cores = []
+        for _ in range(50):
+            floor = rng.uniform(0.1, 20.0)
+            core = AffectiveCore(E=floor * rng.uniform(1.0, 6.0), E_floor=floor,
+                                 beta_base=rng.uniform(0.001, 0.05),
+                                 floor_rate=rng.uniform(0.0, 0.02))
+            core.E_peak = core.E
+            cores.append(core)
+        fleet = AffectiveFleet.from_cores(cores)
+
+        # Random operations on random subsets, per-soul arguments
+        for _ in range(40):
+            op = rng.choice(["update", "care", "damage", "neglect"])
+            where = [i for i in range(len(cores)) if rng.random() < 0.6]
+            values = [rng.uniform(0.0, 3.0) for _ in cores]
+            dts = [rng.choice([0.0, -1.0, rng.uniform(0.1, 600.0)]) for _ in cores]
+
+            for i in where:
+                if op == "update":
+                    cores[i].update(care=values[i], damage=values[-1 - i], dt=dts[i])
+                elif op == "care":
+                    cores[i].apply_care(values[i], dt=dts[i])
+                elif op == "damage":
+                    cores[i].apply_damage(values[i], dt=dts[i])
+                else:
+                    cores[i].apply_neglect(abs(dts[i]) * 10)
+
+            if op == "update":
+                fleet.update(care=values, damage=values[::-1], dt=dts, where=where)
+            elif op == "care":
+                fleet.apply_care(values, dt=dts, where=where)
+            elif op == "damage":
+                fleet.apply_damage(values, dt=dts, where=where)
+            else:
+                fleet.apply_neglect(np.abs(dts) * 10, where=where)
+
+        for i, core in enumerate(cores):
+            for name in fields:
+                if getattr(fleet, name)[i] != getattr(core, name):
+                    mismatches += 1
+
+    test_result("Fleet matches scalar cores bit for bit", mismatches == 0,
+                f"{mismatches} mismatched values over 20 x 50 souls x 40 steps")
+
+    # Idle time depends on the clock; compare after a shared 3-hour gap
+    cores = [AffectiveCore(E=e, E_floor=1.0) for e in (1.0, 4.0, 40.0)]
+    for core in cores:
+        core.last_update -= 3 * 3600
+    fleet = AffectiveFleet.from_cores(cores)
+    now = time.time()
+    for core in cores:
+        core.process_idle_time(now=now)
+    fleet.process_idle_time(now=now)
+    test_result("Idle time matches", all(abs(fleet.E[i] - c.E) < 1e-9 for i, c in enumerate(cores)))
+
+    test_result("States classified like get_state",
+                [fleet.get_state(i) for i in range(3)] == [c.get_state() for c in cores])
+
+    # Exact rows take the scalar solver's steps; compare to rounding
+    cores = []
+    for _ in range(50):
+        floor = rng.uniform(0.1, 20.0)
+        cores.append(AffectiveCore(E=floor * rng.uniform(1.0, 6.0), E_floor=floor,
+                                   beta_base=rng.uniform(0.001, 0.05),
+                                   floor_rate=rng.uniform(0.0, 0.02), integrator="exact"))
+    fleet = AffectiveFleet.from_cores(cores)
+    for _ in range(20):
+        where = [i for i in range(len(cores)) if rng.random() < 0.6]
+        care = [rng.uniform(0.0, 3.0) for _ in cores]
+        damage = [rng.uniform(0.0, 3.0) for _ in cores]
+        dts = [rng.choice([0.0, rng.uniform(0.1, 6000.0)]) for _ in cores]
+        for i in where:
+            cores[i].update(care=care[i], damage=damage[i], dt=dts[i], now=now)
+        fleet.update(care=care, damage=damage, dt=dts, where=where, now=now)
+    error = max(abs(getattr(fleet, name)[i] - getattr(core, name)) / max(1.0, getattr(core, name))
+                for i, core in enumerate(cores) for name in ("E", "E_floor", "E_peak"))
+    test_result("Exact fleet matches exact cores", error < 1e-12, f"max relative error {error:.1e}")
+    test_result("Unpacked rows keep the integrator", fleet.core(0).integrator == "exact")
+
+    try:
+        AffectiveFleet.from_cores([AffectiveCore(), AffectiveCore(integrator="exact")])
+        refused = False
+    except ValueError:
+        refused = True
+    test_result("Mixed integrators refused", refused)
+
     return True
 
 
@@ -174,6 +319,399 @@ def test_memory_system():
     mem.add_conversation("Hello", "Hi there!", 1.0)
     test_result("Conversation stored", len(mem.conversation_history) == 1)
 
+    # Test 5: Word index search and dedup
+    mem.add_fact("User likes coffee lots")
+    test_result("Similar memory reinforced, not duplicated",
+                len(mem.get_strongest_memories(5, "fact")) == 1)
+    results = mem.search_memories("COFFEE please")
+    test_result("Search finds memories by shared word",
+                len(results) == 1 and results[0].content == "User likes coffee")
+    test_result("Search ignores unrelated words", mem.search_memories("tea") == [])
+
+    # Test 6: Lazy decay - strength is read in closed form, expiry via heap
+    mem.add_moment("Watched the old sunset together", emotion="happy")
+    moment = mem.get_strongest_memories(1, "moment")[0]
+    moment.reference_time -= 60 * 86400  # Pretend 60 days without reference
+    mem._rebuild_index()
+    strength_before = mem.get_strongest_memories(1, "fact")[0].strength
+    mem.update_decay()
+    mem.update_decay()
+    test_result("Expired memory forgotten", not mem.get_strongest_memories(1, "moment"))
+    test_result("Repeated decay doesn't compound",
+                abs(mem.get_strongest_memories(1, "fact")[0].strength - strength_before) < 1e-6)
+
+    # Test 7: Top-k retrieval ranks by strength without reordering storage
+    order_before = [m.content for m in mem.memories]
+    strongest = mem.get_strongest_memories(10)
+    now = time.time()
+    strengths = [m.strength_at(now) for m in strongest]
+    test_result("Strongest memories ranked", strengths == sorted(strengths, reverse=True))
+    test_result("Retrieval leaves memory order untouched",
+                [m.content for m in mem.memories] == order_before)
+
+    # Test 8: SQLite backend imports the JSON files, then saves incrementally
+    sql_mem = MemorySystem(data_dir=str(TEST_DATA_DIR), storage=SQLiteStorage(str(TEST_DATA_DIR)))
+    sql_mem.load()
+    test_result("SQLite migrates JSON memories", len(sql_mem.memories) == 3,
+                f"Count = {len(sql_mem.memories)}")
+    sql_mem.add_fact("Works night shifts")
+    snapshot = sql_mem.snapshot(p)
+    test_result("SQLite snapshot only carries changes",
+                not snapshot["full"] and len(snapshot["memories"]) == 1)
+    sql_mem.storage.write(snapshot)
+    sql_mem2 = MemorySystem(data_dir=str(TEST_DATA_DIR), storage=SQLiteStorage(str(TEST_DATA_DIR)))
+    test_result("SQLite state persists",
+                sql_mem2.load() is not None and len(sql_mem2.memories) == 4)
+
+    return True
+
+
+def test_soul_log():
+    """Test the event log: recording, snapshots, recovery and rebuild."""
+    header("SOUL LOG")
+
+    from soul_log import SoulLog
+
+    log_dir = TEST_DATA_DIR / "soul_log"
+    personality = Personality()
+    memory = MemorySystem(data_dir=str(log_dir), storage=SQLiteStorage(str(log_dir)))
+    log = SoulLog(str(log_dir), snapshot_every=25, keep_snapshots=0)
+    log.attach(personality, memory)
+
+    # Test 1: One event per change, nested changes not repeated
+    t = time.time() - 30 * 86400
+    personality.on_interaction("loving", now=t)
+    test_result("Interaction is one event", log.count == 1, f"{log.count} event(s)")
+
+    # A month of chats, facts and topics, with idle drift between days
+    midpoint = None
+    for day in range(30):
+        personality.core.apply_neglect(240, now=t)  # Drift: not an event
+        for i in range(3):
+            t += 3600
+            personality.on_interaction(["normal", "warm", "harsh"][i], now=t)
+            memory.add_conversation(f"day {day} message {i}", "reply", personality.E, now=t)
+        memory.add_memory("fact", f"fact number {day} about owner", now=t)
+        memory.add_topic(["tea", "space", "music"][day % 3], now=t)
+        memory.update_decay(now=t)
+        if day == 14:
+            midpoint = (t, personality.E, len(memory.memories))
+        t += 12 * 3600
+
+    def same_soul(p, m):
+        return (p.core.to_dict() == personality.core.to_dict()
+                and p.traits.to_dict() == personality.traits.to_dict()
+                and [(x.type, x.content, x.base_strength) for x in m.memories]
+                == [(x.type, x.content, x.base_strength) for x in memory.memories]
+                and [c.to_dict() for c in m.conversation_history]
+                == [c.to_dict() for c in memory.conversation_history])
+
+    # Test 2: Replay from the first snapshot reproduces the live soul
+    first = SoulLog(str(log_dir))
+    replay_memory = MemorySystem(data_dir=str(log_dir / "replay"))
+    replayed = first._replay(first.snapshots()[0][2], replay_memory)
+    test_result("Full replay matches live state", same_soul(replayed, replay_memory),
+                f"{log.count} events, E live {personality.E:.4f} vs replayed {replayed.E:.4f}")
+
+    # Test 3: Snapshots bound recovery to the tail
+    test_result("Periodic snapshots", len(log.snapshots()) > 3, f"{len(log.snapshots())} snapshots")
+    reopened = SoulLog(str(log_dir))
+    test_result("Unsaved events detected after a crash", reopened.unsaved_events() == log.count)
+    recovered_memory = MemorySystem(data_dir=str(log_dir / "recovered"))
+    recovered = reopened.recover(recovered_memory)
+    test_result("Recovery = latest snapshot + tail", same_soul(recovered, recovered_memory))
+
+    # Test 4: Rebuild at a past timestamp
+    at, mid_E, mid_memories = midpoint
+    past, past_memory = SoulLog(str(log_dir)).rebuild(at=at)
+    test_result("Rebuild at a timestamp", past.E == mid_E and len(past_memory.memories) == mid_memories,
+                f"E {past.E:.4f} vs {mid_E:.4f}")
+
+    # Test 5: Saving marks events as stored
+    memory.save(personality)
+    test_result("Save marks events as stored", SoulLog(str(log_dir)).unsaved_events() == 0)
+
+    # Test 6: A torn last line is dropped
+    log.close()
+    with open(log_dir / "events.jsonl", "ab") as f:
+        f.write(b'[1.0,"interaction","lov')
+    torn = SoulLog(str(log_dir))
+    test_result("Truncated last event ignored", torn.count == log.count, f"{torn.count} events")
+    memory.storage.close()
+
+    # Test 7: Retention keeps the newest snapshots and cuts the log behind them
+    kept_dir = TEST_DATA_DIR / "soul_log_kept"
+    personality = Personality()
+    memory = MemorySystem(data_dir=str(kept_dir), storage=SQLiteStorage(str(kept_dir)))
+    log = SoulLog(str(kept_dir), snapshot_every=10, keep_snapshots=3)
+    log.attach(personality, memory)
+    t = time.time() - 86400
+    for i in range(95):
+        t += 60
+        personality.on_interaction(["normal", "warm", "loving"][i % 3], now=t)
+        if i == 20:
+            early = t
+    with open(kept_dir / "events.jsonl", "rb") as f:
+        head, left = f.readline(), len(f.readlines())
+    test_result("Old snapshots pruned", len(log.snapshots()) == 3, f"{len(log.snapshots())} snapshots")
+    test_result("Log cut behind the oldest kept snapshot", head.startswith(b"{") and left == 25,
+                f"{left} events left")
+
+    reopened = SoulLog(str(kept_dir))
+    recovered_memory = MemorySystem(data_dir=str(kept_dir / "recovered"))
+    recovered = reopened.recover(recovered_memory)
+    test_result("Recovery after a cut", reopened.count == 95 and recovered.E == personality.E,
+                f"{reopened.count} events, E {recovered.E:.4f} vs {personality.E:.4f}")
+    try:
+        reopened.rebuild(at=early)
+        pruned = False
+    except ValueError:
+        pruned = True
+    test_result("Rebuild before the oldest snapshot refused", pruned)
+
+    personality.on_interaction("loving", now=t + 60)
+    log.close()
+    after = SoulLog(str(kept_dir))
+    test_result("Appends continue after a cut", after.count == 96
+                and after.recover(MemorySystem(data_dir=str(kept_dir / "recovered"))).E == personality.E)
+    memory.storage.close()
+
+    return True
+
+
+def test_metrics():
+    """Test the metrics registry and its hot-path wiring."""
+    header("METRICS")
+
+    from metrics import Metrics, METRICS
+
+    # Test 1: Disabled is a no-op
+    m = Metrics()
+    m.inc("hits_total")
+    with m.timer("work_seconds"):
+        pass
+    test_result("Disabled records nothing", m.counter("hits_total") == 0 and m.histogram("work_seconds") is None)
+
+    # Test 2: Counters, histograms, quantiles
+    m.enable()
+    m.inc("hits_total", outcome="ok")
+    m.inc("hits_total", 2, outcome="ok")
+    m.inc("hits_total", outcome="error")
+    for i in range(100):
+        m.observe("work_seconds", 0.001 * (i + 1))
+    test_result("Counters by label", m.counter("hits_total", outcome="ok") == 3 and
+                m.counter("hits_total", outcome="error") == 1)
+    h = m.histogram("work_seconds")
+    test_result("Histogram quantiles", h.count == 100 and 0.04 <= h.quantile(0.5) <= 0.06
+                and h.quantile(0.99) <= h.max == 0.1, f"p50 = {h.quantile(0.5) * 1e3:.1f} ms")
+
+    # Test 3: Prometheus text
+    text = m.to_prometheus()
+    test_result("Prometheus counter", 'claudeagotchi_hits_total{outcome="ok"} 3' in text)
+    test_result("Prometheus histogram", 'claudeagotchi_work_seconds_bucket{le="+Inf"} 100' in text
+                and "claudeagotchi_work_seconds_count 100" in text and "# TYPE claudeagotchi_work_seconds histogram" in text)
+
+    # Test 4: Hot paths record into METRICS
+    METRICS.enable()
+    METRICS.reset()
+    memory = MemorySystem(data_dir=str(TEST_DATA_DIR / "metrics"))
+    memory.add_fact("Owner likes metrics")
+    memory.save()
+    memory.load()
+    test_result("Memory save/load timed", all(METRICS.histogram(name) for name in
+                ("memory_snapshot_seconds", "memory_write_seconds", "memory_load_seconds")))
+
+    scheduler = Scheduler()
+    scheduler.add_task("noop", 0, lambda: None)
+    scheduler.update()
+    test_result("Scheduler task timed", METRICS.histogram("scheduler_task_seconds", task="noop") is not None)
+
+    def slow_then_fail():
+        time.sleep(0.05)
+        raise RuntimeError("disk full")
+
+    scheduler.add_task("slow", 0, slow_then_fail, background=True)
+    scheduler.update()
+    scheduler.shutdown(wait=True)  # Joins the worker, done-callbacks included
+    slow = METRICS.histogram("scheduler_task_seconds", task="slow")
+    test_result("Background run time observed", slow is not None and slow.count == 1 and slow.sum >= 0.05,
+                f"{slow.sum:.3f}s" if slow else "")
+    test_result("Background error counted", METRICS.counter("scheduler_task_errors_total", task="slow") == 1)
+
+    face = TerminalFace(DiffRenderer(stream=open(os.devnull, "w")))
+    face.render()
+    test_result("Render timed", METRICS.histogram("display_render_seconds").count == 1)
+
+    class FailingAPI(MockClaudeAPI):
+        def chat(self, *args, **kwargs):
+            return False, "API Error: unreachable", {}
+
+    api = OfflineAwareAPI(FailingAPI(), data_dir=str(TEST_DATA_DIR / "metrics"))
+    for _ in range(3):
+        api.chat("Hello?", "context", AffectiveState.WARM, E=1.0)
+    test_result("Failover counted", METRICS.counter("offline_failovers_total") == 1 and
+                METRICS.counter("offline_responses_total", reason="api_error") == 2 and
+                METRICS.counter("offline_responses_total", reason="offline") == 1)
+    test_result("Summary lists timings", "memory_write_seconds" in METRICS.summary())
+    api.queue.close()
+
+    return True
+
+
+def test_scheduler():
+    """Test the deadline scheduler with a controllable clock."""
+    header("SCHEDULER")
+
+    now = [1000.0]
+    scheduler = Scheduler(clock=lambda: now[0])
+    runs = {"fast": 0, "slow": 0, "all": 0, "skip": 0}
+
+    def counter(name):
+        return lambda: runs.__setitem__(name, runs[name] + 1)
+
+    scheduler.add_task("fast", 1000, counter("fast"))
+    scheduler.add_task("slow", 60000, counter("slow"))
+
+    # Test 1: Nothing runs early; sleep hint points at the next deadline
+    test_result("Tasks don't run immediately", scheduler.update() == 0)
+    test_result("Next deadline reported",
+                abs(scheduler.time_until_next_due() - 1.0) < 1e-6,
+                f"{scheduler.time_until_next_due():.3f}s")
+
+    # Test 2: Only due tasks run
+    now[0] += 1.0
+    scheduler.update()
+    test_result("Due task runs, others wait", runs == {"fast": 1, "slow": 0, "all": 0, "skip": 0})
+
+    # Test 3: Catch-up policies after a 5.5s stall
+    scheduler.add_task("all", 1000, counter("all"), catch_up=CatchUp.RUN_ALL)
+    scheduler.add_task("skip", 1000, counter("skip"), catch_up=CatchUp.SKIP)
+    now[0] += 5.5
+    scheduler.update()
+    test_result("Coalesce runs once", runs["fast"] == 2)
+    test_result("Run-all replays missed runs", runs["all"] == 5, f"Ran {runs['all']}x")
+    test_result("Skip runs once and keeps its grid",
+                runs["skip"] == 1 and abs(scheduler.get_task_info("skip")["time_until_next"] - 500) < 1e-6)
+
+    # Test 4: Disabled tasks drop out of the deadline heap
+    scheduler.disable_task("fast")
+    scheduler.disable_task("all")
+    scheduler.disable_task("skip")
+    test_result("Disabled tasks ignored",
+                abs(scheduler.time_until_next_due() - 53.5) < 1e-6,
+                f"{scheduler.time_until_next_due():.3f}s")
+
+    # Test 5: Background tasks snapshot inline, run off-thread, never overlap
+    import threading
+    release = threading.Event()
+    seen = []
+
+    def slow_write(snapshot):
+        seen.append((snapshot, threading.current_thread() is threading.main_thread()))
+        release.wait(5)
+
+    state = {"E": 1.0}
+    scheduler.add_task("save", 1000, slow_write, background=True, prepare=lambda: dict(state))
+    now[0] += 1.0
+    scheduler.update()
+    state["E"] = 2.0
+    now[0] += 1.0
+    scheduler.update()
+    test_result("Background run doesn't block update()", scheduler.get_task_info("save")["running"])
+    release.set()
+    scheduler.wait("save")
+    test_result("Overlapping run skipped", len(seen) == 1)
+    test_result("Snapshot taken inline, work done off-thread",
+                seen == [({"E": 1.0}, False)])
+    scheduler.shutdown()
+
+    return True
+
+
+def test_display():
+    """Test the differential terminal renderer."""
+    header("DISPLAY")
+
+    import io
+
+    class FakeTTY(io.StringIO):
+        def isatty(self):
+            return True
+
+    for face_cls in (TerminalFace, ColorTerminalFace):
+        out = FakeTTY()
+        face = face_cls(DiffRenderer(out))
+        face.set_status_bar("E:1.0 | warm")
+        face.set_message("Hello there")
+        face.render()
+        first = out.getvalue()
+
+        # Test 1: First frame clears and draws everything
+        test_result(f"{face_cls.__name__} first frame is full",
+                    first.startswith("\033[H\033[2J") and "Hello there" in first)
+
+        # Test 2: A blink only rewrites the eye row, in one write
+        face.set_expression("blink")
+        face.render()
+        delta = out.getvalue()[len(first):]
+        test_result(f"{face_cls.__name__} blink rewrites one line",
+                    delta.count("\033[K") == 1 and "─       ─" in delta and "Hello" not in delta,
+                    f"{len(delta)} bytes vs {len(first)}")
+
+    # Test 3: Streamed frames over the FPS cap are dropped, not waited for
+    out = FakeTTY()
+    face = TerminalFace(DiffRenderer(out))
+    face.render()
+    drawn = len(out.getvalue())
+    start = time.perf_counter()
+    face.start_stream()
+    face.append_message("Hel")
+    dropped = len(out.getvalue()) == drawn
+    face.end_stream()
+    elapsed = time.perf_counter() - start
+    test_result("Streamed frame over the cap dropped", dropped)
+    test_result("Final frame drawn without waiting",
+                "Hel" in out.getvalue() and elapsed < 0.5 / DiffRenderer.MAX_FPS,
+                f"{elapsed * 1000:.2f} ms")
+
+    # Test 4: Non-terminal output gets plain frames, no escapes
+    out = io.StringIO()
+    face = TerminalFace(DiffRenderer(out))
+    face.render()
+    test_result("Plain output when not a terminal", "\033" not in out.getvalue())
+
+    return True
+
+
+def test_analyzer():
+    """Test the shared keyword analyzer."""
+    header("TEXT ANALYZER")
+
+    from analyzer import ANALYZER
+    import claude_api
+
+    # Test 1: One call, every classification
+    metadata = ANALYZER.analyze("I'd love that! What if we tried it together?",
+                                "Thank you so much! I'm a gardener and I love tomatoes.")
+    test_result("Expression", metadata["suggested_expression"] == "love")
+    test_result("Sentiment", metadata["sentiment"] == "positive")
+    test_result("Quality", metadata["interaction_quality"] == "loving")
+    test_result("Memories", [m["subtype"] for m in metadata["potential_memories"]] == ["identity", "like"],
+                str(metadata["potential_memories"]))
+    test_result("Topics", metadata["detected_topics"][0] == "love", str(metadata["detected_topics"]))
+
+    # Test 2: Online and offline agree on quality
+    local = LocalResponseGenerator()
+    api = MockClaudeAPI()
+    messages = ["You're amazing", "shut up", "k", "thanks for that", "Tell me about the stars"]
+    test_result("Offline quality matches online",
+                all(local._assess_quality(m) == api._assess_interaction_quality(m) for m in messages))
+
+    # Test 3: v1 keeps its own vocabulary
+    v1 = claude_api.MockClaudeAPI()._analyze_response("Hmm, not sure. Strange!", "I prefer cats")
+    test_result("v1 vocabulary", v1["suggested_expression"] == "curious" and
+                v1["potential_memories"][0]["subtype"] == "preference" and "interaction_quality" not in v1)
+
     return True
 
 
@@ -202,10 +740,47 @@ def test_offline_queue():
     summary = queue.get_summary()
     test_result("Summary generated", "While offline" in summary and "3 interactions" in summary)
 
-    # Test 4: Clear
+    # Test 4: Truncated last journal line is tolerated
+    queue.close()
+    with open(TEST_DATA_DIR / "offline_queue.jsonl", "a") as f:
+        f.write('{"timestamp": 1700000000, "user_mes')
+    queue3 = OfflineQueue(data_dir=str(TEST_DATA_DIR))
+    test_result("Recovers from truncated journal", len(queue3) == 3)
+    queue3.add("Still here?", "Yes!", 1.7, AffectiveState.WARM, "normal")
+    queue3.close()
+    test_result("Appends cleanly after recovery",
+                len(OfflineQueue(data_dir=str(TEST_DATA_DIR))) == 4)
+
+    # Test 5: Clear
     queue.clear()
     test_result("Queue clears", len(queue) == 0)
 
+    # Test 6: Chat threads add while sync drops and compacts
+    import threading
+    queue = OfflineQueue(data_dir=str(TEST_DATA_DIR))
+    queue.COMPACT_MIN_DEAD = 4
+
+    def writer():
+        for i in range(200):
+            queue.add(f"msg {i}", "ok", 1.0, AffectiveState.WARM, "normal")
+
+    writers = [threading.Thread(target=writer) for _ in range(4)]
+    for thread in writers:
+        thread.start()
+    dropped = 0
+    while any(thread.is_alive() for thread in writers) or len(queue) > 50:
+        if len(queue) >= 3:
+            queue.drop(3)
+            dropped += 3
+    for thread in writers:
+        thread.join()
+    queue.close()
+    reloaded = OfflineQueue(data_dir=str(TEST_DATA_DIR))
+    test_result("Concurrent adds survive drops and compaction",
+                dropped + len(queue) == 800 and len(reloaded) == len(queue),
+                f"{dropped} dropped, {len(queue)} live, {len(reloaded)} on disk")
+    reloaded.clear()
+
     return True
 
 
@@ -257,11 +832,21 @@ def test_offline_aware_api():
     )
     test_result("API call succeeds", success and not metadata.get("offline"))
 
-    # Test 2: Force offline mode
+    # Test 2: Streamed deltas add up to the full response
+    deltas = []
+    success, response, metadata = api.chat(
+        "Hello!", "context", AffectiveState.WARM,
+        None, 1.0, E=1.0, owner_name="Test", on_delta=deltas.append
+    )
+    test_result("Streaming yields deltas", len(deltas) > 1 and "".join(deltas) == response,
+                f"{len(deltas)} deltas")
+    test_result("Metadata computed after stream", "suggested_expression" in metadata)
+
+    # Test 3: Force offline mode
     api.force_offline()
     test_result("Can force offline", api.is_offline)
 
-    # Test 3: Offline response
+    # Test 4: Offline response
     success, response, metadata = api.chat(
         "Hello again!", "context", AffectiveState.WARM,
         None, 1.0, E=1.5, owner_name="André"
@@ -269,20 +854,650 @@ def test_offline_aware_api():
     test_result("Offline response works", success and metadata.get("offline"))
     test_result("Interaction queued", api.has_pending_sync())
 
-    # Test 4: Multiple offline interactions
+    # Test 5: Multiple offline interactions
     for msg in ["How are you?", "I like talking to you", "Thanks!"]:
         api.chat(msg, "context", AffectiveState.WARM, None, 1.0, E=1.5, owner_name="André")
 
     test_result("Multiple interactions queued", len(api.queue) >= 4, f"Queue size = {len(api.queue)}")
 
-    # Test 5: Force online
+    # Test 6: Force online
     api.force_online()
     test_result("Can force online", not api.is_offline)
 
-    # Test 6: Queue summary
+    # Test 7: Queue summary
     summary = api.get_sync_summary()
     test_result("Sync summary available", len(summary) > 0)
 
+    # Test 8: Batched sync, interrupted after one chunk, then resumed
+    memory = MemorySystem(data_dir=str(TEST_DATA_DIR))
+    queued = len(api.queue)
+    syncer = OfflineSync(mock_api, api.queue, memory, chunk_size=2)
+    progress = syncer.run(max_chunks=1)
+    test_result("Sync stops after requested chunks",
+                progress.done == 2 and len(api.queue) == queued - 2,
+                f"Done {progress.done}/{progress.total}")
+    progress = api.sync_pending(memory)
+    test_result("Sync resumes and drains queue", progress.complete and not api.has_pending_sync())
+    test_result("Offline facts become memories",
+                any("talking to you" in m.content for m in memory.get_strongest_memories(5, "preference")))
+
+    # Test 9: Circuit breaker (controllable clock, no jitter)
+    class FlakyAPI(MockClaudeAPI):
+        up = False
+        calls = 0
+
+        def chat(self, *args, **kwargs):
+            self.calls += 1
+            if not self.up:
+                return False, "API Error: unreachable", {}
+            return super().chat(*args, **kwargs)
+
+        def ping(self, timeout: float = 5.0) -> bool:
+            return self.up
+
+    now = [0.0]
+    breaker = CircuitBreaker(base_delay=5, max_delay=20, clock=lambda: now[0], rng=lambda: 0.0)
+    flaky = FlakyAPI()
+    api = OfflineAwareAPI(flaky, data_dir=str(TEST_DATA_DIR / "breaker"), breaker=breaker)
+
+    api.chat("Hello?", "context", AffectiveState.WARM)
+    test_result("One failure stays closed", breaker.state == CircuitState.CLOSED)
+    api.chat("Hello?", "context", AffectiveState.WARM)
+    test_result("Second failure opens", api.is_offline and breaker.retry_in == 5, str(breaker.to_dict()))
+    api.chat("Still there?", "context", AffectiveState.WARM)
+    test_result("Open circuit answers locally", flaky.calls == 2)
+    test_result("Probe waits for the backoff", api.probe() is None)
+
+    delays = []
+    for _ in range(3):
+        now[0] += breaker.retry_in
+        api.probe()
+        delays.append(breaker.retry_in)
+    test_result("Backoff doubles up to its cap", delays == [10, 20, 20], str(delays))
+    test_result("Jitter shortens the delay",
+                CircuitBreaker(base_delay=5, jitter=0.5, rng=lambda: 1.0).delay(1) == 2.5)
+
+    flaky.up = True
+    now[0] += breaker.retry_in
+    test_result("Probe closes the circuit", api.probe() is True and not api.is_offline)
+    success, _, metadata = api.chat("Back?", "context", AffectiveState.WARM)
+    test_result("Next message goes straight to the API", success and not metadata["offline"] and flaky.calls == 3)
+
+    flaky.up = False
+    for _ in range(2):
+        api.chat("Hello?", "context", AffectiveState.WARM)
+    flaky.up = True
+    now[0] += breaker.retry_in
+    success, _, metadata = api.chat("Trial", "context", AffectiveState.WARM)
+    test_result("Half-open chat trial closes it", not metadata["offline"] and not api.is_offline
+                and breaker.opens == 0)
+
+    # A trial interrupted before any answer hands the circuit back
+    class InterruptedAPI(FlakyAPI):
+        def chat(self, *args, **kwargs):
+            raise KeyboardInterrupt
+
+        def ping(self, timeout: float = 5.0) -> bool:
+            raise KeyboardInterrupt
+
+    handed_back = []
+    for trial in (lambda: api.chat("Hello?", "context", AffectiveState.WARM), api.probe):
+        api.real_api = FlakyAPI()
+        for _ in range(2):
+            api.chat("Hello?", "context", AffectiveState.WARM)
+        now[0] += breaker.retry_in
+        api.real_api = InterruptedAPI()
+        try:
+            trial()
+            handed_back.append(False)
+        except KeyboardInterrupt:
+            handed_back.append(breaker.state == CircuitState.OPEN and breaker.retry_in == 0)
+    api.real_api = flaky
+    test_result("Interrupted trial doesn't strand the circuit half-open",
+                handed_back == [True, True] and api.probe() is True and not api.is_offline,
+                str(breaker.to_dict()))
+
+    api.force_offline()
+    now[0] += 3600
+    test_result("Forced offline ignores probes", api.probe() is None and api.is_offline)
+    api.queue.close()
+
+    # Test 10: A busy tenant is answered locally without tripping the breaker
+    from client_pool import ClientPool
+    from metrics import METRICS
+
+    pool = ClientPool(tenant_limit=1, tenant_wait=0.05)
+    busy = ClaudeAPI(api_key="test", base_url="http://127.0.0.1:9")
+    api = OfflineAwareAPI(busy, data_dir=str(TEST_DATA_DIR / "busy"), pool=pool, tenant="kitchen")
+    METRICS.enable(True)
+    METRICS.reset()
+    try:
+        with pool.slot("kitchen"):  # Another request holds the only slot
+            replies = [api.chat("Hello?", "context", AffectiveState.WARM) for _ in range(3)]
+            synced = api.sync_pending(MemorySystem(data_dir=str(TEST_DATA_DIR / "busy")))
+        test_result("Busy tenant answered locally", all(ok and meta["offline"] for ok, _, meta in replies)
+                    and METRICS.counter("offline_responses_total", reason="busy") == 3)
+        test_result("Busy tenant doesn't trip the breaker",
+                    api.breaker.state == CircuitState.CLOSED and api.breaker.failures == 0,
+                    str(api.breaker.to_dict()))
+        test_result("Busy sync waits without a failure", synced.error and api.breaker.failures == 0
+                    and api.has_pending_sync(), synced.error)
+    finally:
+        METRICS.enable(False)
+        api.queue.close()
+        pool.close()
+
+    return True
+
+
+def test_soul_manager():
+    """Test the multi-soul LRU."""
+    header("SOUL MANAGER")
+
+    from soul_manager import SoulManager
+
+    manager = SoulManager(str(TEST_DATA_DIR / "souls"), max_souls=2)
+
+    # Test 1: Souls are loaded lazily and kept separate
+    with manager.use("alpha") as soul:
+        soul.personality.on_interaction("loving")
+        soul.memory.add_fact("Alpha's owner plays cello")
+        soul.dirty = True
+        alpha_E = soul.personality.E
+    with manager.use("beta") as soul:
+        test_result("Souls are independent", len(soul.memory.memories) == 0)
+
+    # Test 2: Over budget evicts the least recently used, writing it back
+    with manager.use("gamma"):
+        pass
+    test_result("LRU keeps the budget", manager.loaded_ids() == ["beta", "gamma"],
+                f"Loaded: {manager.loaded_ids()}")
+    test_result("Evicted soul written back",
+                (TEST_DATA_DIR / "souls" / "alpha" / "soul.db").exists())
+
+    # Test 3: In-use souls are never evicted
+    pinned = manager.acquire("beta")
+    with manager.use("alpha") as soul:
+        test_result("Evicted soul reloads with its state",
+                    len(soul.memory.memories) == 1 and abs(soul.personality.E - alpha_E) < 0.01)
+        test_result("Idle catch-up integrates exactly", soul.personality.core.integrator == "exact")
+    with manager.use("delta"):
+        pass
+    survived = "beta" in manager.loaded_ids()
+    with manager.use("beta") as soul:
+        survived = survived and soul is pinned
+    test_result("Pinned soul survives eviction", survived)
+    manager.release("beta")
+
+    # Test 4: Memory budget counts too
+    manager.memory_budget = 1
+    with manager.use("epsilon"):
+        pass
+    test_result("Memory budget enforced", len(manager) <= 1, f"Loaded: {len(manager)}")
+    manager.close()
+
+    return True
+
+
+def test_pocket_server():
+    """Test the local ESP32 backend with two devices."""
+    header("POCKET SERVER")
+
+    import asyncio
+    import http.client
+    import threading
+    from pocket_server import PocketServer
+
+    config = {
+        "api_key": "",
+        "pocket_server": {
+            "host": "127.0.0.1", "port": 0, "messages_limit": 2, "metrics_token": "scrape",
+            "devices": {"apex_dev_a": "alpha", "apex_dev_b": {"name": "beta", "owner_name": "Bo"}},
+        },
+    }
+    server = PocketServer(config, data_dir=str(TEST_DATA_DIR / "devices"))
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(10)
+
+    def request(method, endpoint, token=None, body=None):
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        conn.request(method, f"/api/v1/pocket{endpoint}",
+                     body=json.dumps(body) if body is not None else None, headers=headers)
+        resp = conn.getresponse()
+        result = resp.status, json.loads(resp.read())
+        conn.close()
+        return result
+
+    try:
+        # Test 1: Auth
+        test_result("Rejects missing token", request("GET", "/status")[0] == 401)
+        test_result("Rejects unknown token", request("GET", "/status", "apex_dev_x")[0] == 401)
+
+        # Test 2: Firmware payloads
+        status, body = request("GET", "/status", "apex_dev_a")
+        test_result("Status payload", status == 200 and
+                    {"tools_available", "messages_used", "messages_limit", "tier", "motd"} <= set(body))
+        status, body = request("POST", "/chat", "apex_dev_a",
+                               {"message": "I love you!", "E": 3.0, "state": "WARM",
+                                "device_id": "alpha", "agent": "CLAUDE", "firmware": "2.0.0"})
+        test_result("Chat payload", status == 200 and body["response"] and
+                    body["expression"] and body["care_value"] == 2.0 and body["messages_used"] == 1,
+                    f"Response: {body.get('response')}")
+        status, body = request("GET", "/agents", "apex_dev_a")
+        test_result("Agents payload", status == 200 and "CLAUDE" in body["agents"])
+
+        # Test 3: Each device has its own soul
+        request("POST", "/sync", "apex_dev_b", {"E": 8.0, "E_floor": 2.5, "E_peak": 9.0,
+                                                "interactions": 40, "total_care": 30.0})
+        status, body = request("POST", "/care", "apex_dev_b",
+                               {"care_type": "poke", "intensity": 0.5, "E": 8.0})
+        test_result("Sync and care update the device's soul", status == 200 and body["E"] >= 8.0)
+        test_result("Souls are independent",
+                    request("GET", "/status", "apex_dev_b")[1]["messages_used"] == 0)
+
+        # Test 4: Message limit
+        request("POST", "/chat", "apex_dev_a", {"message": "Hello again"})
+        test_result("402 once the message limit is hit",
+                    request("POST", "/chat", "apex_dev_a", {"message": "One more"})[0] == 402)
+
+        # Test 5: Prometheus scrape, with the metrics token only
+        def scrape(token=None):
+            conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+            conn.request("GET", "/metrics", headers={"Authorization": f"Bearer {token}"} if token else {})
+            resp = conn.getresponse()
+            text = resp.read().decode()
+            conn.close()
+            return resp.status, text
+
+        status, text = scrape("scrape")
+        test_result("Metrics endpoint", status == 200 and
+                    'claudeagotchi_pocket_request_seconds_count{endpoint="/chat"}' in text)
+        test_result("Metrics need the metrics token",
+                    scrape()[0] == 401 and scrape("apex_dev_a")[0] == 401)
+    finally:
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+
+    test_result("Souls saved per device",
+                (TEST_DATA_DIR / "devices" / "beta" / "device.json").exists())
+
+    return True
+
+
+def test_prompt_cache():
+    """Test the cached system prompt prefix against a local messages stub."""
+    header("PROMPT CACHE (local messages stub)")
+
+    import threading
+    import anthropic
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from claude_api_v2 import SYSTEM_PROMPT_BASE
+
+    if not hasattr(anthropic.Anthropic(api_key="test"), "messages"):
+        print("  SKIP: anthropic SDK not installed")
+        return True
+
+    requests = []
+    cached = set()
+
+    class MessagesStub(BaseHTTPRequestHandler):
+        """POST /v1/messages: caches each marked prefix, like the API."""
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            requests.append(body)
+            prefix, context = body["system"]
+            key = prefix["text"] if prefix.get("cache_control") else None
+            hit = key in cached
+            if key:
+                cached.add(key)
+            prefix_tokens = len(prefix["text"]) // 4
+            usage = {
+                "input_tokens": len(context["text"]) // 4 + (0 if key else prefix_tokens),
+                "output_tokens": 5,
+                "cache_read_input_tokens": prefix_tokens if hit else 0,
+                "cache_creation_input_tokens": prefix_tokens if key and not hit else 0,
+            }
+            message = {"id": "msg_stub", "type": "message", "role": "assistant",
+                       "model": body["model"], "stop_reason": "end_turn",
+                       "stop_sequence": None, "usage": usage}
+            text = "Hello from the stub!"
+
+            if body.get("stream"):
+                events = [
+                    ("message_start", {"message": dict(message, content=[])}),
+                    ("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}}),
+                    ("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": text}}),
+                    ("content_block_stop", {"index": 0}),
+                    ("message_delta", {"delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                       "usage": {"output_tokens": 5}}),
+                    ("message_stop", {}),
+                ]
+                payload = "".join(f"event: {name}\ndata: {json.dumps(dict(data, type=name))}\n\n"
+                                  for name, data in events).encode()
+                content_type = "text/event-stream"
+            else:
+                payload = json.dumps(dict(message, content=[{"type": "text", "text": text}])).encode()
+                content_type = "application/json"
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MessagesStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        api = ClaudeAPI(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}")
+
+        # Test 0: The stock persona is too short to cache: sent unmarked, still reported
+        ok, _, short = api.chat("Hi!", "Owner: Tester", AffectiveState.WARM)
+        ok, _, again = api.chat("Again!", "Owner: Tester", AffectiveState.WARM)
+        test_result("Short prefix sent unmarked", ok and "cache_control" not in requests[0]["system"][0]
+                    and not short["cache"]["marked"], f"~{len(requests[0]['system'][0]['text']) // 4} tokens")
+        totals = again["cache"]["totals"]
+        test_result("Unmarked calls still counted",
+                    again["cache"]["prefix_hit"] and not short["cache"]["prefix_hit"]
+                    and totals["unmarked"] == 2 and totals["prefix_hits"] == 1
+                    and totals["cache_hits"] + totals["cache_misses"] == 0, str(totals))
+
+        # A persona past the minimum (here: a minimum of zero) is marked
+        api = ClaudeAPI(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}")
+        api.cache_min_tokens = 0
+        requests.clear()
+
+        # Test 1: Prefix is stable and marked; context is separate
+        ok, response, first = api.chat("Hi!", "Owner: Tester", AffectiveState.WARM)
+        test_result("Chat through the stub", ok, f"Response: {response}")
+        prefix, context = requests[0]["system"]
+        test_result("Prefix marked for caching",
+                    prefix.get("cache_control") == {"type": "ephemeral"} and first["cache"]["marked"])
+        test_result("Context outside the prefix",
+                    prefix["text"].startswith(SYSTEM_PROMPT_BASE) and "Owner: Tester" in context["text"]
+                    and "Owner: Tester" not in prefix["text"])
+
+        # Test 2: Same state, new context -> cache read, memo hit
+        ok, _, second = api.chat("Again!", "Owner: Tester, 2nd visit", AffectiveState.WARM)
+        test_result("Same prefix for a new context", requests[1]["system"][0] == prefix)
+        test_result("First call writes the cache", not first["cache"]["hit"] and first["cache"]["write_tokens"] > 0)
+        test_result("Second call reads it", second["cache"]["hit"] and second["cache"]["read_tokens"] > 0)
+
+        # Test 3: Another state gets its own prefix; streaming reports usage too
+        deltas = []
+        ok, response, third = api.chat("Hey", "Owner: Tester", AffectiveState.RADIANT, on_delta=deltas.append)
+        test_result("Streamed through the stub", ok and "".join(deltas) == response, f"Response: {response}")
+        test_result("New state misses the cache", requests[2]["system"][0] != prefix and not third["cache"]["hit"])
+
+        totals = third["cache"]["totals"]
+        test_result("Memo counters", totals["prefix_hits"] == 1 and totals["prefix_misses"] == 2, str(totals))
+        test_result("Cache counters", totals["cache_hits"] == 1 and totals["cache_misses"] == 2)
+        expected = (totals["cache_read_tokens"] * 0.9 - totals["cache_write_tokens"] * 0.25)
+        test_result("Token savings", abs(totals["tokens_saved"] - expected) < 0.01,
+                    f"Saved {totals['tokens_saved']} of {totals['cache_read_tokens']} cached tokens")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return True
+
+
+def test_client_pool():
+    """Test connection reuse across souls against a local keep-alive endpoint."""
+    header("CLIENT POOL (local keep-alive endpoint)")
+
+    import threading
+    import anthropic
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from client_pool import ClientPool, TenantBusy
+    from claude_api_v2 import Deadline
+
+    if not hasattr(anthropic.Anthropic(api_key="test"), "messages"):
+        print("  SKIP: anthropic SDK not installed")
+        return True
+
+    connections = []
+
+    class KeepAliveStub(BaseHTTPRequestHandler):
+        """POST /v1/messages over HTTP/1.1; one handler per connection."""
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            connections.append(self.client_address)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            payload = json.dumps({
+                "id": "msg_stub", "type": "message", "role": "assistant",
+                "model": body["model"], "stop_reason": "end_turn", "stop_sequence": None,
+                "content": [{"type": "text", "text": "Hello over a warm connection!"}],
+                "usage": {"input_tokens": 10, "output_tokens": 5},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    pool = ClientPool(tenant_limit=1, tenant_wait=0.05)
+
+    try:
+        # Test 1: Five souls on one pool share one connection
+        souls = [ClaudeAPI(api_key="test", base_url=base_url, pool=pool, tenant=f"soul{i}")
+                 for i in range(5)]
+        results = [soul.chat("Hi!", "Owner: Tester", AffectiveState.WARM)[0]
+                   for _ in range(2) for soul in souls]
+        test_result("Pooled chats succeed", all(results), f"{len(results)} chats")
+        test_result("One connection for every soul", len(connections) == 1,
+                    f"{len(connections)} connection(s)")
+        test_result("One client per key and endpoint", all(s.client is souls[0].client for s in souls))
+        test_result("Health ping over the pool", souls[0].ping() and len(connections) == 1)
+
+        # Test 2: Without the pool, each soul opens its own
+        del connections[:]
+        alone = [ClaudeAPI(api_key="test", base_url=base_url) for _ in range(5)]
+        for soul in alone:
+            soul.chat("Hi!", "Owner: Tester", AffectiveState.WARM)
+        test_result("Unpooled souls handshake separately", len(connections) == 5,
+                    f"{len(connections)} connection(s)")
+
+        # Test 3: OfflineAwareAPI hands its client to the pool
+        del connections[:]
+        wrapped = OfflineAwareAPI(ClaudeAPI(api_key="test", base_url=base_url),
+                                  data_dir=str(TEST_DATA_DIR / "pool"), pool=pool, tenant="wrapped")
+        ok, _, metadata = wrapped.chat("Hi!", "Owner: Tester", AffectiveState.WARM)
+        test_result("Injected through OfflineAwareAPI",
+                    ok and not metadata["offline"] and wrapped.real_api.client is souls[0].client
+                    and not connections, f"{len(connections)} new connection(s)")
+        wrapped.queue.close()
+
+        # Test 4: Tenant limits
+        with pool.slot("soul0"):
+            try:
+                with pool.slot("soul0"):
+                    pass
+                busy = False
+            except TenantBusy:
+                busy = True
+            with pool.slot("soul1"):
+                other = True
+            try:
+                souls[0].chat("Hi!", "Owner: Tester", AffectiveState.WARM)
+                refused = False
+            except TenantBusy:
+                refused = True
+        test_result("Tenant at its limit is refused", busy)
+        test_result("Other tenants unaffected", other)
+        test_result("Refused chat raises TenantBusy, not an API error", refused)
+        test_result("Slot freed afterwards", souls[0].chat("Hi!", "Owner: Tester", AffectiveState.WARM)[0])
+
+        # Test 5: A deadline cuts the wait for a slot short
+        pool.tenant_wait = 30.0
+        with pool.slot("soul0"):
+            start = time.perf_counter()
+            try:
+                souls[0].chat("Hi!", "Owner: Tester", AffectiveState.WARM, deadline=Deadline(0.3))
+                refused = False
+            except TenantBusy:
+                refused = True
+            waited = time.perf_counter() - start
+        test_result("Slot wait bounded by the deadline", refused and waited < 2.0,
+                    f"refused after {waited:.2f}s (tenant_wait 30s)")
+    finally:
+        pool.close()
+        server.shutdown()
+        server.server_close()
+
+    return True
+
+
+def test_deadlines():
+    """Test per-call deadlines against a slow, flaky local endpoint."""
+    header("DEADLINES (slow local endpoint)")
+
+    import threading
+    import anthropic
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from claude_api_v2 import Deadline
+    from main_v2 import Claudeagotchi, DEFAULT_CHAT_SLO
+    from display.terminal_face import HeadlessFace
+    from metrics import METRICS
+
+    if not hasattr(anthropic.Anthropic(api_key="test"), "messages"):
+        print("  SKIP: anthropic SDK not installed")
+        return True
+
+    behavior = {"mode": "ok", "failures": 0}
+    requests = []
+
+    class SlowStub(BaseHTTPRequestHandler):
+        """POST /v1/messages that hangs, fails once, or stalls mid-stream."""
+
+        def log_message(self, *args):
+            pass
+
+        def handle(self):
+            try:
+                super().handle()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The client gave up, as it should
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            requests.append(body)
+            if behavior["mode"] == "hang":
+                time.sleep(3)
+            if behavior["failures"]:
+                behavior["failures"] -= 1
+                payload = b'{"type": "error", "error": {"type": "overloaded_error", "message": "busy"}}'
+                self.send_response(529)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            message = {"id": "msg_stub", "type": "message", "role": "assistant",
+                       "model": body["model"], "stop_reason": "end_turn", "stop_sequence": None,
+                       "usage": {"input_tokens": 10, "output_tokens": 5}}
+            if not body.get("stream"):
+                payload = json.dumps(dict(message, content=[{"type": "text", "text": "On time!"}])).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            def event(name, data):
+                self.wfile.write(f"event: {name}\ndata: {json.dumps(dict(data, type=name))}\n\n".encode())
+                self.wfile.flush()
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            event("message_start", {"message": dict(message, content=[])})
+            event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+            event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": "I was saying"}})
+            time.sleep(3)  # Stall mid-answer
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    METRICS.enable(True)
+    METRICS.reset()
+
+    try:
+        api = ClaudeAPI(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}")
+
+        # Test 1: A hung call ends at the deadline, not the SDK's 10 minutes
+        behavior["mode"] = "hang"
+        start = time.monotonic()
+        ok, error, _ = api.chat("Hi!", "Owner: Tester", AffectiveState.WARM, deadline=Deadline(1.5))
+        elapsed = time.monotonic() - start
+        test_result("Hung call cut off at the deadline", not ok and elapsed < 2.5,
+                    f"{elapsed:.2f}s: {error}")
+
+        # Test 2: A transient failure is retried while the budget allows
+        behavior.update(mode="ok", failures=1)
+        ok, response, _ = api.chat("Hi!", "Owner: Tester", AffectiveState.WARM, deadline=Deadline(5))
+        test_result("Retried within the budget", ok and METRICS.counter("api_retries_total") == 1, response)
+
+        behavior["failures"] = 1
+        del requests[:]
+        ok, error, _ = api.chat("Hi!", "Owner: Tester", AffectiveState.WARM, deadline=Deadline(1.1))
+        test_result("No retry without budget for one", not ok and len(requests) == 1, error)
+
+        # Test 3: A stream stalled at the deadline returns what arrived
+        behavior["mode"] = "stream"
+        deltas = []
+        start = time.monotonic()
+        ok, response, metadata = api.chat("Hi!", "Owner: Tester", AffectiveState.WARM,
+                                          on_delta=deltas.append, deadline=Deadline(1.5))
+        elapsed = time.monotonic() - start
+        test_result("Partial streamed answer", ok and metadata.get("partial") and
+                    response == "I was saying…" and deltas == ["I was saying"],
+                    f"{elapsed:.2f}s: {response!r}")
+
+        # Test 4: OfflineAwareAPI answers locally when the budget is gone
+        offline = OfflineAwareAPI(api, data_dir=str(TEST_DATA_DIR / "deadline"))
+        del requests[:]
+        ok, response, metadata = offline.chat("Hi!", "Owner: Tester", AffectiveState.WARM,
+                                              deadline=Deadline(0.2))
+        test_result("Spent budget falls back locally", ok and metadata["offline"] and not requests
+                    and not offline.is_offline and offline.breaker.failures == 0, response)
+        offline.queue.close()
+
+        # Test 5: SLO per affective state, overridable in config
+        gotchi = Claudeagotchi({"api_key": "", "chat_slo_seconds": {"warm": 3}},
+                               data_dir=str(TEST_DATA_DIR / "slo"), display=HeadlessFace(), verbose=False)
+        test_result("SLO per state", gotchi._chat_slo(AffectiveState.WARM) == 3 and
+                    gotchi._chat_slo(AffectiveState.RADIANT) == DEFAULT_CHAT_SLO["radiant"])
+        request = gotchi._begin_chat("Hello!")
+        test_result("Chat turn carries its deadline",
+                    request["deadline"].seconds == gotchi._chat_slo(request["affective_state"]))
+        gotchi.memory.storage.close()
+        if gotchi.soul_log:
+            gotchi.soul_log.close(snapshot=False)
+    finally:
+        METRICS.enable(False)
+        server.shutdown()
+        server.server_close()
+
     return True
 
 
@@ -347,6 +1562,227 @@ def test_api_real_connection():
     return True
 
 
+def test_benchmark():
+    """Smoke-test the chat benchmark harness."""
+    header("BENCHMARK HARNESS")
+
+    import benchmark
+
+    report = benchmark.run([100], turns=10, storage="sqlite", label="smoke")
+    result = report["results"][0]
+    test_result("Runs at the requested size", result["memories"] == 100 and result["turns"] == 10)
+    test_result("Every stage measured",
+                all(result["stages"][stage]["samples"] > 0 for stage in benchmark.STAGES),
+                ", ".join(f"{s}={result['stages'][s]['p50_us']}us" for s in benchmark.STAGES))
+    stats = result["stages"]["turn"]
+    test_result("Percentiles ordered", stats["p50_us"] <= stats["p95_us"] <= stats["p99_us"])
+    test_result("JSON serializable", json.loads(json.dumps(report))["label"] == "smoke")
+
+    return True
+
+
+def test_speculative_replies():
+    """Test hedged chat turns: local stand-ins, replacement, cancellation."""
+    header("SPECULATIVE REPLIES")
+
+    import asyncio
+    from main_v2 import Claudeagotchi
+    from display.terminal_face import HeadlessFace
+    from metrics import METRICS
+
+    class SlowAPI(MockClaudeAPI):
+        delay = 0.0
+
+        def chat(self, *args, **kwargs):
+            time.sleep(self.delay)
+            return super().chat(*args, **kwargs)
+
+    class RecordingFace(HeadlessFace):
+        def __init__(self):
+            super().__init__()
+            self.shown = []
+
+        def set_message(self, message: str):
+            super().set_message(message)
+            self.shown.append(message)
+
+    stand_ins = {text for texts in LocalResponseGenerator.SPECULATIVE.values() for text in texts}
+    stand_ins |= {"Good question! Let me think...", "Hmm, good question..."}
+
+    def make(**config):
+        config = dict({"api_key": "", "proactive_enabled": False, "stream": False,
+                       "hedge_after_seconds": 0.1}, **config)
+        gotchi = Claudeagotchi(config, data_dir=str(TEST_DATA_DIR / "hedge"),
+                               display=RecordingFace(), verbose=False)
+        gotchi.api = SlowAPI()
+        return gotchi
+
+    def close(gotchi):
+        gotchi.memory.storage.close()
+        if gotchi.soul_log:
+            gotchi.soul_log.close(snapshot=False)
+
+    METRICS.enable(True)
+    METRICS.reset()
+    try:
+        # Test 1: A fast reply needs no stand-in
+        gotchi = make()
+        response = asyncio.run(gotchi.chat_async("Hello there!"))
+        test_result("Fast reply shown directly", not stand_ins & set(gotchi.display.shown)
+                    and METRICS.counter("chat_speculative_total") == 0, response)
+
+        # Test 2: A slow reply gets a stand-in, then replaces it
+        gotchi.api.delay = 0.4
+        response = asyncio.run(gotchi.chat_async("Tell me about stars"))
+        shown = [m for m in gotchi.display.shown if m in stand_ins]
+        test_result("Stand-in shown while waiting", len(shown) == 1, shown[0] if shown else "")
+        test_result("Claude's reply replaces it", response not in stand_ins
+                    and gotchi.display._message == response
+                    and gotchi.memory.conversation_history[-1].assistant_message == response, response)
+        close(gotchi)
+
+        # Test 3: Append mode keeps both
+        gotchi = make(hedge_mode="append")
+        gotchi.api.delay = 0.4
+        response = asyncio.run(gotchi.chat_async("Tell me about stars"))
+        first, _, rest = response.partition("\n\n")
+        test_result("Append mode follows the stand-in", first in stand_ins and rest and rest not in stand_ins,
+                    response.replace("\n\n", " / "))
+        close(gotchi)
+
+        # Test 4: Streamed reply clears the stand-in as it starts
+        gotchi = make(stream=True)
+        gotchi.api.delay = 0.4
+        response = asyncio.run(gotchi.chat_async("Tell me about stars"))
+        test_result("Stream replaces the stand-in", any(m in stand_ins for m in gotchi.display.shown)
+                    and gotchi.display._message == response, response)
+
+        # Test 5: Typing again cancels the turn; late deltas are dropped
+        async def interrupted():
+            cancel = asyncio.Event()
+            asyncio.get_running_loop().call_later(0.25, cancel.set)
+            result = await gotchi.chat_async("What do you dream about?", cancel)
+            await asyncio.sleep(0.5)  # Let the abandoned call finish and stream
+            return result
+
+        exchanges = len(gotchi.memory.conversation_history)
+        gotchi.api.delay = 0.5
+        response = asyncio.run(interrupted())
+        test_result("Cancelled turn keeps the stand-in", response in stand_ins
+                    and gotchi.display._message == response, response)
+        test_result("Soul untouched by the dropped reply",
+                    len(gotchi.memory.conversation_history) == exchanges
+                    and METRICS.counter("chat_cancelled_total") == 1)
+        close(gotchi)
+
+        # Test 6: Hedging off
+        gotchi = make(hedge_after_seconds=0)
+        gotchi.api.delay = 0.3
+        asyncio.run(gotchi.chat_async("Hello there!"))
+        test_result("No stand-in when hedging is off", not stand_ins & set(gotchi.display.shown))
+        close(gotchi)
+    finally:
+        METRICS.enable(False)
+
+    return True
+
+
+def test_repl_commands():
+    """Test that slow REPL commands leave the event loop running."""
+    header("REPL COMMANDS")
+
+    import asyncio
+    from main_v2 import Claudeagotchi
+    from display.terminal_face import HeadlessFace
+
+    class SlowSyncAPI(MockClaudeAPI):
+        def complete(self, *args, **kwargs):
+            time.sleep(0.3)
+            return super().complete(*args, **kwargs)
+
+    class ScriptedConsole:
+        def __init__(self, *lines):
+            self.lines = list(lines)
+
+        async def readline(self):
+            return self.lines.pop(0) if self.lines else None
+
+    data_dir = TEST_DATA_DIR / "repl"
+    gotchi = Claudeagotchi({"api_key": "", "proactive_enabled": False},
+                           data_dir=str(data_dir), display=HeadlessFace(), verbose=False)
+    gotchi.api = OfflineAwareAPI(SlowSyncAPI(), data_dir=str(data_dir))
+    gotchi.api.queue.clear()
+    for i in range(3):
+        gotchi.api.queue.add(f"offline {i}", "ok", 1.0, AffectiveState.WARM, "normal")
+
+    ticks = []
+    gotchi.scheduler.add_task("tick", 20, lambda: ticks.append(time.monotonic()))
+
+    # Memory may only change on the loop's thread
+    import threading
+    writers = set()
+    for name in ("add_moment", "save"):
+        def recorded(*args, _method=getattr(gotchi.memory, name), **kwargs):
+            writers.add(threading.get_ident())
+            return _method(*args, **kwargs)
+        setattr(gotchi.memory, name, recorded)
+
+    async def session(*commands, console=None):
+        gotchi.running = True
+        loop_task = asyncio.create_task(gotchi._scheduler_loop())
+        try:
+            for command in commands:
+                await gotchi.handle_command(command, console)
+        finally:
+            gotchi.running = False
+            loop_task.cancel()
+
+    try:
+        # Test 1: /sync replays in a thread; scheduled tasks keep firing
+        start = time.monotonic()
+        asyncio.run(session("/sync"))
+        elapsed = time.monotonic() - start
+        test_result("Sync drains the queue", not gotchi.api.has_pending_sync())
+        test_result("Scheduled task fires during /sync", len(ticks) >= elapsed / 0.02 / 2,
+                    f"{len(ticks)} ticks in {elapsed:.2f}s")
+        test_result("Memories stored on the loop thread",
+                    writers == {threading.get_ident()}, f"{len(writers)} thread(s)")
+
+        # Test 1b: The scheduled sync is a loop task too
+        writers.clear()
+        gotchi.api.queue.add("offline later", "ok", 1.0, AffectiveState.WARM, "normal")
+
+        async def scheduled_sync():
+            gotchi._sync_offline()
+            gotchi._sync_offline()  # Already running: no second replay
+            return await gotchi._sync_task
+
+        progress = asyncio.run(scheduled_sync())
+        test_result("Scheduled sync drains on the loop",
+                    progress.complete and not gotchi.api.has_pending_sync()
+                    and writers == {threading.get_ident()})
+
+        # Test 2: /poke animates with an awaited pause
+        ticks.clear()
+        asyncio.run(session("/poke"))
+        test_result("Scheduled task fires during /poke", len(ticks) >= 10, f"{len(ticks)} ticks")
+
+        # Test 3: /sync clear confirms through the console, not input()
+        gotchi.api.queue.add("offline again", "ok", 1.0, AffectiveState.WARM, "normal")
+        asyncio.run(session("/sync clear", console=ScriptedConsole("no")))
+        kept = gotchi.api.has_pending_sync()
+        asyncio.run(session("/sync clear", console=ScriptedConsole("yes")))
+        test_result("Clear asks the console", kept and not gotchi.api.has_pending_sync())
+    finally:
+        gotchi.scheduler.shutdown(wait=True)
+        gotchi.api.queue.close()
+        gotchi.memory.storage.close()
+        if gotchi.soul_log:
+            gotchi.soul_log.close(snapshot=False)
+
+    return True
+
+
 def test_full_flow():
     """Test a complete user session flow."""
     header("FULL SESSION FLOW")
@@ -443,12 +1879,26 @@ def main():
 
     tests = [
         ("Affective Core", test_affective_core),
+        ("Affective Fleet", test_affective_fleet),
         ("Personality", test_personality),
         ("Memory System", test_memory_system),
+        ("Soul Log", test_soul_log),
+        ("Metrics", test_metrics),
+        ("Scheduler", test_scheduler),
+        ("Display", test_display),
+        ("Text Analyzer", test_analyzer),
         ("Offline Queue", test_offline_queue),
         ("Local Responses", test_local_responses),
         ("Offline-Aware API", test_offline_aware_api),
+        ("Soul Manager", test_soul_manager),
+        ("Pocket Server", test_pocket_server),
+        ("Prompt Cache", test_prompt_cache),
+        ("Client Pool", test_client_pool),
+        ("Deadlines", test_deadlines),
         ("Real API Connection", test_api_real_connection),
+        ("Speculative Replies", test_speculative_replies),
+        ("REPL Commands", test_repl_commands),
+        ("Benchmark Harness", test_benchmark),
         ("Full Session Flow", test_full_flow),
     ]
 
@@ -457,8 +1907,9 @@ def main():
 
     for name, test_fn in tests:
         try:
+            checks_failed = len(FAILED_CHECKS)
             result = test_fn()
-            if result:
+            if result and len(FAILED_CHECKS) == checks_failed:
                 passed += 1
             else:
                 failed += 1
@@ -476,6 +1927,8 @@ def main():
     print(f"\n  Total:  {passed + failed}")
     print(f"  Passed: {passed}")
     print(f"  Failed: {failed}")
+    for check in FAILED_CHECKS:
+        print(f"    ✗ {check}")
 
     if failed == 0:
         print("\n  🎉 All tests passed! The soul is healthy.")